@@ -0,0 +1,100 @@
+"""Benchmark prompt size and prefill time with and without diff compaction.
+
+Usage::
+
+    python -m benchmarks.bench_compaction [--host http://localhost:11434 --model codellama]
+
+Without ``--host`` prefill time is estimated from ``--prefill-rate``; with it
+each prompt is sent to Ollama and ``prompt_eval_count``/``prompt_eval_duration``
+are read from the response.
+"""
+
+import argparse
+import random
+import time
+
+from ollama_commit.compaction import DiffCompactor, estimate_tokens
+from ollama_commit.git_analyzer import FileChange, StagedSnapshot
+from ollama_commit.ollama_client import OllamaClient, COMMIT_SYSTEM, MAX_DIFF_LENGTH
+
+
+def source_change(rng, path, hunks, context=3):
+    patch = ""
+    for h in range(hunks):
+        start = h * 50 + 1
+        patch += f"@@ -{start},{2 * context + 2} +{start},{2 * context + 2} @@ def func_{h}():\n"
+        patch += "".join(f"     value_{i} = compute({i})\n" for i in range(context))
+        patch += f"-    return value_{h}\n+    return value_{h} + {rng.randint(1, 99)}\n"
+        patch += "".join(f"     log(value_{i})\n" for i in range(context))
+    return FileChange(path, path, "M", patch.encode(), hunks, hunks)
+
+
+def whitespace_change(path, lines):
+    patch = f"@@ -1,{lines} +1,{lines} @@\n"
+    patch += "".join(f"-  x_{i} = {i}\n" for i in range(lines))
+    patch += "".join(f"+    x_{i} = {i}\n" for i in range(lines))
+    return FileChange(path, path, "M", patch.encode(), lines, lines)
+
+
+def synthetic_diffs(seed=0):
+    """Return named synthetic changesets."""
+    rng = random.Random(seed)
+    lockfile = FileChange("package-lock.json", "package-lock.json", "M",
+                          "".join(f"@@ -{i},1 +{i},1 @@\n-  \"v\": \"1.{i}\"\n+  \"v\": \"2.{i}\"\n"
+                                  for i in range(300)).encode(), 300, 300)
+    minified = FileChange("static/app.min.js", None, "A", ("@@ -0,0 +1 @@\n+" + "var a=1;" * 4000 + "\n").encode(), 1, 0)
+    binary = FileChange("logo.png", "logo.png", "M", b"Binary files a/logo.png and b/logo.png differ\n")
+    return {
+        "small edit": [source_change(rng, "src/app.py", 2)],
+        "feature": [source_change(rng, f"src/mod_{i}.py", 4) for i in range(6)],
+        "deps bump": [source_change(rng, "src/app.py", 1), lockfile, binary],
+        "reformat": [whitespace_change(f"src/fmt_{i}.py", 80) for i in range(4)] + [source_change(rng, "src/x.py", 1)],
+        "frontend build": [source_change(rng, "web/index.js", 3), minified],
+    }
+
+
+def measure_prefill(client, prompt):
+    response = client.session.post(
+        f"{client.base_url}/api/generate",
+        json={"model": client.model, "system": COMMIT_SYSTEM, "prompt": prompt, "stream": False,
+              "options": {"num_predict": 1}},
+        timeout=300,
+    )
+    result = response.json()
+    return result.get("prompt_eval_count", 0), result.get("prompt_eval_duration", 0) / 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", help="Ollama host to measure real prefill time")
+    parser.add_argument("--model", default="codellama")
+    parser.add_argument("--budget", type=int, default=512, help="Compaction token budget")
+    parser.add_argument("--prefill-rate", type=float, default=60.0, help="Estimated prefill tokens/second")
+    args = parser.parse_args()
+
+    client = OllamaClient(args.host or "http://localhost:11434", args.model)
+    compactor = DiffCompactor(token_budget=args.budget)
+    print(f"{'changeset':<16}{'mode':<12}{'chars':>8}{'tokens':>8}{'prefill s':>11}{'compact ms':>12}")
+    for name, changes in synthetic_diffs().items():
+        summary = {"staged_files": [c.path for c in changes], **StagedSnapshot(changes).summary()}
+        raw = StagedSnapshot(changes).diff_text()
+        started = time.perf_counter()
+        compacted = compactor.compact(changes)
+        compact_ms = (time.perf_counter() - started) * 1000
+        prompts = {
+            "raw": client._create_commit_prompt(raw, summary, None),
+            "truncated": client._create_commit_prompt(raw, summary, MAX_DIFF_LENGTH),
+            "compacted": client._create_commit_prompt(compacted.text, summary, None),
+        }
+        for mode, prompt in prompts.items():
+            tokens = estimate_tokens(COMMIT_SYSTEM + prompt)
+            if args.host:
+                tokens, prefill = measure_prefill(client, prompt)
+            else:
+                prefill = tokens / args.prefill_rate
+            timing = f"{compact_ms:>12.2f}" if mode == "compacted" else f"{'':>12}"
+            print(f"{name:<16}{mode:<12}{len(prompt):>8}{tokens:>8}{prefill:>11.2f}{timing}")
+
+
+if __name__ == "__main__":
+    main()
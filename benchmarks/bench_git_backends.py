@@ -0,0 +1,57 @@
+"""Compare the GitPython and subprocess backends for reading staged changes.
+
+Usage::
+
+    python -m benchmarks.bench_git_backends [--sizes 10 1000 10000] [--repeat 3]
+
+Each size builds a throwaway repository where that many files are staged
+(a mix of modified and new files) and times one snapshot per backend.
+"""
+
+import argparse
+import shutil
+import time
+
+from benchmarks import synthetic_repo
+from benchmarks.synthetic_repo import RepoSpec
+from ollama_commit.git_analyzer import GitAnalyzer
+
+
+def make_repo(staged_files, lines=20):
+    """Create a repository with staged_files staged changes, half modified and half new."""
+    modified = staged_files // 2
+    return synthetic_repo.make_repo(RepoSpec(modified=modified, added=staged_files - modified,
+                                             lines=lines, changed_lines=1))
+
+
+def time_backend(repo_dir, backend, repeat):
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        analyzer = GitAnalyzer(repo_dir, backend=backend)
+        count = len(analyzer.snapshot.changes)
+        best = min(best, time.perf_counter() - started)
+    return best, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'files':>7}{'gitpython s':>14}{'subprocess s':>14}{'speedup':>9}")
+    for size in args.sizes:
+        repo_dir = make_repo(size)
+        try:
+            gitpython, count = time_backend(repo_dir, "gitpython", args.repeat)
+            native, native_count = time_backend(repo_dir, "subprocess", args.repeat)
+            assert count == native_count == size, (count, native_count, size)
+            print(f"{size:>7}{gitpython:>14.3f}{native:>14.3f}{gitpython / native:>8.1f}x")
+        finally:
+            shutil.rmtree(repo_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Time searches of the commit history index at the scale of large repositories.
+
+Usage::
+
+    python -m benchmarks.bench_history [--commits 100000] [--dim 768] [--repeat 20]
+
+Fills a temporary :class:`~ollama_commit.history.HistoryIndex` with random
+unit vectors, as ``index-history`` would store them, and reports the time
+of the first search (which maps the files) and the median of the rest.
+Needs numpy.
+"""
+
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy
+
+from ollama_commit.history import INDEX_VERSION, HistoryCommit, HistoryIndex
+
+
+def build_index(directory, commits, dim, seed=0):
+    """Index of commits random embeddings, written in the same batches as update()."""
+    rng = numpy.random.default_rng(seed)
+    index = HistoryIndex(directory)
+    info = {"version": INDEX_VERSION, "model": "random", "dim": dim, "count": 0, "head": None}
+    batch = 10000
+    for start in range(0, commits, batch):
+        count = min(batch, commits - start)
+        rows = rng.standard_normal((count, dim), dtype=numpy.float32)
+        rows /= numpy.linalg.norm(rows, axis=1, keepdims=True)
+        index._append(info, [HistoryCommit(f"{i:040x}", f"chore: commit {i}", "") for i in range(start, start + count)],
+                      rows)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commits", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=768, help="Embedding size (768 for nomic-embed-text)")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench-history-")
+    try:
+        started = time.perf_counter()
+        build_index(directory, args.commits, args.dim)
+        print(f"built {args.commits} x {args.dim} index in {time.perf_counter() - started:.2f}s")
+        index = HistoryIndex(directory)
+        rng = numpy.random.default_rng(1)
+        times = []
+        for _ in range(args.repeat + 1):
+            query = rng.standard_normal(args.dim).tolist()
+            started = time.perf_counter()
+            index.search(query, args.k)
+            times.append((time.perf_counter() - started) * 1000)
+        print(f"first search   {times[0]:8.2f} ms")
+        print(f"median search  {statistics.median(times[1:]):8.2f} ms")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Measure how many prompt tokens Ollama evaluates per commit message request.
+
+Usage::
+
+    python -m benchmarks.bench_prefill [--host http://localhost:11434 --model codellama]
+
+Sends the changesets of :mod:`benchmarks.bench_compaction` one after the
+other, as consecutive ``msg`` runs would, and prints the
+``prompt_eval_count`` Ollama reports for each. Tokens the server reuses
+from its KV cache are not evaluated again, so after the first request only
+the files and diff should count. ``full`` flushes the cache before each
+request for comparison; ``system`` sends the instructions as Ollama's
+system prompt and ``inline`` at the start of the prompt. Without
+``--host`` the requests go to :mod:`benchmarks.stub_ollama`.
+"""
+
+import argparse
+
+from benchmarks.bench_compaction import synthetic_diffs
+from benchmarks.stub_ollama import StubOllama
+from ollama_commit.compaction import DiffCompactor
+from ollama_commit.git_analyzer import StagedSnapshot
+from ollama_commit.ollama_client import OllamaClient
+from ollama_commit.profiling import Profiler
+
+
+def prompt_eval_counts(url, model, system_prompt, changesets, compactor, flush=False):
+    """prompt_eval_count of one commit message request per changeset, in order."""
+    client = OllamaClient(url, model, system_prompt=system_prompt, options={"num_predict": 1})
+    counts = []
+    for changes in changesets:
+        if flush or not counts:
+            # Shares no prefix with the commit prompt, so its cache entry is replaced.
+            client.generate("Say hello.")
+        summary = {"staged_files": [change.path for change in changes], **StagedSnapshot(changes).summary()}
+        profiler = Profiler()
+        with profiler.activate():
+            client.generate_commit_message(compactor.compact(changes).text, summary, max_diff_length=None)
+        counts.append(profiler.ollama_totals()["prompt_eval_count"])
+    client.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", help="Ollama host to measure (default: a local stub)")
+    parser.add_argument("--model", default="codellama")
+    parser.add_argument("--budget", type=int, default=512, help="Compaction token budget")
+    args = parser.parse_args()
+
+    names, changesets = zip(*synthetic_diffs().items())
+    compactor = DiffCompactor(token_budget=args.budget)
+    layouts = {"full": (True, True), "system": (True, False), "inline": (False, False)}
+    results = {}
+    stub = None if args.host else StubOllama().__enter__()
+    try:
+        url = args.host or stub.url
+        for layout, (system_prompt, flush) in layouts.items():
+            results[layout] = prompt_eval_counts(url, args.model, system_prompt, changesets, compactor, flush)
+    finally:
+        if stub is not None:
+            stub.__exit__(None, None, None)
+
+    print(f"{'changeset':<16}" + "".join(f"{layout:>9}" for layout in layouts))
+    for i, name in enumerate(names):
+        print(f"{name:<16}" + "".join(f"{results[layout][i]:>9}" for layout in layouts))
+    print(f"{'after first':<16}" + "".join(f"{sum(results[layout][1:]):>9}" for layout in layouts))
+
+
+if __name__ == "__main__":
+    main()
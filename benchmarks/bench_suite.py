@@ -0,0 +1,224 @@
+"""Time GitAnalyzer, prompt construction and end-to-end generation, and track the results.
+
+Usage::
+
+    python -m benchmarks.bench_suite [--sizes small medium] [--repeat 5] [--latency 0.05]
+
+Repositories come from :mod:`benchmarks.synthetic_repo` and Ollama is
+replaced by :mod:`benchmarks.stub_ollama`, so runs are repeatable and need
+no model. Results are written as JSON to ``benchmarks/results/`` and
+compared with the previous run there (or ``--compare FILE``); medians that
+got slower by more than ``--threshold`` are reported as regressions.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.stub_ollama import StubOllama
+from benchmarks.synthetic_repo import RepoSpec, make_repo
+from ollama_commit.cache import MessageCache
+from ollama_commit.commit_generator import CommitGenerator
+from ollama_commit.compaction import DiffCompactor
+from ollama_commit.git_analyzer import GitAnalyzer
+from ollama_commit.ollama_client import OllamaClient
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+SIZES = {
+    "small": RepoSpec(modified=5, added=1, lines=100, changed_lines=5),
+    "medium": RepoSpec(modified=100, added=20, deleted=5, renamed=5, binaries=5, lines=200, changed_lines=10),
+    "large": RepoSpec(modified=1000, added=200, deleted=50, renamed=50, binaries=20, lines=200, changed_lines=10),
+}
+
+# Slowdowns below this many milliseconds are treated as noise.
+MIN_REGRESSION_MS = 0.5
+
+
+def measure(func, repeat):
+    """Run func once to warm up, then repeat times; returns timing stats in ms."""
+    func()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+    return {
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "max_ms": round(max(times), 3),
+        "runs": repeat,
+    }
+
+
+def git_benchmarks(repo_dir, repeat):
+    """GitAnalyzer: opening, snapshots per backend and the accessors built on them."""
+    results = {}
+    for backend in ("gitpython", "subprocess"):
+        results[f"git.open[{backend}]"] = measure(lambda: GitAnalyzer(repo_dir, backend=backend).close(), repeat)
+
+        def snapshot():
+            analyzer = GitAnalyzer(repo_dir, backend=backend)
+            analyzer.snapshot
+            analyzer.close()
+
+        results[f"git.snapshot[{backend}]"] = measure(snapshot, repeat)
+    analyzer = GitAnalyzer(repo_dir)
+    snapshot = analyzer.snapshot
+    results["git.refresh_if_changed"] = measure(analyzer.refresh_if_changed, repeat)
+    results["git.repository_info"] = measure(analyzer.get_repository_info, repeat)
+    results["git.file_changes_summary"] = measure(analyzer.get_file_changes_summary, repeat)
+    results["git.staged_diff"] = measure(analyzer.get_staged_diff, repeat)
+    results["git.digest"] = measure(snapshot.digest, repeat)
+    analyzer.close()
+    return results
+
+
+def prompt_benchmarks(repo_dir, repeat):
+    """Compaction of the staged changes and building the commit prompt."""
+    analyzer = GitAnalyzer(repo_dir)
+    changes = analyzer.snapshot.changes
+    summary = {**analyzer.get_repository_info(), **analyzer.get_file_changes_summary()}
+    analyzer.close()
+    client = OllamaClient("http://127.0.0.1:9")
+    compactor = DiffCompactor()
+    compacted = compactor.compact(changes)
+    return {
+        "prompt.compact": measure(lambda: compactor.compact(changes), repeat),
+        "prompt.build": measure(lambda: client._create_commit_prompt(compacted.text, summary, None), repeat),
+    }
+
+
+def generate_benchmarks(repo_dir, repeat, server):
+    """End-to-end CommitGenerator.generate against the stub, with a fresh generator per run.
+
+    The ``cold`` runs unload the stub's model first, so they include its load time.
+    """
+    cache_dir = tempfile.mkdtemp(prefix="bench-cache-")
+    client = OllamaClient(server.url)
+
+    def generate(on_token=None, cache=None, pipeline=False, cold=False):
+        if cold:
+            server.unload()
+        generator = CommitGenerator(repo_dir, ollama_client=client, cache=cache, pipeline=pipeline)
+        result = generator.generate(on_token=on_token)
+        assert result["success"], result["error"]
+
+    cache = MessageCache(cache_dir)
+    try:
+        return {
+            "generate[blocking]": measure(generate, repeat),
+            "generate[stream]": measure(lambda: generate(on_token=lambda token: None), repeat),
+            "generate[cached]": measure(lambda: generate(cache=cache), repeat),
+            "generate[cold]": measure(lambda: generate(cold=True), repeat),
+            "generate[cold,pipeline]": measure(lambda: generate(cold=True, pipeline=True), repeat),
+        }
+    finally:
+        client.close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def metadata(args):
+    """Environment of the run, so results from different machines are not confused."""
+    def output(*command):
+        try:
+            return subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                  universal_newlines=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": output("git", "-C", os.path.dirname(RESULTS_DIR), "rev-parse", "--short", "HEAD"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git": output("git", "--version"),
+        "repeat": args.repeat,
+        "latency": args.latency,
+        "token_delay": args.token_delay,
+        "prompt_delay": args.prompt_delay,
+        "load_delay": args.load_delay,
+    }
+
+
+def previous_result(path):
+    """Most recent result file other than path."""
+    candidates = sorted(p for p in glob.glob(os.path.join(RESULTS_DIR, "*.json")) if p != path)
+    return candidates[-1] if candidates else None
+
+
+def compare(current, previous, threshold):
+    """Lines describing how medians changed; returns them with the regressed names."""
+    lines, regressions = [], []
+    for name, stats in current["results"].items():
+        before = previous["results"].get(name)
+        if before is None:
+            continue
+        old, new = before["median_ms"], stats["median_ms"]
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if change > threshold and new - old > MIN_REGRESSION_MS:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        lines.append(f"{name:<44}{old:>11.2f}{new:>11.2f}{change * 100:>+8.1f}%{flag}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", choices=sorted(SIZES), default=["small", "medium"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Stub seconds between tokens")
+    parser.add_argument("--prompt-delay", type=float, default=0.0, help="Stub seconds per 1000 uncached prompt characters")
+    parser.add_argument("--load-delay", type=float, default=0.1, help="Stub seconds to load the model in cold runs")
+    parser.add_argument("--output", help="Result file (default: a new file in benchmarks/results)")
+    parser.add_argument("--compare", help="Result file to compare with (default: the previous run)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on a regression")
+    args = parser.parse_args()
+
+    results = {}
+    with StubOllama(latency=args.latency, token_delay=args.token_delay, prompt_delay=args.prompt_delay,
+                    load_delay=args.load_delay) as server:
+        for size in args.sizes:
+            repo_dir = make_repo(SIZES[size])
+            try:
+                for group in (git_benchmarks(repo_dir, args.repeat), prompt_benchmarks(repo_dir, args.repeat),
+                              generate_benchmarks(repo_dir, args.repeat, server)):
+                    for name, stats in group.items():
+                        results[f"{size}/{name}"] = stats
+                        print(f"{size + '/' + name:<44}{stats['median_ms']:>11.2f} ms", flush=True)
+            finally:
+                shutil.rmtree(repo_dir, ignore_errors=True)
+
+    report = {"meta": metadata(args), "sizes": {size: SIZES[size].describe() for size in args.sizes},
+              "results": results}
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    baseline = args.compare or previous_result(os.path.abspath(output))
+    if baseline:
+        with open(baseline) as f:
+            previous = json.load(f)
+        lines, regressions = compare(report, previous, args.threshold)
+        print(f"\nCompared with {baseline}:")
+        print(f"{'benchmark':<44}{'before ms':>11}{'after ms':>11}{'change':>9}")
+        print("\n".join(lines))
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
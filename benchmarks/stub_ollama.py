@@ -0,0 +1,232 @@
+"""Deterministic local stand-in for the Ollama API, for benchmarks and tests.
+
+Usage::
+
+    python -m benchmarks.stub_ollama --port 11435 --latency 0.2 --token-delay 0.01
+
+serves ``/api/tags``, ``/api/show``, ``/api/embeddings`` and
+``/api/generate`` (streaming or not) until interrupted. Each generate
+request waits ``latency`` seconds, plus ``prompt_delay`` per thousand
+prompt characters, before the first token and ``token_delay`` between
+tokens, and reports matching Ollama timing fields.
+
+Like Ollama with ``OLLAMA_NUM_PARALLEL=1``, generate requests are served
+one at a time unless ``num_parallel`` allows more. The first one after
+:meth:`StubOllama.unload` also waits ``load_delay``. The system prompt
+and prompt are evaluated together, and characters shared with the start
+of the previous request's are not charged ``prompt_delay`` or counted in
+``prompt_eval_count``, as if they were still in the KV cache.
+
+The server records what it receives (``requests``, ``hosts``, ``payloads``,
+``connections``, ``tokens_sent``, ``max_in_flight``) for tests to check.
+"""
+
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_TOKENS = ["feat", ":", " add", " synthetic", " benchmark", " change", "\n", "\n", "Body", " text", "."]
+
+
+def bag_of_words(text, dim=32):
+    """Deterministic stand-in for an embedding: word counts hashed into dim buckets."""
+    vector = [0.0] * dim
+    for word in text.replace("/", " ").split():
+        vector[zlib.crc32(word.encode()) % dim] += 1.0
+    return vector
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Handles one connection to the stub."""
+
+    protocol_version = "HTTP/1.1"
+    # Like Go's net/http; otherwise Nagle's algorithm adds ~40 ms per response.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path))
+        self.server.hosts.append(self.headers.get("Host"))
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": name} for name in self.server.models]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        self.server.requests.append(("POST", self.path))
+        self.server.hosts.append(self.headers.get("Host"))
+        self.server.payloads.append(payload)
+        if self.path == "/api/show":
+            self._send_json({"parameters": f"num_ctx {self.server.num_ctx}"})
+        elif self.path == "/api/embeddings":
+            self._send_json({"embedding": bag_of_words(payload.get("prompt", ""))})
+        elif self.path == "/api/generate":
+            self._generate(payload)
+        else:
+            self.send_error(404)
+
+    def _generate(self, payload):
+        server = self.server
+        prompt = payload.get("prompt", "")
+        # What a chat template renders, reduced to the order of its parts.
+        rendered = f"{payload.get('system', '')}\n{prompt}" if prompt else ""
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            with server.slot:
+                load = 0.0 if server.loaded else server.load_delay
+                server.loaded = True
+                cached = len(os.path.commonprefix([server.cached_prompt, rendered]))
+                server.cached_prompt = rendered
+                prefill = server.latency + server.prompt_delay * (len(rendered) - cached) / 1000
+                time.sleep(load + prefill)
+                self._respond(payload, prompt, load, prefill, -(-(len(rendered) - cached) // 4))
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _respond(self, payload, prompt, load, prefill, prompt_tokens):
+        server = self.server
+        tokens = server.tokens if prompt else []
+        tokens = tokens[:payload.get("options", {}).get("num_predict") or len(tokens)]
+        stats = {
+            "total_duration": int((load + prefill + server.token_delay * len(tokens)) * 1e9),
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prefill * 1e9),
+            "eval_count": len(tokens),
+            "eval_duration": int(server.token_delay * len(tokens) * 1e9),
+            **server.stats,
+        }
+        if not payload.get("stream", True):
+            time.sleep(server.token_delay * len(tokens))
+            self._send_json({"response": "".join(tokens), "done": True, **stats})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(server.token_delay)
+                self._write_chunk({"response": token, "done": False})
+                with server.lock:
+                    server.tokens_sent += 1
+            self._write_chunk({"response": "", "done": True, **stats})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, as msg does after the first line.
+            self.close_connection = True
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, payload):
+        data = json.dumps(payload).encode() + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class StubOllama(ThreadingHTTPServer):
+    """Stub Ollama server; use as a context manager to serve in a background thread."""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, token_delay=0.0, prompt_delay=0.0, tokens=None,
+                 models=("codellama",), num_ctx=2048, load_delay=0.0, num_parallel=1, host="127.0.0.1"):
+        if ":" in host:
+            self.address_family = socket.AF_INET6
+        super().__init__((host, port), StubOllamaHandler)
+        self.host = host
+        self.latency = latency
+        self.token_delay = token_delay
+        self.prompt_delay = prompt_delay
+        self.load_delay = load_delay
+        self.loaded = False
+        self.cached_prompt = ""
+        self.slot = threading.BoundedSemaphore(num_parallel)
+        self.num_parallel = num_parallel
+        self.tokens = list(tokens or DEFAULT_TOKENS)
+        self.models = list(models)
+        self.num_ctx = num_ctx
+        # Fields merged over the computed timing fields of each final response.
+        self.stats = {}
+        self.requests = []
+        # Host header of each request, in the same order.
+        self.hosts = []
+        self.payloads = []
+        self.connections = 0
+        self.tokens_sent = 0
+        # Generate requests received and not yet answered, queued or served.
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self._thread = None
+
+    def unload(self):
+        """Make the next request load the model and start with an empty KV cache."""
+        for _ in range(self.num_parallel):
+            self.slot.acquire()
+        self.loaded = False
+        self.cached_prompt = ""
+        for _ in range(self.num_parallel):
+            self.slot.release()
+
+    @property
+    def url(self):
+        host = f"[{self.host}]" if ":" in self.host else self.host
+        return f"http://{host}:{self.server_address[1]}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first token")
+    parser.add_argument("--prompt-delay", type=float, default=0.0, help="Extra seconds per 1000 prompt characters")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between tokens")
+    parser.add_argument("--load-delay", type=float, default=0.0, help="Seconds to load the model on the first request")
+    parser.add_argument("--num-parallel", type=int, default=1, help="Generate requests served at once")
+    args = parser.parse_args()
+    server = StubOllama(args.port, args.latency, args.token_delay, args.prompt_delay, load_delay=args.load_delay,
+                        num_parallel=args.num_parallel)
+    print(f"Stub Ollama listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
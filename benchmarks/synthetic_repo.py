@@ -0,0 +1,112 @@
+"""Generate throwaway git repositories with a given shape of staged changes.
+
+Usage::
+
+    python -m benchmarks.synthetic_repo --modified 100 --added 20 --binaries 5 --renamed 5
+
+prints the path of a new repository. Contents are derived from ``seed``,
+so the same spec always produces the same diff.
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import tempfile
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+
+@dataclass
+class RepoSpec:
+    """Shape of the staged changes in a synthetic repository."""
+
+    modified: int = 10
+    added: int = 0
+    deleted: int = 0
+    renamed: int = 0
+    binaries: int = 0
+    lines: int = 50
+    changed_lines: int = 5
+    binary_bytes: int = 4096
+    seed: int = 0
+
+    @property
+    def staged_files(self) -> int:
+        """Number of files the staged diff lists."""
+        return self.modified + self.added + self.deleted + self.renamed + self.binaries
+
+    def describe(self) -> dict:
+        return asdict(self)
+
+
+def git(repo_dir, *args):
+    subprocess.run(["git", *args], cwd=repo_dir, check=True, stdout=subprocess.DEVNULL)
+
+
+def source_lines(rng, count):
+    return [f"value_{i} = compute({rng.randint(0, 10 ** 6)})\n" for i in range(count)]
+
+
+def write(repo_dir, path, content):
+    full_path = os.path.join(repo_dir, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    mode = "wb" if isinstance(content, bytes) else "w"
+    with open(full_path, mode) as f:
+        f.write(content)
+
+
+def make_repo(spec: RepoSpec, repo_dir: Optional[str] = None) -> str:
+    """Create a repository with one commit and the changes of spec staged on top."""
+    rng = random.Random(spec.seed)
+    repo_dir = repo_dir or tempfile.mkdtemp(prefix="bench-repo-")
+    git(repo_dir, "init", "-q")
+    git(repo_dir, "config", "user.email", "bench@example.com")
+    git(repo_dir, "config", "user.name", "Bench")
+    git(repo_dir, "config", "core.autocrlf", "false")
+
+    files = {}
+    for kind, count in (("mod", spec.modified), ("del", spec.deleted), ("ren", spec.renamed)):
+        for i in range(count):
+            path = f"{kind}{i % 50}/{kind}_{i}.py"
+            files[path] = source_lines(rng, spec.lines)
+            write(repo_dir, path, "".join(files[path]))
+    for i in range(spec.binaries // 2):
+        write(repo_dir, f"assets/image_{i}.bin", bytes(rng.getrandbits(8) for _ in range(spec.binary_bytes)))
+    git(repo_dir, "add", "-A")
+    git(repo_dir, "commit", "-q", "--allow-empty", "-m", "base")
+
+    for i in range(spec.modified):
+        path = f"mod{i % 50}/mod_{i}.py"
+        lines = files[path]
+        for j in rng.sample(range(len(lines)), min(spec.changed_lines, len(lines))):
+            lines[j] = f"value_{j} = changed({rng.randint(0, 10 ** 6)})\n"
+        write(repo_dir, path, "".join(lines))
+    for i in range(spec.added):
+        write(repo_dir, f"new{i % 50}/new_{i}.py", "".join(source_lines(rng, spec.lines)))
+    for i in range(spec.deleted):
+        os.remove(os.path.join(repo_dir, f"del{i % 50}/del_{i}.py"))
+    for i in range(spec.renamed):
+        # A small edit keeps the file similar enough to be detected as a rename.
+        path = f"ren{i % 50}/ren_{i}.py"
+        os.remove(os.path.join(repo_dir, path))
+        write(repo_dir, f"moved{i % 50}/ren_{i}.py", "".join(files[path]) + "extra = 1\n")
+    # Half the binaries are modified, the rest added.
+    for i in range(spec.binaries):
+        write(repo_dir, f"assets/image_{i}.bin", bytes(rng.getrandbits(8) for _ in range(spec.binary_bytes)))
+    git(repo_dir, "add", "-A")
+    return repo_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    for name, value in asdict(RepoSpec()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value)
+    parser.add_argument("--dir", help="Directory to create the repository in (default: a new temporary one)")
+    args = vars(parser.parse_args())
+    repo_dir = args.pop("dir")
+    print(make_repo(RepoSpec(**args), repo_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,27 @@ __version__ = "0.1.0"
 __author__ = "anubhavkrishna1"
 __email__ = "anubhavkrishna1@users.noreply.github.com"
 
-from .commit_generator import CommitGenerator
-from .git_analyzer import GitAnalyzer
-from .ollama_client import OllamaClient
+__all__ = ["AsyncCommitGenerator", "AsyncOllamaClient", "CommitGenerator", "GitAnalyzer", "OllamaClient"]
 
-__all__ = ["CommitGenerator", "GitAnalyzer", "OllamaClient"]
\ No newline at end of file
+# Public classes are imported on first access so that `import ollama_commit`
+# (and the CLI entry point) does not pull in requests or GitPython.
+_LAZY_EXPORTS = {
+    "AsyncCommitGenerator": "async_generator",
+    "AsyncOllamaClient": "async_client",
+    "CommitGenerator": "commit_generator",
+    "GitAnalyzer": "git_analyzer",
+    "OllamaClient": "ollama_client",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        module = __import__(f"{__name__}.{_LAZY_EXPORTS[name]}", fromlist=[name])
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_EXPORTS))
\ No newline at end of file
@@ -0,0 +1,401 @@
+"""Asyncio client for the Ollama API."""
+
+import asyncio
+import json
+import time
+from typing import Optional, Dict, Any, AsyncIterator, Callable, List, Sequence, Union
+from urllib.parse import urlsplit
+from .client_base import (
+    ClientBase, KeepAlive, CHUNK_SYSTEM, COMBINE_SYSTEM, DEFAULT_CONTEXT_WINDOW, MAX_DIFF_LENGTH, SUMMARY_OPTIONS,
+    UNAVAILABLE_MESSAGE,
+)
+from .profiling import annotate, record_ollama, span
+
+
+class _Connection:
+    """An open HTTP/1.1 connection."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class _Response:
+    """Response whose body is read from the connection on demand.
+
+    The connection goes back to the client's pool once the body has been
+    read to the end; closing the response earlier closes the connection,
+    which makes Ollama stop generating.
+    """
+
+    def __init__(self, client: "AsyncOllamaClient", connection: _Connection, status: int, headers: Dict[str, str]):
+        self.client = client
+        self.connection = connection
+        self.status = status
+        self.headers = headers
+        self._done = False
+
+    async def read(self) -> bytes:
+        """Read the whole body."""
+        return b"".join([chunk async for chunk in self._iter_body()])
+
+    async def json(self) -> Any:
+        """Read the body as JSON."""
+        return json.loads(await self.read())
+
+    async def iter_lines(self) -> AsyncIterator[bytes]:
+        """Yield body lines as they arrive."""
+        buffer = b""
+        async for chunk in self._iter_body():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                yield line
+        if buffer:
+            yield buffer
+
+    def close(self) -> None:
+        """Drop the connection unless the body was read completely."""
+        if not self._done:
+            self._done = True
+            self.connection.close()
+
+    async def _iter_body(self) -> AsyncIterator[bytes]:
+        """Yield body chunks, handling chunked and sized bodies."""
+        read = self.client._read
+        reader = self.connection.reader
+        keep_alive = self.headers.get("connection", "").lower() != "close"
+        if self.headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await read(reader.readline())).split(b";")[0], 16)
+                if size == 0:
+                    while (await read(reader.readline())).strip():
+                        pass
+                    break
+                data = await read(reader.readexactly(size + 2))
+                yield data[:-2]
+        elif "content-length" in self.headers:
+            remaining = int(self.headers["content-length"])
+            while remaining:
+                data = await read(reader.read(min(remaining, 64 * 1024)))
+                if not data:
+                    raise asyncio.IncompleteReadError(data, remaining)
+                remaining -= len(data)
+                yield data
+        else:
+            keep_alive = False
+            while True:
+                data = await read(reader.read(64 * 1024))
+                if not data:
+                    break
+                yield data
+        self._done = True
+        self.client._release(self.connection, keep_alive)
+
+
+class AsyncOllamaClient(ClientBase):
+    """Asyncio counterpart of OllamaClient.
+
+    Talks HTTP/1.1 to Ollama over asyncio streams and keeps idle
+    connections for reuse, so no threads are needed. Every network read
+    is bounded by ``timeout`` seconds and raises ``asyncio.TimeoutError``;
+    cancelling a call closes its connection, which stops generation.
+
+    Unlike OllamaClient it talks to a single server, with no failover,
+    and connects directly: ``HTTP_PROXY``, ``HTTPS_PROXY`` and
+    ``NO_PROXY`` are ignored.
+    """
+
+    def __init__(self, base_url: Union[str, Sequence[str]] = "http://localhost:11434", model: str = "codellama",
+                 options: Optional[Dict[str, Any]] = None, timeout: float = 30.0, connect_timeout: float = 5.0,
+                 pool_size: int = 10, tags_ttl: float = 30.0, model_keep_alive: KeepAlive = None,
+                 system_prompt: bool = True, commit_options: Optional[Dict[str, Any]] = None,
+                 structured: bool = False):
+        """Initialize the async client.
+
+        ``base_url`` may be a list, as for OllamaClient, but of one server
+        only; a :class:`HostPool` of several is refused rather than
+        silently reduced to its first host.
+        """
+        if not isinstance(base_url, str):
+            hosts = list(base_url)
+            if len(hosts) != 1:
+                raise ValueError("AsyncOllamaClient talks to one Ollama server; "
+                                 "use OllamaClient to spread requests over several.")
+            base_url = hosts[0]
+        super().__init__(base_url, model, options, model_keep_alive, system_prompt, commit_options, structured)
+        url = urlsplit(self.base_url)
+        self._ssl = url.scheme == "https"
+        self._host = url.hostname or "localhost"
+        self._port = url.port or (443 if self._ssl else 80)
+        # IPv6 literals are bracketed in the Host header, as in the URL.
+        host = f"[{self._host}]" if ":" in self._host else self._host
+        self._host_header = f"{host}:{self._port}"
+        self._path_prefix = url.path.rstrip("/")
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.pool_size = pool_size
+        self.tags_ttl = tags_ttl
+        self._idle: List[_Connection] = []
+        self._tags: Optional[List[str]] = None
+        self._tags_time = 0.0
+        self._context_window: Optional[int] = None
+
+    async def close(self) -> None:
+        """Close pooled connections."""
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    async def __aenter__(self) -> "AsyncOllamaClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def is_available(self) -> bool:
+        """Check if Ollama is available."""
+        return await self._get_tags() is not None
+
+    async def list_models(self) -> list:
+        """List available models."""
+        return await self._get_tags() or []
+
+    def invalidate_tags(self) -> None:
+        """Forget cached availability and model list."""
+        self._tags = None
+        self._tags_time = 0.0
+
+    async def _get_tags(self) -> Optional[List[str]]:
+        """Return model names from /api/tags, or None if Ollama is unreachable."""
+        now = time.time()
+        if self._tags is not None and now - self._tags_time < self.tags_ttl:
+            return self._tags
+        try:
+            response = await asyncio.wait_for(self._request("GET", "/api/tags"), self.connect_timeout)
+            try:
+                if response.status != 200:
+                    return None
+                data = await response.json()
+            finally:
+                response.close()
+        except (ConnectionError, OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return None
+        self._tags = [model["name"] for model in data.get("models", [])]
+        self._tags_time = now
+        return self._tags
+
+    async def generate_commit_message(self, diff_text: str, file_summary: Dict[str, Any],
+                                      on_token: Optional[Callable[[str], None]] = None,
+                                      max_diff_length: Optional[int] = MAX_DIFF_LENGTH) -> Optional[str]:
+        """Generate commit message using Ollama (see OllamaClient.generate_commit_message)."""
+        prompt = self._create_commit_prompt(diff_text, file_summary, max_diff_length)
+        return await self._complete_commit_prompt(prompt, on_token)
+
+    async def generate_commit_message_from_summaries(self, summaries: List[str], file_summary: Dict[str, Any],
+                                                     on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """Generate commit message from per-chunk change summaries."""
+        prompt = self._create_reduce_prompt(summaries, file_summary)
+        return await self._complete_commit_prompt(prompt, on_token)
+
+    async def summarize_diff_chunk(self, chunk_text: str) -> str:
+        """Summarize one part of a large diff."""
+        return (await self.generate(self._create_chunk_prompt(chunk_text), system=CHUNK_SYSTEM,
+                                    options=SUMMARY_OPTIONS)).strip()
+
+    async def combine_summaries(self, summaries: List[str]) -> str:
+        """Merge several change summaries into one shorter summary."""
+        return (await self.generate(self._create_combine_prompt(summaries), system=COMBINE_SYSTEM,
+                                    options=SUMMARY_OPTIONS)).strip()
+
+    async def generate(self, prompt: str, system: Optional[str] = None, options: Optional[Dict[str, Any]] = None,
+                       format: Optional[Dict[str, Any]] = None) -> str:
+        """Run a prompt through /api/generate and return the raw response text (see OllamaClient.generate)."""
+        with span("ollama.generate", prompt_chars=len(prompt)):
+            response = await self._post("/api/generate",
+                                        self._generate_payload(prompt, False, system, options, format))
+            try:
+                if response.status != 200:
+                    raise Exception(f"Ollama API error: {response.status}")
+                result = await response.json()
+                record_ollama(result)
+                return result.get("response", "")
+            except asyncio.TimeoutError:
+                # A subclass of OSError since Python 3.11.
+                raise
+            except (OSError, asyncio.IncompleteReadError) as e:
+                raise Exception(f"Failed to connect to Ollama: {str(e)}")
+            finally:
+                response.close()
+
+    async def warmup(self) -> bool:
+        """Load the model into memory with an empty prompt; True if it succeeded."""
+        try:
+            response = await self._post("/api/generate", self._warmup_payload())
+            try:
+                await response.read()
+            finally:
+                response.close()
+        except Exception:
+            # Unreachable server, timeout or a failed request.
+            return False
+        return response.status == 200
+
+    async def context_window(self) -> int:
+        """Context size in tokens used for generate requests (see OllamaClient.context_window)."""
+        if self.options.get("num_ctx"):
+            return int(self.options["num_ctx"])
+        if self._context_window is None:
+            context_window = DEFAULT_CONTEXT_WINDOW
+            try:
+                response = await self._post("/api/show", {"model": self.model})
+                try:
+                    if response.status == 200:
+                        for line in (await response.json()).get("parameters", "").splitlines():
+                            parts = line.split()
+                            if len(parts) == 2 and parts[0] == "num_ctx":
+                                context_window = int(parts[1])
+                finally:
+                    response.close()
+            except (ConnectionError, OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                pass
+            self._context_window = context_window
+        return self._context_window
+
+    def stream_commit_message(self, diff_text: str, file_summary: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream commit message tokens from Ollama as they are generated.
+
+        Close the iterator with ``aclose()`` when stopping early.
+        """
+        prompt = self._create_commit_prompt(diff_text, file_summary)
+        return self._stream_generate(prompt, **self._commit_request())
+
+    async def _complete_commit_prompt(self, prompt: str, on_token: Optional[Callable[[str], None]]) -> Optional[str]:
+        """Run a commit message prompt, streaming if ``on_token`` is given or the answer is structured."""
+        if self.structured:
+            message = self._structured_message(await self._stream_subject(prompt, None))
+            if on_token is not None and message is not None:
+                on_token(message)
+            return message
+        if on_token is not None:
+            return self._clean_commit_message(await self._stream_subject(prompt, on_token))
+        return self._clean_commit_message((await self.generate(prompt, **self._commit_request())).strip())
+
+    async def _stream_generate(self, prompt: str, system: Optional[str] = None,
+                               options: Optional[Dict[str, Any]] = None,
+                               format: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Yield response tokens from the NDJSON stream of /api/generate."""
+        response = await self._post("/api/generate", self._generate_payload(prompt, True, system, options, format))
+        try:
+            if response.status != 200:
+                raise Exception(f"Ollama API error: {response.status}")
+            async for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise Exception(f"Ollama API error: {chunk['error']}")
+                token = chunk.get("response", "")
+                if token:
+                    yield token
+                if chunk.get("done"):
+                    record_ollama(chunk)
+        except asyncio.TimeoutError:
+            # A subclass of OSError since Python 3.11.
+            raise
+        except (OSError, asyncio.IncompleteReadError) as e:
+            raise Exception(f"Failed to connect to Ollama: {str(e)}")
+        finally:
+            response.close()
+
+    async def _stream_subject(self, prompt: str, on_token: Optional[Callable[[str], None]]) -> str:
+        """Stream a commit message until its subject line, or its JSON object, is complete."""
+        text = ""
+        with span("ollama.stream", prompt_chars=len(prompt)) as current:
+            tokens = self._stream_generate(prompt, **self._commit_request())
+            try:
+                async for token in tokens:
+                    if current is not None and not text:
+                        annotate(first_token_ms=round(current.duration * 1000, 3))
+                    text += token
+                    if self.structured:
+                        if self._answer_complete(text):
+                            break
+                        continue
+                    head = self._subject_head(text, token)
+                    if on_token is not None:
+                        on_token(token if head is None else head)
+                    if head is not None:
+                        break
+            finally:
+                await tokens.aclose()
+        return text
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> _Response:
+        """POST JSON, mapping connection failures to ConnectionError."""
+        try:
+            return await self._request("POST", path, payload)
+        except ConnectionError:
+            self.invalidate_tags()
+            raise
+
+    async def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> _Response:
+        """Send a request on a pooled connection and read the response head."""
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        head = (f"{method} {self._path_prefix}{path} HTTP/1.1\r\n"
+                f"Host: {self._host_header}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n").encode("ascii")
+        while True:
+            reused = bool(self._idle)
+            connection = self._idle.pop() if reused else await self._connect()
+            try:
+                connection.writer.write(head + body)
+                await self._read(connection.writer.drain())
+                status_line = await self._read(connection.reader.readline())
+                if not status_line:
+                    raise ConnectionResetError("Connection closed by server")
+                headers = {}
+                while True:
+                    line = (await self._read(connection.reader.readline())).decode("latin-1").strip()
+                    if not line:
+                        break
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+            except asyncio.TimeoutError:
+                connection.close()
+                raise
+            except (OSError, asyncio.IncompleteReadError) as e:
+                connection.close()
+                # An idle connection the server has since closed: retry on a new one.
+                if reused:
+                    continue
+                raise Exception(f"Failed to connect to Ollama: {str(e)}")
+            except BaseException:
+                connection.close()
+                raise
+            return _Response(self, connection, int(status_line.split()[1]), headers)
+
+    async def _connect(self) -> _Connection:
+        """Open a new connection to the server."""
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self._host, self._port, ssl=self._ssl or None), self.connect_timeout)
+        except (OSError, asyncio.TimeoutError):
+            self.invalidate_tags()
+            raise ConnectionError(UNAVAILABLE_MESSAGE)
+        return _Connection(reader, writer)
+
+    def _release(self, connection: _Connection, keep_alive: bool) -> None:
+        """Return a connection to the pool after its response was read."""
+        if keep_alive and len(self._idle) < self.pool_size:
+            self._idle.append(connection)
+        else:
+            connection.close()
+
+    async def _read(self, awaitable):
+        """Await a network read, bounded by the client timeout."""
+        return await asyncio.wait_for(awaitable, self.timeout)
@@ -0,0 +1,162 @@
+"""Asyncio commit message generator."""
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Optional, Dict, Any, Callable, List, Tuple
+from .async_client import AsyncOllamaClient
+from .cache import BlobCache, MessageCache
+from .client_base import UNAVAILABLE_MESSAGE
+from .compaction import DiffCompactor
+from .git_analyzer import FileChange, GitAnalyzer
+from .profiling import annotate, bind, span
+from .summarize import AsyncDiffSummarizer
+
+
+class AsyncCommitGenerator:
+    """Asyncio counterpart of CommitGenerator.
+
+    Git and cache access run in ``executor`` (the loop's default executor
+    if None), so the event loop is never blocked on the repository.
+    """
+
+    def __init__(self, repo_path: str = ".", ollama_url: str = "http://localhost:11434", model: str = "codellama",
+                 ollama_client: Optional[AsyncOllamaClient] = None, cache: Optional[MessageCache] = None,
+                 map_reduce: bool = True, max_workers: int = 4, compactor: Optional[DiffCompactor] = None,
+                 git_backend: str = "gitpython", executor: Optional[Executor] = None,
+                 blob_cache: Optional[BlobCache] = None, **client_options: Any):
+        """Initialize AsyncCommitGenerator (see CommitGenerator for the options).
+
+        The repository is opened on first use, in the executor.
+        """
+        self.repo_path = repo_path
+        self.git_backend = git_backend
+        self.ollama_client = ollama_client or AsyncOllamaClient(ollama_url, model, **client_options)
+        self.cache = cache
+        self.map_reduce = map_reduce
+        self.max_workers = max_workers
+        self.compactor = compactor or DiffCompactor()
+        self.blob_cache = blob_cache
+        self.executor = executor
+        self.git_analyzer: Optional[GitAnalyzer] = None
+
+    async def generate(self, on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Generate commit message for staged changes.
+
+        The staged diff is read while Ollama's availability is checked, so
+        the check costs no extra time. Cancelling the call stops generation.
+        """
+        with span("generate"):
+            return await self._generate(on_token)
+
+    async def _generate(self, on_token: Optional[Callable[[str], None]]) -> Dict[str, Any]:
+        """Body of generate()."""
+        available = asyncio.ensure_future(self.ollama_client.is_available())
+        try:
+            try:
+                staged = await self._in_executor(self._read_staged)
+            except Exception as e:
+                return {"success": False, "error": str(e), "commit_message": None}
+            if staged is None:
+                return {
+                    "success": False,
+                    "error": "No staged changes found. Use 'git add' to stage files first.",
+                    "commit_message": None
+                }
+            changes, combined_summary, digest = staged
+            if not await available:
+                return {"success": False, "error": UNAVAILABLE_MESSAGE, "commit_message": None}
+
+            cache_key = None
+            commit_message = None
+            if self.cache is not None:
+                cache_key = self.ollama_client.cache_key(digest)
+                commit_message = await self._in_executor(self.cache.get, cache_key)
+            cached = commit_message is not None
+
+            if not cached:
+                commit_message = await self._generate_message(changes, combined_summary, on_token)
+                if commit_message and cache_key is not None:
+                    await self._in_executor(self.cache.put, cache_key, commit_message)
+
+            if not commit_message:
+                return {
+                    "success": False,
+                    "error": "Failed to generate commit message",
+                    "commit_message": None
+                }
+
+            return {
+                "success": True,
+                "error": None,
+                "commit_message": commit_message,
+                "staged_files": combined_summary["staged_files"],
+                "file_summary": {key: combined_summary[key] for key in ("added", "modified", "deleted")},
+                "cached": cached
+            }
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "commit_message": None
+            }
+        finally:
+            available.cancel()
+
+    async def get_models(self) -> list:
+        """Get available Ollama models."""
+        return await self.ollama_client.list_models()
+
+    async def validate_setup(self) -> Dict[str, Any]:
+        """Validate the setup (git repo, ollama availability), checking both at once."""
+        validation = {
+            "git_repo": False,
+            "staged_changes": False,
+            "ollama_available": False,
+            "models": []
+        }
+        staged, available = await asyncio.gather(
+            self._in_executor(self._read_staged), self.ollama_client.is_available(), return_exceptions=True)
+        if not isinstance(staged, BaseException):
+            validation["git_repo"] = True
+            validation["staged_changes"] = staged is not None
+        if available is True:
+            validation["ollama_available"] = True
+            validation["models"] = await self.ollama_client.list_models()
+        return validation
+
+    def _read_staged(self) -> Optional[Tuple[List[FileChange], Dict[str, Any], str]]:
+        """Read the index; runs in the executor. Returns None if nothing is staged."""
+        if self.git_analyzer is None:
+            self.git_analyzer = GitAnalyzer(self.repo_path, backend=self.git_backend)
+        self.git_analyzer.refresh()
+        if not self.git_analyzer.has_staged_changes():
+            return None
+        repo_info = self.git_analyzer.get_repository_info()
+        file_summary = self.git_analyzer.get_file_changes_summary()
+        snapshot = self.git_analyzer.snapshot
+        return snapshot.changes, {**repo_info, **file_summary}, snapshot.digest()
+
+    async def _generate_message(self, changes: List[FileChange], summary: Dict[str, Any],
+                                on_token: Optional[Callable[[str], None]]) -> Optional[str]:
+        """Ask the model for a message, summarizing the diff first if it does not fit."""
+        with span("compact"):
+            compacted = await self._in_executor(self.compactor.compact, changes)
+            annotate(complete=compacted.complete)
+        if self.map_reduce and not compacted.complete:
+            summarizer = AsyncDiffSummarizer(self.ollama_client, max_workers=self.max_workers,
+                                             context_window=await self.ollama_client.context_window(),
+                                             compactor=self.compactor, blob_cache=self.blob_cache)
+            with span("compact", budget="chunk"):
+                compacted = await self._in_executor(summarizer.compact_to_chunk, changes)
+                annotate(complete=compacted.complete)
+            if not compacted.complete:
+                return await summarizer.summarize(changes, summary, on_token=on_token)
+        return await self.ollama_client.generate_commit_message(compacted.text, summary, on_token=on_token,
+                                                                max_diff_length=None)
+
+    async def _in_executor(self, func: Callable, *args: Any) -> Any:
+        """Run a blocking call in the executor, in this task's context."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, bind(func), *args)
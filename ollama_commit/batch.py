@@ -0,0 +1,197 @@
+"""Generate commit messages for many repositories or commits at once."""
+
+import os
+import subprocess
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+from .cache import BlobCache, MessageCache
+from .commit_generator import generate_message
+from .compaction import DiffCompactor
+from .git_analyzer import FileChange, GitAnalyzer, MAX_FILE_PATCH_BYTES, StagedSnapshot
+from .ollama_client import OllamaClient
+
+# Ollama serves this many requests per model at once by default.
+DEFAULT_NUM_PARALLEL = 4
+
+
+def default_concurrency() -> int:
+    """Concurrent requests the server handles, from ``OLLAMA_NUM_PARALLEL``."""
+    try:
+        return max(1, int(os.environ.get("OLLAMA_NUM_PARALLEL", DEFAULT_NUM_PARALLEL)))
+    except ValueError:
+        return DEFAULT_NUM_PARALLEL
+
+
+@dataclass
+class BatchJob:
+    """The staged changes of a repository, or one of its commits."""
+
+    repo_path: str
+    commit: Optional[str] = None
+
+
+@dataclass
+class ExtractedDiff:
+    """Changes read by a worker process, ready to be sent to the model."""
+
+    job: BatchJob
+    changes: List[FileChange] = field(default_factory=list)
+    summary: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+def repo_jobs(repo_paths: Iterable[str]) -> Iterator[BatchJob]:
+    """One job per repository, for its staged changes."""
+    for repo_path in repo_paths:
+        yield BatchJob(repo_path)
+
+
+def commit_range_jobs(repo_path: str, commit_range: str, git: str = "git") -> List[BatchJob]:
+    """One job per commit in ``commit_range``, oldest first."""
+    try:
+        result = subprocess.run(
+            [git, "rev-list", "--reverse", commit_range, "--"],
+            cwd=repo_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True,
+        )
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"Invalid commit range {commit_range}: {e.stderr.decode('utf-8', errors='ignore').strip()}")
+    return [BatchJob(repo_path, sha) for sha in result.stdout.decode("utf-8").split()]
+
+
+# The analyzer of the repository a worker process read last. Jobs for a
+# commit range all hit the same repository, so its git processes stay open.
+_worker_analyzer: Optional[GitAnalyzer] = None
+_worker_key: Optional[tuple] = None
+
+
+def _worker_analyzer_for(repo_path: str, git_backend: str, max_file_bytes: int) -> GitAnalyzer:
+    """Reuse the worker's analyzer when the job is for the same repository."""
+    global _worker_analyzer, _worker_key
+    key = (repo_path, git_backend, max_file_bytes)
+    if _worker_key != key:
+        if _worker_analyzer is not None:
+            _worker_analyzer.close()
+            _worker_analyzer = None
+        _worker_analyzer = GitAnalyzer(repo_path, max_file_bytes, backend=git_backend)
+        _worker_key = key
+    return _worker_analyzer
+
+
+def extract(job: BatchJob, git_backend: str = "gitpython", max_file_bytes: int = MAX_FILE_PATCH_BYTES) -> ExtractedDiff:
+    """Read the changes for a job. Runs in a worker process."""
+    try:
+        analyzer = _worker_analyzer_for(job.repo_path, git_backend, max_file_bytes)
+        if job.commit is None:
+            analyzer.refresh()
+            if not analyzer.has_staged_changes():
+                return ExtractedDiff(job, error="No staged changes found. Use 'git add' to stage files first.")
+            summary = {**analyzer.get_repository_info(), **analyzer.get_file_changes_summary()}
+            return ExtractedDiff(job, analyzer.snapshot.changes, summary)
+        snapshot = analyzer.commit_snapshot(job.commit)
+        if snapshot.is_empty():
+            return ExtractedDiff(job, error=f"Commit {job.commit} has no changes.")
+        summary = {
+            "name": os.path.basename(analyzer.backend.working_dir),
+            "staged_files": snapshot.files,
+            "has_staged_changes": True,
+            **snapshot.summary(),
+        }
+        return ExtractedDiff(job, snapshot.changes, summary)
+    except Exception as e:
+        return ExtractedDiff(job, error=str(e))
+
+
+class BatchGenerator:
+    """Generates commit messages for many jobs with a bounded pipeline.
+
+    Diffs are read in a process pool, each worker keeping one GitAnalyzer,
+    while a thread pool sends at most ``concurrency`` requests to Ollama.
+    Only a bounded number of jobs is in flight, so arbitrarily long job
+    lists run in constant memory.
+    """
+
+    def __init__(self, client: OllamaClient, cache: Optional[MessageCache] = None,
+                 compactor: Optional[DiffCompactor] = None, map_reduce: bool = True,
+                 processes: Optional[int] = None, concurrency: Optional[int] = None,
+                 git_backend: str = "gitpython", max_file_bytes: int = MAX_FILE_PATCH_BYTES,
+                 blob_cache: Optional[BlobCache] = None):
+        """Initialize BatchGenerator.
+
+        ``concurrency`` defaults to the server's ``OLLAMA_NUM_PARALLEL``;
+        requests beyond it would only queue on the server. ``processes``
+        defaults to the number of CPUs. ``blob_cache`` reuses per-file
+        summaries of large diffs, e.g. across commits of a range.
+        """
+        self.client = client
+        self.cache = cache
+        self.compactor = compactor or DiffCompactor()
+        self.map_reduce = map_reduce
+        self.processes = processes or os.cpu_count() or 1
+        self.concurrency = concurrency or default_concurrency()
+        self.git_backend = git_backend
+        self.max_file_bytes = max_file_bytes
+        self.blob_cache = blob_cache
+
+    def run(self, jobs: Iterable[BatchJob]) -> Iterator[Dict[str, Any]]:
+        """Yield one result per job, in completion order."""
+        jobs = iter(jobs)
+        window = self.concurrency * 2 + self.processes
+        pending: Set[Future] = set()
+        with ProcessPoolExecutor(self.processes) as processes, ThreadPoolExecutor(self.concurrency) as threads:
+            while True:
+                while len(pending) < window:
+                    job = next(jobs, None)
+                    if job is None:
+                        break
+                    pending.add(processes.submit(extract, job, self.git_backend, self.max_file_bytes))
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if isinstance(result, ExtractedDiff):
+                        pending.add(threads.submit(self._generate, result))
+                    else:
+                        yield result
+
+    def _generate(self, extracted: ExtractedDiff) -> Dict[str, Any]:
+        """Generate the message for one extracted diff."""
+        result = {
+            "repo": extracted.job.repo_path,
+            "commit": extracted.job.commit,
+            "success": False,
+            "error": extracted.error,
+            "commit_message": None,
+        }
+        if extracted.error is not None:
+            return result
+        try:
+            cache_key = None
+            commit_message = None
+            if self.cache is not None:
+                cache_key = self.client.cache_key(StagedSnapshot(extracted.changes).digest())
+                commit_message = self.cache.get(cache_key)
+            cached = commit_message is not None
+            if not cached:
+                # Chunks are summarized one at a time so that a job never
+                # holds more than one of the ``concurrency`` request slots.
+                commit_message = generate_message(self.client, extracted.changes, extracted.summary,
+                                                  self.compactor, self.map_reduce, max_workers=1,
+                                                  blob_cache=self.blob_cache)
+                if commit_message and cache_key is not None:
+                    self.cache.put(cache_key, commit_message)
+            if not commit_message:
+                result["error"] = "Failed to generate commit message"
+                return result
+            summary = extracted.summary
+            result.update({
+                "success": True,
+                "commit_message": commit_message,
+                "staged_files": summary["staged_files"],
+                "file_summary": {key: summary[key] for key in ("added", "modified", "deleted")},
+                "cached": cached,
+            })
+        except Exception as e:
+            result["error"] = str(e)
+        return result
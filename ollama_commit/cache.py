@@ -0,0 +1,127 @@
+"""On-disk cache of generated commit messages."""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+
+class MessageCache:
+    """Content-addressed store of commit messages, one JSON file per key."""
+
+    def __init__(self, directory: Union[str, Path], max_entries: int = 256, max_age: float = 7 * 24 * 3600,
+                 max_bytes: Optional[int] = None):
+        """Initialize MessageCache.
+
+        Entries older than ``max_age`` seconds are ignored and removed, and
+        the oldest entries are evicted once more than ``max_entries`` exist
+        or, if ``max_bytes`` is set, once they take more than that in total.
+        """
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the entry stored for key, or None if missing or expired."""
+        path = self._path(key)
+        try:
+            with open(path, 'r') as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("time", 0) > self.max_age:
+            self._remove(path)
+            return None
+        return entry
+
+    def _write(self, key: str, entry: Dict[str, Any]) -> bool:
+        """Atomically store entry for key; returns False if it could not be written."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.directory / f".{key}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as cache_file:
+                json.dump({**entry, "time": time.time()}, cache_file)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            return False
+        return True
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached message for key, or None on a miss."""
+        entry = self._read(key)
+        return entry.get("message") if entry is not None else None
+
+    def put(self, key: str, message: str) -> None:
+        """Store a message and evict old entries."""
+        if self._write(key, {"message": message}):
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove expired entries and trim the cache to max_entries and max_bytes."""
+        now = time.time()
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age:
+                self._remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        excess = max(0, len(entries) - self.max_entries)
+        total = sum(size for _, size, _ in entries[excess:])
+        if self.max_bytes is not None:
+            while excess < len(entries) and total > self.max_bytes:
+                total -= entries[excess][1]
+                excess += 1
+        for _, _, path in entries[:excess]:
+            self._remove(path)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        for path in self.directory.glob("*.json"):
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+class BlobCache(MessageCache):
+    """Per-file compacted patches and summaries, keyed by the file's blob SHAs.
+
+    Re-staging one file changes only that file's key, so a later run
+    summarizes just the files that changed (see DiffSummarizer). Entries
+    hold whole compacted patches, so unlike messages they are also capped
+    by their total size.
+    """
+
+    def __init__(self, directory: Union[str, Path], max_entries: int = 4096, max_age: float = 7 * 24 * 3600,
+                 max_bytes: Optional[int] = 64 * 1024 * 1024):
+        """Initialize BlobCache; see MessageCache for the eviction parameters."""
+        super().__init__(directory, max_entries, max_age, max_bytes)
+
+    def get_file(self, key: str) -> Optional[Tuple[str, str]]:
+        """Return the cached (compacted patch, summary) for key, or None on a miss."""
+        entry = self._read(key)
+        if entry is None or "summary" not in entry:
+            return None
+        return entry.get("patch", ""), entry["summary"]
+
+    def put_files(self, entries: Dict[str, Tuple[str, str]]) -> None:
+        """Store (compacted patch, summary) pairs by key, then evict old entries once."""
+        stored = False
+        for key, (patch, summary) in entries.items():
+            stored = self._write(key, {"patch": patch, "summary": summary}) or stored
+        if stored:
+            self.evict()
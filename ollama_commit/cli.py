@@ -2,9 +2,114 @@
 
 import argparse
 import sys
-from .commit_generator import CommitGenerator
-from .config import setup_config, get_config
-from .ollama_client import OllamaClient
+from typing import Optional
+from .config import (
+    setup_config, get_config, model_config, TAGS_CACHE_FILE, MESSAGE_CACHE_DIR, BLOB_CACHE_DIR, HISTORY_DIR, PREGENERATED_DIR,
+    WARMUP_STAMP_FILE, DAEMON_SOCKET_FILE,
+)
+
+# Heavy modules (requests, GitPython) are imported inside the subcommands
+# that need them so that fast commands and git hooks start quickly.
+
+HTTP_OPTIONS = ('pool_size', 'keep_alive', 'max_retries', 'backoff_factor', 'tags_ttl',
+                'routing', 'failure_threshold', 'cooldown', 'model_keep_alive', 'system_prompt', 'structured')
+
+
+def client_options(config: dict) -> dict:
+    """Pick the client options set in the ollama config section."""
+    options = {key: config[key] for key in HTTP_OPTIONS if key in config}
+    options['tags_cache_path'] = TAGS_CACHE_FILE
+    generation = dict(config.get('options') or {})
+    if 'num_ctx' in config:
+        generation['num_ctx'] = config['num_ctx']
+    if generation:
+        options['options'] = generation
+    commit = {key: config[key] for key in ('num_predict', 'stop') if key in config}
+    if commit:
+        options['commit_options'] = commit
+    return options
+
+
+def ollama_hosts(config: dict) -> list:
+    """Servers to send requests to: the ``hosts`` list if set, else ``host``."""
+    return list(config.get('hosts') or [config['host']])
+
+
+def print_host_status(statuses: list, indent: str = "  ") -> None:
+    """Print the availability of each configured server."""
+    print(f"{indent[2:]}Ollama hosts:")
+    for status in statuses:
+        if status['available']:
+            detail = f"{len(status['models'])} models"
+            if status['latency_ms'] is not None:
+                detail += f", {status['latency_ms']} ms"
+        else:
+            detail = "unreachable"
+        if status['circuit_open']:
+            detail += ", circuit open"
+        print(f"{indent}{'✓' if status['available'] else '✗'} {status['host']} ({detail})")
+
+
+def generator_options(config: dict, git_config: Optional[dict] = None) -> dict:
+    """Pick the CommitGenerator options set in the ollama and git config sections."""
+    options = client_options(config)
+    if git_config and 'backend' in git_config:
+        options['git_backend'] = git_config['backend']
+    options.update({key: config[key] for key in ('map_reduce', 'max_workers', 'pipeline', 'history_examples')
+                    if key in config})
+    if git_config and (git_config.get('subtrees') or git_config.get('scope_patterns')):
+        from .grouping import DEFAULT_MAX_GROUPS, ScopeGrouper
+        options['grouper'] = ScopeGrouper(git_config.get('subtrees') or (), git_config.get('scope_patterns'),
+                                          git_config.get('max_groups', DEFAULT_MAX_GROUPS))
+    compaction = {key: config[key] for key in ('token_budget', 'context_lines') if key in config}
+    if compaction:
+        from .compaction import DiffCompactor
+        options['compactor'] = DiffCompactor(**compaction)
+    return options
+
+
+def blob_cache(config: dict, no_cache: bool = False):
+    """Per-file summary cache, unless disabled by ``--no-cache`` or ``blob_cache: false``."""
+    if no_cache or not config.get('blob_cache', True):
+        return None
+    from .cache import BlobCache
+    return BlobCache(BLOB_CACHE_DIR)
+
+
+def history_index(config: dict, repo: str):
+    """The repository's commit history index for examples in prompts, or None.
+
+    None unless ``index-history`` has been run at all, numpy is installed
+    and ``history_examples`` is not 0.
+    """
+    import importlib.util
+    if not config.get('history_examples', 3) or not HISTORY_DIR.exists() or not importlib.util.find_spec('numpy'):
+        return None
+    from .history import DEFAULT_EMBEDDING_MODEL, HistoryIndex
+    try:
+        return HistoryIndex.for_repo(HISTORY_DIR, repo, config.get('embedding_model', DEFAULT_EMBEDDING_MODEL))
+    except Exception:
+        # Not a repository; msg reports that itself.
+        return None
+
+
+def generate_once(full_config: dict, repo: str) -> dict:
+    """Generate a message for repo's staged changes, in the daemon if one is running."""
+    config = model_config(full_config['ollama'])
+    if DAEMON_SOCKET_FILE.exists():
+        import os
+        from .daemon import GENERATE_TIMEOUT, request
+        result = request(DAEMON_SOCKET_FILE, {"command": "generate", "repo": os.path.abspath(repo),
+                                              "config": full_config, "no_cache": False, "stream": False},
+                         timeout=GENERATE_TIMEOUT)
+        if result is not None:
+            return result
+    from .cache import MessageCache
+    from .commit_generator import CommitGenerator
+    generator = CommitGenerator(repo, ollama_hosts(config), config['model'], cache=MessageCache(MESSAGE_CACHE_DIR),
+                                blob_cache=blob_cache(config), history=history_index(config, repo),
+                                **generator_options(config, full_config.get('git') or {}))
+    return generator.generate()
 
 
 def main():
@@ -25,13 +130,63 @@ def main():
     commit = subparsers.add_parser("msg", help="Generate commit message for staged files")
     commit.add_argument('--commit', '-c', help="Automatically commit with the generated message")
     commit.add_argument('--repo', '-r', default='.', help='Git repository path (default: current directory)')
+    commit.add_argument('--no-stream', action='store_true', help="Wait for the full response instead of streaming it")
+    commit.add_argument('--no-cache', action='store_true', help="Always generate a new message instead of reusing a cached one")
+    commit.add_argument('--no-daemon', action='store_true', help="Generate in this process even if `ollama-commit serve` is running")
+    commit.add_argument('--profile', action='store_true', help="Print how long each phase took")
+    commit.add_argument('--profile-json', metavar='FILE', help="Write phase timings as JSON to FILE ('-' for stdout, instead of the message)")
+    commit.add_argument('--otel', action='store_true', help="Emit phases as OpenTelemetry spans (needs opentelemetry-api)")
+
+    serve = subparsers.add_parser("serve", help="Run a local daemon that keeps repositories and connections warm for msg")
+    serve.add_argument('--socket', default=str(DAEMON_SOCKET_FILE), help=f"Unix socket to listen on (default: {DAEMON_SOCKET_FILE})")
+    serve.add_argument('--stop', action='store_true', help="Stop the daemon listening on the socket")
+
+    batch = subparsers.add_parser("batch", help="Generate commit messages for many repositories or a commit range as NDJSON")
+    batch.add_argument('repos', nargs='*', help="Repositories whose staged changes to describe (default: read paths from stdin)")
+    batch.add_argument('--range', dest='commit_range', help="Describe each commit in this range of --repo instead, e.g. main..feature")
+    batch.add_argument('--repo', '-r', default='.', help='Git repository path for --range (default: current directory)')
+    batch.add_argument('--jobs', '-j', type=int, help="Processes reading diffs (default: number of CPUs)")
+    batch.add_argument('--concurrency', type=int, help="Concurrent Ollama requests (default: num_parallel config, OLLAMA_NUM_PARALLEL or 4)")
+    batch.add_argument('--no-cache', action='store_true', help="Always generate new messages instead of reusing cached ones")
+
+    warmup = subparsers.add_parser("warmup", help="Load the model into memory ahead of generating")
+    warmup.add_argument('--repo', '-r', default='.', help='Git repository path (default: current directory)')
+    warmup.add_argument('--background', action='store_true',
+                        help="Warm up in a detached process and return at once, unless one ran recently (for hooks)")
+    warmup.add_argument('--install-hook', action='store_true',
+                        help="Install a post-index-change hook that warms the model whenever files are staged")
+    warmup.add_argument('--force', action='store_true', help="Replace an existing hook with --install-hook")
+
+    history = subparsers.add_parser("index-history", help="Index past commit messages so msg can show similar ones to the model")
+    history.add_argument('--repo', '-r', default='.', help='Git repository path (default: current directory)')
+    history.add_argument('--rebuild', action='store_true', help="Embed every commit again instead of only new ones")
+    history.add_argument('--jobs', '-j', type=int, default=4, help="Concurrent embedding requests (default: 4)")
+
+    install_hook = subparsers.add_parser("install-hook",
+                                         help="Install hooks that fill in `git commit` messages generated while files are staged")
+    install_hook.add_argument('--repo', '-r', default='.', help='Git repository path (default: current directory)')
+    install_hook.add_argument('--force', action='store_true', help="Replace existing hooks not written by ollama-commit")
+
+    pregenerate = subparsers.add_parser("pregenerate", help="Generate a message for the staged changes for the commit hook")
+    pregenerate.add_argument('--repo', '-r', default='.', help='Git repository path (default: current directory)')
+    pregenerate.add_argument('--background', action='store_true', help="Generate in a detached process and return at once")
+
+    prepare = subparsers.add_parser("prepare-commit-msg", help="Run by the prepare-commit-msg hook")
+    prepare.add_argument('file', help="Commit message file")
+    prepare.add_argument('source', nargs='?', default='', help="Source of the message, as passed by git")
+    prepare.add_argument('sha', nargs='?', help=argparse.SUPPRESS)
+    # Git runs hooks at the top of the work tree; the repository's config
+    # may set the model, which must match the pregenerate worker's key.
+    prepare.add_argument('--repo', '-r', default='.', help='Git repository path (default: current directory)')
 
     validate = subparsers.add_parser("validate", help="Validate setup and configuration")
     validate.add_argument('--repo', '-r', default='.', help='Git repository path (default: current directory)')
     
     args = parser.parse_args()
 
-    config = get_config()['ollama']
+    full_config = get_config(getattr(args, 'repo', None))
+    config = model_config(full_config['ollama'])
+    git_config = full_config.get('git') or {}
     
     try:
         if args.command == "setup":
@@ -39,16 +194,19 @@ def main():
             return
     
         elif args.command == "config":
-            print(f"Current configuration:\n  Host: {config['host']}\n  Model: {config['model']}")
+            print(f"Current configuration:\n  Host: {', '.join(ollama_hosts(config))}\n  Model: {config['model']}")
             return
 
         elif args.command == "models":
             if args.host:
-                host = args.host
+                hosts = [args.host]
             else:
-                host = config['host']
-            client = OllamaClient(host)
+                hosts = ollama_hosts(config)
+            from .ollama_client import OllamaClient
+            client = OllamaClient(hosts, **client_options(config))
             models = client.list_models()
+            if len(hosts) > 1:
+                print_host_status(client.host_status())
             if models:
                 print("Available Ollama models:")
                 for m in models:
@@ -57,25 +215,215 @@ def main():
                 print("No models found or Ollama not available.")
             return
 
+        elif args.command == "warmup":
+            from .warmup import DEFAULT_WARMUP_INTERVAL, install_warmup_hook, mark_warmup, spawn_warmup, warmup_due
+            if args.install_hook:
+                path = install_warmup_hook(args.repo, force=args.force)
+                print(f"Installed {path}")
+                return
+            if args.background:
+                if warmup_due(WARMUP_STAMP_FILE, config.get('warmup_interval', DEFAULT_WARMUP_INTERVAL)):
+                    mark_warmup(WARMUP_STAMP_FILE)
+                    spawn_warmup(args.repo)
+                return
+            from .ollama_client import OllamaClient
+            mark_warmup(WARMUP_STAMP_FILE)
+            client = OllamaClient(ollama_hosts(config), config['model'], **client_options(config))
+            if not client.warmup():
+                print(f"Error: could not load {config['model']}", file=sys.stderr)
+                sys.exit(1)
+            print(f"Model {config['model']} loaded.")
+            return
+
+        elif args.command == "install-hook":
+            from .hooks import install_commit_hooks
+            for path in install_commit_hooks(args.repo, force=args.force):
+                print(f"Installed {path}")
+            return
+
+        elif args.command == "pregenerate":
+            from .warmup import spawn_detached
+            if args.background:
+                spawn_detached("pregenerate", args.repo)
+                return
+            import time
+            from .hooks import DEFAULT_SETTLE, PregeneratedMessages, staged_key
+            # Let a series of `git add`s finish; their workers then agree on one key.
+            time.sleep(float(config.get('hook_settle', DEFAULT_SETTLE)))
+            key = staged_key(args.repo, config['model'])
+            messages = PregeneratedMessages(PREGENERATED_DIR)
+            if key is None or messages.get(key) is not None or not messages.claim(key):
+                return
+            try:
+                result = generate_once(full_config, args.repo)
+                if result["success"]:
+                    messages.put(key, result["commit_message"])
+            finally:
+                messages.release(key)
+            return
+
+        elif args.command == "prepare-commit-msg":
+            import time
+            from .hooks import DEFAULT_HOOK_DEADLINE, PregeneratedMessages, prepend_message, staged_key
+            deadline = time.monotonic() + float(config.get('hook_deadline', DEFAULT_HOOK_DEADLINE))
+            if args.source not in ('', 'template'):
+                return
+            key = staged_key(args.repo, config['model'])
+            message = PregeneratedMessages(PREGENERATED_DIR).wait(key, deadline) if key else None
+            if message:
+                prepend_message(args.file, message)
+            return
+
         elif args.command == "validate":
-            generator = CommitGenerator(args.repo, config['host'], config['model'])
+            from .commit_generator import CommitGenerator
+            generator = CommitGenerator(args.repo, ollama_hosts(config), config['model'],
+                                        **generator_options(config, git_config))
             validation = generator.validate_setup()
             print("Setup validation:")
             print(f"  Git repository: {'✓' if validation['git_repo'] else '✗'}")
             print(f"  Staged changes: {'✓' if validation['staged_changes'] else '✗'}")
             print(f"  Ollama available: {'✓' if validation['ollama_available'] else '✗'}")
+            if len(validation['hosts']) > 1:
+                print_host_status(validation['hosts'], indent="    ")
             if validation['models']:
                 print(f"  Available models: {', '.join(validation['models'])}")
             return
 
+        elif args.command == "batch":
+            import json
+            from .batch import BatchGenerator, commit_range_jobs, default_concurrency, repo_jobs
+            from .cache import MessageCache
+            from .ollama_client import OllamaClient
+            if args.commit_range:
+                jobs = commit_range_jobs(args.repo, args.commit_range)
+            else:
+                jobs = repo_jobs(args.repos or (line.strip() for line in sys.stdin if line.strip()))
+            hosts = ollama_hosts(config)
+            # num_parallel is per server; each host serves that many at once.
+            concurrency = args.concurrency or (config.get('num_parallel') or default_concurrency()) * len(hosts)
+            options = client_options(config)
+            # Keep a pooled connection for every request slot.
+            options['pool_size'] = max(concurrency, options.get('pool_size', 10))
+            batch_options = generator_options(config, git_config)
+            batch = BatchGenerator(OllamaClient(hosts, config['model'], **options),
+                                   cache=None if args.no_cache else MessageCache(MESSAGE_CACHE_DIR),
+                                   compactor=batch_options.get('compactor'),
+                                   map_reduce=batch_options.get('map_reduce', True),
+                                   processes=args.jobs, concurrency=concurrency,
+                                   git_backend=batch_options.get('git_backend', 'gitpython'),
+                                   blob_cache=blob_cache(config, args.no_cache))
+            failed = 0
+            for result in batch.run(jobs):
+                failed += not result['success']
+                print(json.dumps(result), flush=True)
+            if failed:
+                sys.exit(1)
+            return
+
+        elif args.command == "index-history":
+            import time
+            from .history import DEFAULT_EMBEDDING_MODEL, HistoryIndex
+            from .ollama_client import OllamaClient
+            model = config.get('embedding_model', DEFAULT_EMBEDDING_MODEL)
+            index = HistoryIndex.for_repo(HISTORY_DIR, args.repo, model)
+            options = client_options(config)
+            options['pool_size'] = max(args.jobs, options.get('pool_size', 10))
+            started = time.perf_counter()
+
+            def show_progress(done, total):
+                print(f"\rEmbedded {done}/{total} commits", end="", file=sys.stderr, flush=True)
+
+            with OllamaClient(ollama_hosts(config), config['model'], **options) as client:
+                added = index.update(client, args.repo, model, rebuild=args.rebuild, workers=args.jobs,
+                                     on_progress=show_progress)
+            if added:
+                print(file=sys.stderr)
+            print(f"Indexed {added} new commits ({len(index)} total) with {model} "
+                  f"in {time.perf_counter() - started:.1f}s")
+            return
+
+        elif args.command == "serve":
+            from .daemon import CommitDaemon, request
+            if args.stop:
+                if request(args.socket, {"command": "shutdown"}, timeout=5) is None:
+                    print("No daemon is running.")
+                return
+            print(f"Listening on {args.socket}")
+            try:
+                CommitDaemon(args.socket, cache_dir=MESSAGE_CACHE_DIR, blob_cache_dir=BLOB_CACHE_DIR).serve_forever()
+            except KeyboardInterrupt:
+                pass
+            return
+
         elif args.command == "msg":
-            generator = CommitGenerator(args.repo, config['host'], config['model'])
-            # Generate commit message
-            result = generator.generate()
+            streamed = []
+            # With `--profile-json -` stdout carries the report only, so it can be piped.
+            json_to_stdout = args.profile_json == "-"
+
+            def show_token(token):
+                if json_to_stdout:
+                    return
+                if not streamed:
+                    print("Generating commit message:\n  ", end="", flush=True)
+                streamed.append(token)
+                print(token, end="", flush=True)
+
+            profiler = None
+            if args.profile or args.profile_json or args.otel:
+                from .profiling import Profiler, opentelemetry_tracer
+                profiler = Profiler(opentelemetry_tracer() if args.otel else None)
+
+            from contextlib import nullcontext
+            from .profiling import span
+            with profiler.activate() if profiler is not None else nullcontext():
+                # Generate commit message, in the daemon if one is running.
+                # OpenTelemetry spans can only be emitted in this process.
+                result = None
+                if not args.no_daemon and not args.otel and DAEMON_SOCKET_FILE.exists():
+                    import os
+                    from .daemon import GENERATE_TIMEOUT, request
+                    with span("daemon") as current:
+                        result = request(DAEMON_SOCKET_FILE, {
+                            "command": "generate",
+                            "repo": os.path.abspath(args.repo),
+                            "config": full_config,
+                            "no_cache": args.no_cache,
+                            "stream": not args.no_stream,
+                            "profile": profiler is not None,
+                        }, on_token=None if args.no_stream else show_token, timeout=GENERATE_TIMEOUT)
+                    if result is not None and profiler is not None:
+                        profiler.merge(result.pop("profile", []), current)
+                    if result is None and streamed:
+                        # The daemon went silent mid-stream: start over here.
+                        print()
+                        streamed.clear()
+                if result is None:
+                    with span("setup"):
+                        from .cache import MessageCache
+                        from .commit_generator import CommitGenerator
+                        cache = None if args.no_cache else MessageCache(MESSAGE_CACHE_DIR)
+                        generator = CommitGenerator(args.repo, ollama_hosts(config), config['model'], cache=cache,
+                                                    blob_cache=blob_cache(config, args.no_cache),
+                                                    history=history_index(config, args.repo),
+                                                    **generator_options(config, git_config))
+                    result = generator.generate(on_token=None if args.no_stream else show_token)
+            if streamed:
+                print("\n")
+
+            if profiler is not None:
+                if args.profile:
+                    print(profiler.table() + "\n", file=sys.stderr)
+                if json_to_stdout:
+                    print(profiler.to_json())
+                elif args.profile_json:
+                    with open(args.profile_json, "w") as profile_file:
+                        profile_file.write(profiler.to_json())
 
             if not result["success"]:
                 print(f"Error: {result['error']}", file=sys.stderr)
                 sys.exit(1)
+            if json_to_stdout:
+                return
         
             commit_message = result["commit_message"]
             staged_files = result["staged_files"]
@@ -87,8 +435,8 @@ def main():
                 print(f"  - {file}")
             
             print(f"\nFile changes: {file_summary['added']} added, {file_summary['modified']} modified, {file_summary['deleted']} deleted")
-            print(f"\nGenerated commit message:")
-            print(f"  {commit_message}")
+            print(f"\nGenerated commit message{' (cached)' if result['cached'] else ''}:")
+            print("  " + commit_message.replace("\n", "\n  "))
             
             if args.command =="commit":
                 # Auto-commit
@@ -0,0 +1,309 @@
+"""Prompt construction and response handling shared by the Ollama clients."""
+
+import hashlib
+import json
+import re
+from typing import Optional, Dict, Any, List, Union
+
+UNAVAILABLE_MESSAGE = "Ollama is not available. Make sure Ollama is running."
+
+# Bump whenever _create_commit_prompt changes so cached messages are not reused.
+PROMPT_VERSION = 4
+
+# Diffs longer than this are truncated in the single-prompt path.
+MAX_DIFF_LENGTH = 2000
+
+# Ollama's default num_ctx, used when neither config nor the model sets one.
+DEFAULT_CONTEXT_WINDOW = 2048
+
+# Ollama keep_alive value: a duration string such as "10m", seconds, or -1.
+KeepAlive = Optional[Union[str, int, float]]
+
+# Instructions are sent as Ollama's system prompt, identical for every
+# request of a kind, so the server can reuse their evaluated tokens and only
+# the files and diff in the prompt are evaluated anew.
+COMMIT_SYSTEM = """You are a helpful assistant that generates concise, descriptive Git commit messages.
+
+Based on the git diff (or summaries of the changes) and file changes you are given, generate a single line commit message that:
+1. Follows conventional commit format (type: description)
+2. Is concise but descriptive (50 characters or less preferred)
+3. Uses present tense ("Add feature" not "Added feature")
+4. Common types: feat, fix, docs, style, refactor, test, chore"""
+
+CHUNK_SYSTEM = """You are a helpful assistant that summarizes code changes.
+
+Summarize what the part of a git diff you are given changes in one to three short
+sentences. Mention the files involved and the purpose of the change."""
+
+COMBINE_SYSTEM = """You are a helpful assistant that summarizes code changes.
+
+Merge the summaries of parts of one changeset you are given into a single summary
+of at most three short sentences."""
+
+DEFAULT_OPTIONS = {
+    "temperature": 0.3,
+    "top_p": 0.9,
+}
+
+# Ollama options of commit message requests, merged over the client's. A
+# subject line takes a few dozen tokens; the cap stops models that go on to
+# write a body nobody reads, since decoding time grows with every token.
+DEFAULT_COMMIT_OPTIONS = {
+    "num_predict": 64,
+}
+
+# Options of chunk and combine summaries: a few sentences each.
+SUMMARY_OPTIONS = {
+    "num_predict": 200,
+}
+
+# Sent as Ollama's ``format`` for structured commit messages, with
+# COMMIT_JSON_INSTRUCTION added to the system prompt.
+COMMIT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "type": {"type": "string",
+                 "enum": ["feat", "fix", "docs", "style", "refactor", "perf", "test", "build", "ci", "chore"]},
+        "scope": {"type": "string"},
+        "subject": {"type": "string"},
+    },
+    "required": ["type", "scope", "subject"],
+}
+
+COMMIT_JSON_INSTRUCTION = """
+
+Answer with a JSON object holding the commit type, its scope (an empty string if none) and the subject."""
+
+# A conventional commit subject line such as "feat(cli): add flag".
+SUBJECT_PATTERN = re.compile(r"^[a-z]+(\([^()\n]*\))?!?: \S", re.IGNORECASE)
+
+# Complete lines read while streaming before giving up on a conventional
+# subject and taking the first line, for models that do not write one.
+MAX_PREAMBLE_LINES = 2
+
+
+class ClientBase:
+    """State and prompt helpers common to OllamaClient and AsyncOllamaClient."""
+    
+    def __init__(self, base_url: str = "http://localhost:11434", model: str = "codellama",
+                 options: Optional[Dict[str, Any]] = None, model_keep_alive: KeepAlive = None,
+                 system_prompt: bool = True, commit_options: Optional[Dict[str, Any]] = None,
+                 structured: bool = False):
+        """Store the server, model and generation options.
+        
+        ``options`` are sent with every request; ``commit_options``, such as
+        ``num_predict`` and ``stop``, are merged over them for commit messages.
+        With ``structured`` the commit message is requested as JSON matching
+        COMMIT_SCHEMA and rendered as ``type(scope): subject``; ``stop`` is
+        then not sent, and an answer cut off by ``num_predict`` fails.
+        ``model_keep_alive`` is sent as Ollama's ``keep_alive``: how long the
+        model stays loaded after a request, e.g. ``"30m"``, a number of
+        seconds, or -1 for ever. None leaves the server default.
+        With ``system_prompt`` False the instructions are put at the start of
+        the prompt instead, for models whose template ignores the system prompt.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.options = {**DEFAULT_OPTIONS, **(options or {})}
+        self.model_keep_alive = model_keep_alive
+        self.system_prompt = system_prompt
+        self.commit_options = {**DEFAULT_COMMIT_OPTIONS, **(commit_options or {})}
+        self.structured = structured
+    
+    def cache_key(self, diff_digest: str) -> str:
+        """Key identifying a generated message for a diff with this model and prompt."""
+        key = json.dumps([diff_digest, self.model, PROMPT_VERSION, self.options, self.system_prompt,
+                          self.commit_options, self.structured], sort_keys=True)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+    
+    def _generate_payload(self, prompt: str, stream: bool, system: Optional[str] = None,
+                          options: Optional[Dict[str, Any]] = None,
+                          format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Request body for /api/generate; ``options`` are merged over the client's."""
+        if system and not self.system_prompt:
+            prompt = f"{system}\n\n{prompt}"
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {**self.options, **options} if options else self.options,
+        }
+        if system and self.system_prompt:
+            payload["system"] = system
+        if format is not None:
+            payload["format"] = format
+        if self.model_keep_alive is not None:
+            payload["keep_alive"] = self.model_keep_alive
+        return payload
+    
+    def _prime_payload(self, prompt: str) -> Dict[str, Any]:
+        """Request body that evaluates the commit instructions and prompt into the KV cache."""
+        payload = self._generate_payload(prompt, stream=False, system=self._commit_system())
+        # num_predict does not affect how the model is loaded, so the real
+        # request still finds the primed runner.
+        payload["options"] = {**self.options, "num_predict": 1}
+        return payload
+    
+    def _warmup_payload(self) -> Dict[str, Any]:
+        """Request body that loads the model without generating anything."""
+        payload = {"model": self.model, "prompt": "", "stream": False}
+        if self.model_keep_alive is not None:
+            payload["keep_alive"] = self.model_keep_alive
+        return payload
+    
+    def _commit_system(self) -> str:
+        """System prompt of commit message requests."""
+        return COMMIT_SYSTEM + COMMIT_JSON_INSTRUCTION if self.structured else COMMIT_SYSTEM
+    
+    def _commit_request(self) -> Dict[str, Any]:
+        """Keyword arguments of generate requests for commit messages."""
+        options = self.commit_options
+        if self.structured:
+            # A stop sequence met inside the JSON object would cut it off.
+            options = {key: value for key, value in options.items() if key != "stop"}
+        return {"system": self._commit_system(), "options": options,
+                "format": COMMIT_SCHEMA if self.structured else None}
+    
+    @staticmethod
+    def _is_subject(line: str) -> bool:
+        """Whether line, without quotes or markdown around it, is a conventional commit subject."""
+        return bool(SUBJECT_PATTERN.match(line.strip().strip("\"'`*")))
+    
+    @classmethod
+    def _subject_head(cls, text: str, token: str) -> Optional[str]:
+        """Part of the latest token before the subject line ends, or None while it has not ended.
+        
+        The subject is the first complete line that is a conventional
+        commit subject, or the first non-empty line once MAX_PREAMBLE_LINES
+        lines have passed without one.
+        """
+        end = 0
+        seen = 0
+        while True:
+            newline = text.find("\n", end)
+            if newline < 0:
+                return None
+            line, end = text[end:newline], newline + 1
+            if not line.strip():
+                continue
+            seen += 1
+            if cls._is_subject(line) or seen >= MAX_PREAMBLE_LINES:
+                return token[:max(0, len(token) - (len(text) - newline))]
+    
+    @staticmethod
+    def _answer_complete(text: str) -> bool:
+        """Whether text holds a complete JSON object, after which a structured answer can be cut off."""
+        try:
+            json.JSONDecoder().raw_decode(text.lstrip())
+        except ValueError:
+            return False
+        return True
+    
+    def _files_info(self, file_summary: Dict[str, Any]) -> str:
+        """Describe the number and kind of changed files."""
+        files_info = f"Files changed: {len(file_summary.get('staged_files', []))}"
+        if file_summary.get('added', 0) > 0:
+            files_info += f", {file_summary['added']} added"
+        if file_summary.get('modified', 0) > 0:
+            files_info += f", {file_summary['modified']} modified"
+        if file_summary.get('deleted', 0) > 0:
+            files_info += f", {file_summary['deleted']} deleted"
+        return files_info
+    
+    def _examples_info(self, file_summary: Dict[str, Any]) -> str:
+        """Past commit messages given as style examples, if any, ending in a blank line."""
+        examples = file_summary.get('examples') or []
+        if not examples:
+            return ""
+        joined = "\n".join(f"- {example}" for example in examples)
+        return f"""Messages of similar past commits in this repository, for style:
+{joined}
+
+"""
+    
+    def _commit_prompt_prefix(self) -> str:
+        """Start of every commit prompt, before anything that depends on the changes."""
+        return "Files changed: "
+    
+    def _create_commit_prompt(self, diff_text: str, file_summary: Dict[str, Any],
+                              max_diff_length: Optional[int] = MAX_DIFF_LENGTH) -> str:
+        """Create prompt for commit message generation; goes with COMMIT_SYSTEM."""
+        files_info = self._files_info(file_summary)
+        
+        # Truncate diff if too long
+        if max_diff_length is not None and len(diff_text) > max_diff_length:
+            diff_text = diff_text[:max_diff_length] + "\n... (truncated)"
+        
+        prompt = f"""{files_info}
+
+Git diff:
+{diff_text}
+
+{self._examples_info(file_summary)}Generate only the commit message, nothing else:"""
+        
+        return prompt
+    
+    def _create_chunk_prompt(self, chunk_text: str) -> str:
+        """Create prompt summarizing one part of a large diff; goes with CHUNK_SYSTEM."""
+        return f"""Git diff:
+{chunk_text}
+
+Summary:"""
+    
+    def _create_combine_prompt(self, summaries: List[str]) -> str:
+        """Create prompt merging several change summaries; goes with COMBINE_SYSTEM."""
+        joined = "\n".join(f"- {summary}" for summary in summaries)
+        return f"""Summaries:
+{joined}
+
+Summary:"""
+    
+    def _create_reduce_prompt(self, summaries: List[str], file_summary: Dict[str, Any]) -> str:
+        """Create commit message prompt from summaries of a large diff; goes with COMMIT_SYSTEM."""
+        files_info = self._files_info(file_summary)
+        joined = "\n".join(f"- {summary}" for summary in summaries)
+        return f"""{files_info}
+
+Summaries of the changes:
+{joined}
+
+{self._examples_info(file_summary)}Generate only the commit message, nothing else:"""
+    
+    def _structured_message(self, text: str) -> Optional[str]:
+        """Render a JSON answer as ``type(scope): subject``.
+        
+        None if the answer is not a complete object with a type and subject,
+        e.g. because ``num_predict`` cut it off; its text is never used as is.
+        """
+        try:
+            answer = json.JSONDecoder().raw_decode(text.lstrip())[0]
+            kind, scope, subject = (str(answer.get(key) or "").strip() for key in ("type", "scope", "subject"))
+        except (ValueError, AttributeError):
+            return None
+        if not kind or not subject:
+            return None
+        return self._clean_commit_message(f"{kind}({scope}): {subject}" if scope else f"{kind}: {subject}")
+    
+    def _clean_commit_message(self, message: str) -> str:
+        """Clean and format the commit message."""
+        # Remove any extra whitespace and newlines
+        message = message.strip()
+        
+        # Take the subject line if there is one, else the first line
+        lines = [line.strip() for line in message.split('\n') if line.strip()]
+        if lines:
+            message = next((line for line in lines if self._is_subject(line)), lines[0])
+        
+        # Remove quotes if present
+        if message.startswith('"') and message.endswith('"'):
+            message = message[1:-1]
+        if message.startswith("'") and message.endswith("'"):
+            message = message[1:-1]
+        if message.startswith("`") and message.endswith("`"):
+            message = message.strip("`")
+        
+        # Ensure it doesn't end with a period
+        if message.endswith('.'):
+            message = message[:-1]
+        
+        return message
@@ -1,20 +1,126 @@
 """Main commit message generator."""
 
-from typing import Optional, Dict, Any
-from .git_analyzer import GitAnalyzer
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, Iterable, Iterator, List, Sequence, Union
+from .cache import BlobCache, MessageCache
+from .compaction import DiffCompactor
+from .git_analyzer import FileChange, GitAnalyzer
+from .grouping import ChangeGroup, ScopeGrouper, merge_messages
+from .history import HistoryIndex, diffstat
 from .ollama_client import OllamaClient
+from .profiling import annotate, bind, span
+from .summarize import DiffSummarizer
+
+
+def generate_message(client: OllamaClient, changes: List[FileChange], summary: Dict[str, Any],
+                     compactor: DiffCompactor, map_reduce: bool = True, max_workers: int = 4,
+                     on_token: Optional[Callable[[str], None]] = None,
+                     blob_cache: Optional[BlobCache] = None) -> Optional[str]:
+    """Ask the model for a message, summarizing the diff first if it does not fit.
+
+    A diff over the compactor's budget is still sent as one prompt if it
+    fits a chunk of the model's context window; only larger ones are
+    summarized. With ``blob_cache`` summaries are made per file and reused
+    across runs.
+    """
+    with span("compact"):
+        compacted = compactor.compact(changes)
+        annotate(complete=compacted.complete)
+    if map_reduce and not compacted.complete:
+        summarizer = DiffSummarizer(client, max_workers=max_workers, compactor=compactor, blob_cache=blob_cache)
+        with span("compact", budget="chunk"):
+            compacted = summarizer.compact_to_chunk(changes)
+            annotate(complete=compacted.complete)
+        if not compacted.complete:
+            return summarizer.summarize(changes, summary, on_token=on_token)
+    return client.generate_commit_message(compacted.text, summary, on_token=on_token, max_diff_length=None)
+
+
+def generate_grouped_message(client: OllamaClient, groups: List[ChangeGroup], summary: Dict[str, Any],
+                             compactor: DiffCompactor, map_reduce: bool = True, max_workers: int = 4,
+                             blob_cache: Optional[BlobCache] = None) -> Optional[str]:
+    """Generate a message per group, up to max_workers at a time, and merge them.
+
+    Each group gets a prompt of its own with the full token budget. Map-reduce
+    summaries of a group share the workers, so no more than about max_workers
+    requests are in flight. None if any group's message failed.
+    """
+    workers = max(1, min(max_workers, len(groups)))
+
+    def generate_group(group: ChangeGroup) -> Optional[str]:
+        with span("group", scope=group.scope or "", files=len(group.changes)):
+            snapshot = group.snapshot
+            group_summary = {**summary, "staged_files": snapshot.files, **snapshot.summary()}
+            return generate_message(client, group.changes, group_summary, compactor, map_reduce,
+                                    max(1, max_workers // workers), None, blob_cache)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        messages = list(executor.map(bind(generate_group), groups))
+    if not all(messages):
+        return None
+    return merge_messages(list(zip(groups, messages)))
 
 
 class CommitGenerator:
     """Main class for generating commit messages."""
     
-    def __init__(self, repo_path: str = ".", ollama_url: str = "http://localhost:11434", model: str = "codellama"):
-        """Initialize CommitGenerator."""
-        self.git_analyzer = GitAnalyzer(repo_path)
-        self.ollama_client = OllamaClient(ollama_url, model)
+    def __init__(self, repo_path: str = ".", ollama_url: Union[str, Sequence[str]] = "http://localhost:11434",
+                 model: str = "codellama",
+                 ollama_client: Optional[OllamaClient] = None, cache: Optional[MessageCache] = None,
+                 map_reduce: bool = True, max_workers: int = 4, compactor: Optional[DiffCompactor] = None,
+                 git_backend: str = "gitpython", pipeline: bool = False,
+                 blob_cache: Optional[BlobCache] = None, history: Optional[HistoryIndex] = None,
+                 history_examples: int = 3, grouper: Optional[ScopeGrouper] = None, **client_options: Any):
+        """Initialize CommitGenerator.
+        
+        Pass ``ollama_client`` to share one pooled client across generators,
+        and ``cache`` to reuse messages generated for identical staged changes.
+        With ``map_reduce`` diffs too long for one prompt are summarized in
+        chunks, up to ``max_workers`` at a time, instead of being truncated;
+        ``blob_cache`` keeps those summaries per file so re-staging one file
+        only summarizes that file again.
+        ``compactor`` shrinks the diff to the prompt token budget first.
+        ``git_backend`` selects how staged changes are read (see GitAnalyzer).
+        ``ollama_url`` may list several servers to balance requests across.
+        With ``pipeline`` the model is loaded and primed with the start of
+        the prompt while the staged changes are still being read.
+        With ``history`` (see :mod:`ollama_commit.history`) the messages of
+        the ``history_examples`` past commits most similar to the staged
+        changes are shown to the model as examples of the repository's style.
+        With ``grouper`` staged changes that span several scopes, such as the
+        packages of a monorepo, get a message per scope, generated in
+        parallel and merged into one scoped subject with a bullet per scope.
+        """
+        self.git_analyzer = GitAnalyzer(repo_path, backend=git_backend)
+        self.ollama_client = ollama_client or OllamaClient(ollama_url, model, **client_options)
+        self.cache = cache
+        self.map_reduce = map_reduce
+        self.max_workers = max_workers
+        self.compactor = compactor or DiffCompactor()
+        self.pipeline = pipeline
+        self.blob_cache = blob_cache
+        self.history = history
+        self.history_examples = history_examples
+        self.grouper = grouper
+    
+    def generate(self, on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Generate commit message for staged changes.
+        
+        If ``on_token`` is given the model output is streamed to it. Phases
+        are timed while a :class:`~ollama_commit.profiling.Profiler` is active.
+        """
+        with span("generate"):
+            primer = None
+            if self.pipeline:
+                # Model load and prefill of the fixed prompt start overlap with git.
+                primer = threading.Thread(target=bind(self.ollama_client.prime), daemon=True)
+                primer.start()
+            return self._generate(on_token, primer)
     
-    def generate(self) -> Dict[str, Any]:
-        """Generate commit message for staged changes."""
+    def _generate(self, on_token: Optional[Callable[[str], None]],
+                  primer: Optional[threading.Thread] = None) -> Dict[str, Any]:
+        """Body of generate(); waits for primer before asking the model."""
         # Check if there are staged changes
         if not self.git_analyzer.has_staged_changes():
             return {
@@ -23,25 +129,36 @@ class CommitGenerator:
                 "commit_message": None
             }
         
-        # Check if Ollama is available
-        if not self.ollama_client.is_available():
-            return {
-                "success": False,
-                "error": "Ollama is not available. Make sure Ollama is running.",
-                "commit_message": None
-            }
-        
+        # Ollama availability is not probed up front: an unreachable server
+        # surfaces as a ConnectionError from generate_commit_message.
         try:
-            # Get repository info and diff
+            # Get repository info
             repo_info = self.git_analyzer.get_repository_info()
-            diff_text = self.git_analyzer.get_staged_diff()
             file_summary = self.git_analyzer.get_file_changes_summary()
             
             # Add file summary to repo info
             combined_summary = {**repo_info, **file_summary}
             
+            cache_key = None
+            commit_message = None
+            if self.cache is not None:
+                with span("cache.lookup"):
+                    cache_key = self.ollama_client.cache_key(self._digest())
+                    commit_message = self.cache.get(cache_key)
+            cached = commit_message is not None
+            
             # Generate commit message
-            commit_message = self.ollama_client.generate_commit_message(diff_text, combined_summary)
+            if not cached:
+                examples = self._examples()
+                if examples:
+                    combined_summary["examples"] = examples
+                if primer is not None:
+                    # Queued behind the primer, the request would wait just as long.
+                    with span("prime.wait"):
+                        primer.join()
+                commit_message = self._generate_message(combined_summary, on_token)
+                if commit_message and cache_key is not None:
+                    self.cache.put(cache_key, commit_message)
             
             if not commit_message:
                 return {
@@ -55,7 +172,8 @@ class CommitGenerator:
                 "error": None,
                 "commit_message": commit_message,
                 "staged_files": repo_info["staged_files"],
-                "file_summary": file_summary
+                "file_summary": file_summary,
+                "cached": cached
             }
             
         except Exception as e:
@@ -65,6 +183,68 @@ class CommitGenerator:
                 "commit_message": None
             }
     
+    def _examples(self) -> List[str]:
+        """Subjects of the past commits whose changes are most like the staged ones."""
+        if self.history is None or self.history_examples <= 0 or not len(self.history):
+            return []
+        changes = self.git_analyzer.snapshot.changes
+        query = diffstat((change.path, change.additions, change.deletions) for change in changes)
+        with span("history"):
+            try:
+                vector = self.ollama_client.embed(query, self.history.model)
+                found = self.history.search(vector, self.history_examples)
+            except Exception:
+                # Examples only improve the message; never fail generation over them.
+                return []
+            return [message.split("\n", 1)[0] for _, message in found]
+    
+    def _digest(self) -> str:
+        """Digest of the staged changes and the grouping applied to them."""
+        digest = self.git_analyzer.snapshot.digest()
+        if self.grouper is not None:
+            digest += self.grouper.fingerprint
+        return digest
+    
+    def _groups(self) -> List[ChangeGroup]:
+        """Scopes of the staged changes, or [] if they are described as a whole."""
+        if self.grouper is None:
+            return []
+        groups = self.git_analyzer.get_change_groups(self.grouper)
+        return groups if 1 < len(groups) <= self.grouper.max_groups else []
+    
+    def _generate_message(self, summary: Dict[str, Any], on_token: Optional[Callable[[str], None]]) -> Optional[str]:
+        """Ask the model for a message for the staged snapshot.
+        
+        Grouped messages are not streamed, since their groups are generated at once.
+        """
+        groups = self._groups()
+        if groups:
+            return generate_grouped_message(self.ollama_client, groups, summary, self.compactor, self.map_reduce,
+                                            self.max_workers, self.blob_cache)
+        return generate_message(self.ollama_client, self.git_analyzer.snapshot.changes, summary, self.compactor,
+                                self.map_reduce, self.max_workers, on_token, self.blob_cache)
+    
+    def generate_many(self, repo_paths: Optional[Iterable[str]] = None, commit_range: Optional[str] = None,
+                      processes: Optional[int] = None, concurrency: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Generate messages for the staged changes of many repositories, or for a commit range.
+        
+        ``commit_range`` (e.g. ``"main..feature"``) is resolved in this
+        generator's repository. Diffs are read in a pool of ``processes``
+        and at most ``concurrency`` requests are sent to Ollama at once.
+        Results are yielded as they complete; see BatchGenerator.
+        """
+        from .batch import BatchGenerator, commit_range_jobs, repo_jobs
+        if commit_range is not None:
+            jobs = commit_range_jobs(self.git_analyzer.backend.working_dir, commit_range)
+        else:
+            jobs = repo_jobs(repo_paths or [])
+        batch = BatchGenerator(self.ollama_client, cache=self.cache, compactor=self.compactor,
+                               map_reduce=self.map_reduce, processes=processes, concurrency=concurrency,
+                               blob_cache=self.blob_cache,
+                               git_backend=self.git_analyzer.backend.name,
+                               max_file_bytes=self.git_analyzer.max_file_bytes)
+        return batch.run(jobs)
+    
     def get_models(self) -> list:
         """Get available Ollama models."""
         return self.ollama_client.list_models()
@@ -75,7 +255,8 @@ class CommitGenerator:
             "git_repo": False,
             "staged_changes": False,
             "ollama_available": False,
-            "models": []
+            "models": [],
+            "hosts": []
         }
         
         try:
@@ -87,6 +268,7 @@ class CommitGenerator:
             validation["ollama_available"] = self.ollama_client.is_available()
             if validation["ollama_available"]:
                 validation["models"] = self.ollama_client.list_models()
+            validation["hosts"] = self.ollama_client.host_status()
             
         except Exception:
             pass
@@ -0,0 +1,204 @@
+"""Token-budget-aware compaction of staged diffs for prompts."""
+
+import fnmatch
+import re
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+from .git_analyzer import FileChange, is_binary_patch
+
+# Rough characters-per-token ratio used by the default tokenizer estimate.
+CHARS_PER_TOKEN = 4
+
+Tokenizer = Callable[[str], int]
+
+LOCKFILES = {
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml",
+    "poetry.lock", "Pipfile.lock", "uv.lock", "Cargo.lock", "go.sum",
+    "composer.lock", "Gemfile.lock", "mix.lock", "pubspec.lock", "flake.lock",
+}
+
+GENERATED_PATTERNS = [
+    "*.min.js", "*.min.css", "*.map", "*_pb2.py", "*_pb2_grpc.py", "*.pb.go",
+    "*.generated.*", "*.g.dart", "dist/*", "build/*", "vendor/*", "node_modules/*",
+]
+
+# Lines longer than this on average mark a file as minified.
+MINIFIED_LINE_LENGTH = 300
+
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def stub_reason(change: FileChange) -> Optional[str]:
+    """Return why a file should be replaced by a one-line stub, or None."""
+    name = change.path.rsplit("/", 1)[-1]
+    if change.binary or is_binary_patch(change.patch):
+        return "binary file"
+    if name in LOCKFILES:
+        return "lockfile"
+    # Patterns match at any depth, so ``vendor/*`` also covers ``pkg/vendor/x.go``.
+    parts = change.path.split("/")
+    suffixes = ["/".join(parts[i:]) for i in range(len(parts))]
+    if any(fnmatch.fnmatch(suffix, pattern) for suffix in suffixes for pattern in GENERATED_PATTERNS):
+        return "generated file"
+    lines = change.patch.count(b"\n") or 1
+    if len(change.patch) / lines > MINIFIED_LINE_LENGTH:
+        return "minified file"
+    return None
+
+
+@dataclass
+class Hunk:
+    """One hunk of a file diff."""
+
+    header: str
+    lines: List[str]
+
+    @property
+    def changed(self) -> int:
+        return sum(1 for line in self.lines if line[:1] in ("+", "-"))
+
+    def render(self) -> str:
+        return self.header + "".join(self.lines)
+
+
+def parse_hunks(patch_text: str) -> List[Hunk]:
+    """Split patch text into hunks."""
+    hunks: List[Hunk] = []
+    for line in patch_text.splitlines(keepends=True):
+        if HUNK_HEADER.match(line):
+            hunks.append(Hunk(line, []))
+        elif hunks:
+            hunks[-1].lines.append(line)
+    return hunks
+
+
+def is_whitespace_only(hunk: Hunk) -> bool:
+    """Check whether a hunk only changes whitespace."""
+    removed = "".join("".join(line[1:].split()) for line in hunk.lines if line.startswith("-"))
+    added = "".join("".join(line[1:].split()) for line in hunk.lines if line.startswith("+"))
+    return hunk.changed > 0 and removed == added
+
+
+def trim_context(hunk: Hunk, context_lines: int) -> Hunk:
+    """Keep at most ``context_lines`` unchanged lines around each change."""
+    changed = [i for i, line in enumerate(hunk.lines) if line[:1] in ("+", "-")]
+    keep = set()
+    for i in changed:
+        keep.update(range(i - context_lines, i + context_lines + 1))
+    lines = []
+    skipped = False
+    for i, line in enumerate(hunk.lines):
+        if i in keep or line.startswith("\\"):
+            lines.append(line)
+            skipped = False
+        elif not skipped:
+            lines.append(" ...\n")
+            skipped = True
+    return Hunk(hunk.header, lines)
+
+
+@dataclass
+class CompactedFile:
+    """A file change reduced to its header plus compacted hunks, or a stub."""
+
+    change: FileChange
+    header: str
+    hunks: List[Hunk] = field(default_factory=list)
+    stub: Optional[str] = None
+
+    def render(self, hunks: Optional[List[Hunk]] = None) -> str:
+        if self.stub is not None:
+            return self.header + self.stub + "\n"
+        return self.header + "".join(hunk.render() for hunk in (self.hunks if hunks is None else hunks))
+
+
+@dataclass
+class CompactedDiff:
+    """Result of compacting a diff to a token budget."""
+
+    text: str
+    tokens: int
+    original_tokens: int
+    dropped_hunks: int
+    token_budget: Optional[int] = None
+
+    @property
+    def complete(self) -> bool:
+        """True when every hunk fit the budget and the text, headers and stubs included, is within it."""
+        return self.dropped_hunks == 0 and (self.token_budget is None or self.tokens <= self.token_budget)
+
+
+class DiffCompactor:
+    """Shrink a staged diff to fit a prompt token budget.
+
+    Lockfiles, generated, minified and binary files become one-line stubs,
+    rename-only and whitespace-only changes are collapsed, context lines are
+    trimmed, and the remaining hunks are ranked by changed lines per token
+    and added until ``token_budget`` is reached.
+    """
+
+    def __init__(self, token_budget: int = 512, context_lines: int = 1, tokenizer: Optional[Tokenizer] = None):
+        """Initialize DiffCompactor."""
+        self.token_budget = token_budget
+        self.context_lines = context_lines
+        self.tokenizer = tokenizer or estimate_tokens
+
+    def compact_file(self, change: FileChange) -> CompactedFile:
+        """Apply per-file compaction without enforcing the budget."""
+        header = change.header()
+        reason = stub_reason(change)
+        if reason is not None:
+            return CompactedFile(change, header, stub=f"[{reason} changed: +{change.additions} -{change.deletions}]")
+        if change.change_type == "R" and not change.patch:
+            return CompactedFile(change, header, stub=f"[renamed from {change.old_path} without changes]")
+        hunks = []
+        for hunk in parse_hunks(change.patch.decode('utf-8', errors='ignore')):
+            if is_whitespace_only(hunk):
+                hunks.append(Hunk(hunk.header, [" [whitespace-only changes]\n"]))
+            else:
+                hunks.append(trim_context(hunk, self.context_lines))
+        return CompactedFile(change, header, hunks)
+
+    def compact_change(self, change: FileChange) -> FileChange:
+        """Return a copy of change with its patch compacted."""
+        compacted = self.compact_file(change)
+        body = compacted.render()[len(compacted.header):]
+        return FileChange(change.path, change.old_path, change.change_type, body.encode("utf-8"),
+                          change.additions, change.deletions)
+
+    def compact(self, changes: List[FileChange]) -> CompactedDiff:
+        """Compact changes to fit the token budget."""
+        files = [self.compact_file(change) for change in changes]
+        original_tokens = sum(self.tokenizer(change.render()) for change in changes)
+
+        # Every file keeps its header (and stub) so the model sees the full file list.
+        used = sum(self.tokenizer(f.render([])) for f in files)
+        candidates: List[Tuple[float, int, int, int]] = []
+        for file_index, f in enumerate(files):
+            for hunk_index, hunk in enumerate(f.hunks):
+                tokens = max(1, self.tokenizer(hunk.render()))
+                candidates.append((-hunk.changed / tokens, file_index, hunk_index, tokens))
+        candidates.sort()
+
+        selected = set()
+        for _, file_index, hunk_index, tokens in candidates:
+            if used + tokens <= self.token_budget:
+                selected.add((file_index, hunk_index))
+                used += tokens
+
+        parts = []
+        for file_index, f in enumerate(files):
+            hunks = [hunk for hunk_index, hunk in enumerate(f.hunks) if (file_index, hunk_index) in selected]
+            text = f.render(hunks)
+            omitted = len(f.hunks) - len(hunks)
+            if omitted:
+                text += f"... ({omitted} hunk{'s' if omitted != 1 else ''} omitted)\n"
+            parts.append(text)
+        text = "".join(parts)
+        return CompactedDiff(text, self.tokenizer(text), original_tokens, len(candidates) - len(selected),
+                             self.token_budget)
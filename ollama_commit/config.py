@@ -1,13 +1,45 @@
-import yaml
+import copy
+import hashlib
+import json
+import os
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 from appdirs import user_config_dir
-from rich.console import Console
 
-console = Console()
+# yaml and rich are imported inside the functions that use them to keep
+# CLI startup fast.
 
 # --- Constants ---
 CONFIG_DIR = Path(user_config_dir("ollama-commit", "OllamaCommit"))
 CONFIG_FILE = CONFIG_DIR / 'config.yaml'
+CACHE_DIR = CONFIG_DIR / 'cache'
+TAGS_CACHE_FILE = CACHE_DIR / 'tags.json'
+MESSAGE_CACHE_DIR = CACHE_DIR / 'messages'
+BLOB_CACHE_DIR = CACHE_DIR / 'blobs'
+HISTORY_DIR = CACHE_DIR / 'history'
+PREGENERATED_DIR = CACHE_DIR / 'pregenerated'
+CONFIG_CACHE_DIR = CACHE_DIR / 'config'
+WARMUP_STAMP_FILE = CACHE_DIR / 'warmup.stamp'
+DAEMON_SOCKET_FILE = CACHE_DIR / 'daemon.sock'
+REPO_CONFIG_NAME = '.ollama-commit.yaml'
+
+# Environment variables that override config values: name -> (section, key).
+ENV_OVERRIDES = {
+	'OLLAMA_COMMIT_HOST': ('ollama', 'host'),
+	'OLLAMA_COMMIT_MODEL': ('ollama', 'model'),
+	'OLLAMA_COMMIT_GIT_BACKEND': ('git', 'backend'),
+}
+
+# Keys a repository's own config file may not set, so that a cloned
+# repository cannot redirect diffs to another server.
+REPO_CONFIG_DENYLIST = {('ollama', 'host'), ('ollama', 'hosts')}
+
+# Keys of the ollama section that ``models: {<model>: {...}}`` may set per
+# model. Hosts are not among them, which keeps REPO_CONFIG_DENYLIST effective.
+MODEL_SETTINGS = ('options', 'num_ctx', 'num_predict', 'stop', 'structured', 'system_prompt', 'model_keep_alive')
+
+# Parsed files keyed by path, with the (mtime_ns, size) they were read at.
+_parsed_files: Dict[Path, Tuple[Tuple[int, int], dict]] = {}
 
 default_config = {
 	'ollama': {
@@ -26,30 +58,135 @@ def ensure_config_dir() -> Path:
 def create_default_config() -> None:
 	"""Create a default config file if it doesn't exist."""
 	if not CONFIG_FILE.exists():
+		import yaml
+		ensure_config_dir()
 		with open(CONFIG_FILE, 'w') as config_file:
 			yaml.dump(default_config, config_file)
 
-def get_config() -> dict:
-	"""Load and return the config parser object."""
-	config = yaml.safe_load(open(CONFIG_FILE, 'r')) if CONFIG_FILE.exists() else default_config
-	if not isinstance(config, dict):
-		raise ValueError("Config file is not a valid dictionary.")
-	create_default_config()  # Ensure the default config is created if it doesn't exist
-	config = yaml.safe_load(open(CONFIG_FILE, 'r'))
-	if not isinstance(config, dict):
-		raise ValueError("Config file is not a valid dictionary.")
+def _json_cache_path(path: Path) -> Path:
+	"""Location of the precompiled JSON copy of a YAML config file."""
+	digest = hashlib.sha1(str(path.resolve()).encode('utf-8')).hexdigest()
+	return CONFIG_CACHE_DIR / f'{digest}.json'
+
+def load_config_file(path: Path, use_json_cache: bool = True) -> dict:
+	"""Parse a YAML config file, reusing earlier results while it is unchanged.
+
+	Results are memoized on the file's mtime and size. With
+	``use_json_cache`` the parsed data is also stored as JSON so later
+	processes can skip YAML parsing entirely.
+	"""
+	try:
+		stat = path.stat()
+	except OSError:
+		return {}
+	stamp = (stat.st_mtime_ns, stat.st_size)
+	cached = _parsed_files.get(path)
+	if cached is not None and cached[0] == stamp:
+		return copy.deepcopy(cached[1])
+
+	config = None
+	json_path = _json_cache_path(path)
+	if use_json_cache:
+		try:
+			with open(json_path, 'r') as json_file:
+				entry = json.load(json_file)
+			if tuple(entry.get('stamp', ())) == stamp:
+				config = entry['data']
+		except (OSError, ValueError, KeyError):
+			pass
+
+	if config is None:
+		import yaml
+		with open(path, 'r') as config_file:
+			config = yaml.safe_load(config_file)
+		if config is None:
+			config = {}
+		if not isinstance(config, dict):
+			raise ValueError(f"Config file is not a valid dictionary: {path}")
+		if use_json_cache:
+			try:
+				CONFIG_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+				with open(json_path, 'w') as json_file:
+					json.dump({'stamp': list(stamp), 'data': config}, json_file)
+			except (OSError, TypeError, ValueError):
+				pass
+
+	_parsed_files[path] = (stamp, config)
+	return copy.deepcopy(config)
+
+def find_repo_config(repo_path: str) -> Optional[Path]:
+	"""Find ``.ollama-commit.yaml`` in repo_path or a parent, up to the repository root."""
+	directory = Path(repo_path).resolve()
+	for candidate in (directory, *directory.parents):
+		config_path = candidate / REPO_CONFIG_NAME
+		if config_path.is_file():
+			return config_path
+		if (candidate / '.git').exists():
+			return None
+	return None
+
+def _merge(base: dict, override: dict, denylist: frozenset = frozenset()) -> None:
+	"""Merge override into base one section deep."""
+	for section, values in override.items():
+		if not isinstance(values, dict):
+			raise ValueError(f"Config section '{section}' is not a dictionary.")
+		target = base.setdefault(section, {})
+		for key, value in values.items():
+			if (section, key) not in denylist:
+				target[key] = copy.deepcopy(value)
+
+def get_user_config() -> dict:
+	"""Load the user's config file, creating it with defaults if missing."""
+	create_default_config()
+	return load_config_file(CONFIG_FILE)
+
+def get_config(repo_path: Optional[str] = None) -> dict:
+	"""Load and return the merged config.
+
+	Layers, lowest priority first: built-in defaults, the user config file,
+	``.ollama-commit.yaml`` in the repository at ``repo_path`` and
+	``OLLAMA_COMMIT_*`` environment variables.
+	"""
+	config = copy.deepcopy(default_config)
+	_merge(config, get_user_config())
+	if repo_path is not None:
+		repo_config_path = find_repo_config(repo_path)
+		if repo_config_path is not None:
+			_merge(config, load_config_file(repo_config_path), frozenset(REPO_CONFIG_DENYLIST))
+	for name, (section, key) in ENV_OVERRIDES.items():
+		if os.environ.get(name):
+			config.setdefault(section, {})[key] = os.environ[name]
 	return config
 
+def model_config(ollama_config: dict) -> dict:
+	"""The ollama section with the settings under ``models`` for its model merged over it."""
+	overrides = (ollama_config.get('models') or {}).get(ollama_config.get('model')) or {}
+	if not isinstance(overrides, dict):
+		raise ValueError(f"Config for model '{ollama_config.get('model')}' is not a dictionary.")
+	return {**ollama_config, **{key: value for key, value in overrides.items() if key in MODEL_SETTINGS}}
+
+def clear_config_cache() -> None:
+	"""Forget memoized config files."""
+	_parsed_files.clear()
+
 def set_config(new_config: dict) -> None:
 	"""Set the config with a new dictionary and save it to the file."""
 	if not isinstance(new_config, dict):
 		raise ValueError("New config must be a dictionary.")
+	import yaml
+	ensure_config_dir()
 	with open(CONFIG_FILE, 'w') as config_file:
 		yaml.dump(new_config, config_file)
+	_parsed_files.pop(CONFIG_FILE, None)
 
 def setup_config(host: str, model: str) -> None:
 	"""Setup the Ollama Rich Client configuration."""
-	config = get_config()
+	from rich.console import Console
+	console = Console()
+	config = get_user_config()
+	config.setdefault('ollama', {})
+	for key, value in default_config['ollama'].items():
+		config['ollama'].setdefault(key, value)
 	if host or model:
 		if host:
 			config['ollama']['host'] = host
@@ -66,6 +203,3 @@ def setup_config(host: str, model: str) -> None:
 	set_config(config)
 	console.print(f"[bold green]Configuration updated:[/bold green] Host: {config['ollama']['host']}, Default Model: {config['ollama']['model']}")
 	return
-	
-# --- Config Initialization ---
-ensure_config_dir()
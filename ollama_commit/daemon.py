@@ -0,0 +1,254 @@
+"""Local daemon that keeps repositories, connections and caches warm between runs.
+
+Clients send one JSON request per connection over a Unix socket and read
+newline-delimited JSON events back: ``{"token": ...}`` while a message is
+streamed, then ``{"result": ...}``. Only the standard library is imported
+at module level so the client side stays cheap to start.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+# Repositories (with their git processes) and server connections kept open;
+# the least recently used are closed beyond these.
+MAX_GENERATORS = 8
+MAX_CLIENTS = 4
+
+# Seconds a generate request may go without a word from the daemon before
+# the caller gives up on it and generates in-process instead.
+GENERATE_TIMEOUT = 120
+
+
+def request(socket_path: Union[str, Path], payload: Dict[str, Any],
+            on_token: Optional[Callable[[str], None]] = None, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Send a request to the daemon and return its result.
+
+    Returns None if no daemon is listening on socket_path, or if it stays
+    silent for ``timeout`` seconds, so the caller can fall back to doing
+    the work in-process.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(socket_path))
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+        sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as events:
+            for line in events:
+                event = json.loads(line)
+                if "token" in event:
+                    if on_token is not None:
+                        on_token(event["token"])
+                elif "result" in event:
+                    return event["result"]
+        raise ConnectionError("The ollama-commit daemon closed the connection without a result.")
+    except socket.timeout:
+        return None
+    finally:
+        sock.close()
+
+
+def is_running(socket_path: Union[str, Path]) -> bool:
+    """Check whether a daemon answers on socket_path."""
+    try:
+        return request(socket_path, {"command": "ping"}, timeout=2) is not None
+    except (OSError, ValueError):
+        return False
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Serves one request."""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        payload: Dict[str, Any] = {}
+        try:
+            payload = json.loads(line)
+            result = self.server.daemon.handle(payload, self._send_token)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        except Exception as e:
+            result = {"success": False, "error": str(e), "commit_message": None}
+        try:
+            self._send({"result": result})
+        except OSError:
+            pass
+        if payload.get("command") == "shutdown":
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def _send_token(self, token: str) -> None:
+        # A client that went away raises here, which stops the generation.
+        self._send({"token": token})
+
+    def _send(self, event: Dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(event).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class CommitDaemon:
+    """Keeps CommitGenerators per repository and pooled clients per server config.
+
+    A generator's snapshot is reused until the repository's index or HEAD
+    changes, so repeated runs skip git entirely. All generators share the
+    message and blob caches. Only the most recently used generators and
+    clients are kept; the others are closed.
+    """
+
+    def __init__(self, socket_path: Union[str, Path], cache_dir: Optional[Union[str, Path]] = None,
+                 blob_cache_dir: Optional[Union[str, Path]] = None, max_generators: int = MAX_GENERATORS,
+                 max_clients: int = MAX_CLIENTS):
+        """Initialize CommitDaemon.
+
+        ``cache_dir`` holds the shared message cache and ``blob_cache_dir``
+        the per-file summaries of large diffs.
+        """
+        self.socket_path = Path(socket_path)
+        self.cache_dir = cache_dir
+        self.blob_cache_dir = blob_cache_dir
+        self.max_generators = max_generators
+        self.max_clients = max_clients
+        self._cache = None
+        self._blobs = None
+        self._clients: "OrderedDict[str, Any]" = OrderedDict()
+        self._generators: "OrderedDict[Tuple[str, str], Tuple[Any, threading.Lock]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._server: Optional[_Server] = None
+
+    def serve_forever(self) -> None:
+        """Listen on the socket until shutdown() or a shutdown request."""
+        if self.socket_path.exists():
+            if is_running(self.socket_path):
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            self.socket_path.unlink()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        # Diffs and messages pass through the socket, and requests name the
+        # repository and server: keep it private to the user from the moment
+        # it is bound, not only after a later chmod.
+        umask = os.umask(0o077)
+        try:
+            self._server = _Server(str(self.socket_path), _Handler)
+        finally:
+            os.umask(umask)
+        self._server.daemon = self
+        os.chmod(self.socket_path, 0o600)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            try:
+                self.socket_path.unlink()
+            except OSError:
+                pass
+            with self._lock:
+                generators, clients = list(self._generators.values()), list(self._clients.values())
+                self._generators.clear()
+                self._clients.clear()
+            self._close(generators, clients)
+
+    def shutdown(self) -> None:
+        """Stop serve_forever() from another thread."""
+        if self._server is not None:
+            self._server.shutdown()
+
+    def handle(self, payload: Dict[str, Any], on_token: Callable[[str], None]) -> Dict[str, Any]:
+        """Run one request."""
+        command = payload.get("command")
+        if command in ("ping", "shutdown"):
+            return {"success": True, "pid": os.getpid()}
+        if command != "generate":
+            return {"success": False, "error": f"Unknown command: {command}", "commit_message": None}
+        generator, lock = self._generator(payload["repo"], payload["config"])
+        with lock:
+            generator.git_analyzer.refresh_if_changed()
+            generator.cache = None if payload.get("no_cache") else self._message_cache()
+            use_blobs = not payload.get("no_cache") and payload["config"].get("ollama", {}).get("blob_cache", True)
+            generator.blob_cache = self._blob_cache() if use_blobs else None
+            on_token = on_token if payload.get("stream") else None
+            if not payload.get("profile"):
+                return generator.generate(on_token=on_token)
+            from .profiling import Profiler
+            profiler = Profiler()
+            with profiler.activate():
+                result = generator.generate(on_token=on_token)
+            result["profile"] = profiler.report()["spans"]
+            return result
+
+    def _message_cache(self):
+        if self._cache is None and self.cache_dir is not None:
+            from .cache import MessageCache
+            self._cache = MessageCache(self.cache_dir)
+        return self._cache
+
+    def _blob_cache(self):
+        if self._blobs is None and self.blob_cache_dir is not None:
+            from .cache import BlobCache
+            self._blobs = BlobCache(self.blob_cache_dir)
+        return self._blobs
+
+    def _generator(self, repo: str, config: Dict[str, Any]):
+        """Generator for a repository and config, created on first use."""
+        from .cli import client_options, generator_options, history_index, ollama_hosts
+        from .commit_generator import CommitGenerator
+        from .config import model_config
+        from .ollama_client import OllamaClient
+        ollama_config = model_config(config["ollama"])
+        git_config = config.get("git") or {}
+        config_key = json.dumps(config, sort_keys=True)
+        with self._lock:
+            entry = self._generators.get((repo, config_key))
+            if entry is not None:
+                self._generators.move_to_end((repo, config_key))
+                return entry
+            client_key = json.dumps([ollama_hosts(ollama_config), ollama_config["model"],
+                                     {key: value for key, value in client_options(ollama_config).items()
+                                      if key != "tags_cache_path"}], sort_keys=True)
+            client = self._clients.get(client_key)
+            if client is None:
+                client = self._clients[client_key] = OllamaClient(
+                    ollama_hosts(ollama_config), ollama_config["model"], **client_options(ollama_config))
+            self._clients.move_to_end(client_key)
+            options = generator_options(ollama_config, git_config)
+            for key in client_options(ollama_config):
+                options.pop(key, None)
+            generator = CommitGenerator(repo, model=ollama_config["model"], ollama_client=client, **options)
+            # Held until the history index is looked up below, outside the daemon lock.
+            lock = threading.Lock()
+            lock.acquire()
+            entry = self._generators[(repo, config_key)] = (generator, lock)
+            evicted = []
+            while len(self._generators) > self.max_generators:
+                evicted.append(self._generators.popitem(last=False)[1])
+            in_use = {id(cached.ollama_client) for cached, _ in self._generators.values()}
+            idle = [key for key, cached in self._clients.items() if id(cached) not in in_use]
+            unused = [self._clients.pop(key) for key in idle[:max(0, len(self._clients) - self.max_clients)]]
+        try:
+            # Looked up once per generator, so a repository without an index
+            # is not probed again on every request.
+            generator.history = history_index(ollama_config, repo)
+        finally:
+            lock.release()
+        self._close(evicted, unused)
+        return entry
+
+    @staticmethod
+    def _close(generators: List[Tuple[Any, threading.Lock]], clients: List[Any]) -> None:
+        """Close generators, once their running request is done, then clients."""
+        for generator, lock in generators:
+            with lock:
+                generator.git_analyzer.close()
+        for client in clients:
+            client.close()
@@ -1,94 +1,205 @@
 """Git repository analyzer for staged changes."""
 
+import hashlib
 import os
-from typing import List, Dict, Any
-from git import Repo
-from git.exc import InvalidGitRepositoryError
+from typing import List, Dict, Any, Iterator, Optional
+from .git_backends import (
+    DiffBackend, FileChange, GitPythonBackend, MAX_FILE_PATCH_BYTES, get_backend, is_binary_patch,
+)
+from .profiling import annotate, span
+
+__all__ = ["FileChange", "GitAnalyzer", "StagedSnapshot", "MAX_FILE_PATCH_BYTES", "is_binary_patch"]
+
+
+class StagedSnapshot:
+    """Staged changes between HEAD and the index, computed once."""
+
+    def __init__(self, changes: List[FileChange]):
+        """Initialize StagedSnapshot with a list of file changes."""
+        self.changes = changes
+
+    @classmethod
+    def from_backend(cls, backend: DiffBackend, max_file_bytes: int = MAX_FILE_PATCH_BYTES) -> "StagedSnapshot":
+        """Build a snapshot with a single ``git diff --cached`` invocation.
+        
+        Binary patches are dropped and text patches are cut at
+        ``max_file_bytes``, so the snapshot stays small for huge files.
+        """
+        return cls(backend.staged_changes(max_file_bytes))
+
+    @classmethod
+    def from_commit(cls, backend: DiffBackend, rev: str, max_file_bytes: int = MAX_FILE_PATCH_BYTES) -> "StagedSnapshot":
+        """Build a snapshot of the changes made by an existing commit."""
+        return cls(backend.commit_changes(rev, max_file_bytes))
+
+    def is_empty(self) -> bool:
+        """Check if the snapshot contains no changes."""
+        return not self.changes
+
+    @property
+    def files(self) -> List[str]:
+        """Paths of all staged files."""
+        return [change.path for change in self.changes]
+
+    def summary(self) -> Dict[str, int]:
+        """Count added, modified and deleted files."""
+        summary = {
+            "added": 0,
+            "modified": 0,
+            "deleted": 0,
+        }
+        for change in self.changes:
+            if change.change_type == "A":
+                summary["added"] += 1
+            elif change.change_type == "D":
+                summary["deleted"] += 1
+            else:
+                summary["modified"] += 1
+        return summary
+
+    def digest(self) -> str:
+        """Content hash of the staged changes."""
+        digest = hashlib.sha256()
+        for change in self.changes:
+            header = (f"{change.change_type}\0{change.old_path or ''}\0{change.path}\0"
+                      f"{change.old_sha or ''}\0{change.new_sha or ''}\0{len(change.patch)}\0")
+            digest.update(header.encode("utf-8"))
+            digest.update(change.patch)
+        return digest.hexdigest()
+
+    def iter_diff(self, max_bytes: Optional[int] = None) -> Iterator[str]:
+        """Yield the unified diff one file at a time, stopping after ``max_bytes``.
+        
+        For callers that take the diff in path order up to a cap. The
+        commit prompt does not: DiffCompactor ranks hunks across all files,
+        so it reads every change in the snapshot.
+        """
+        total = 0
+        for change in self.changes:
+            chunk = change.render()
+            if max_bytes is not None and total + len(chunk) > max_bytes:
+                if max_bytes > total:
+                    yield chunk[:max_bytes - total]
+                yield "\n... (diff truncated)\n"
+                return
+            total += len(chunk)
+            yield chunk
+
+    def diff_text(self, max_bytes: Optional[int] = None) -> str:
+        """Render the snapshot as unified diff text."""
+        return "".join(self.iter_diff(max_bytes))
 
 
 class GitAnalyzer:
     """Analyzes Git repository for staged changes."""
-    
-    def __init__(self, repo_path: str = "."):
-        """Initialize GitAnalyzer with repository path."""
+
+    def __init__(self, repo_path: str = ".", max_file_bytes: int = MAX_FILE_PATCH_BYTES, backend: str = "gitpython"):
+        """Initialize GitAnalyzer with repository path.
+        
+        ``backend`` selects how staged changes are read: ``"gitpython"`` or
+        ``"subprocess"`` (parses ``git diff --cached`` directly).
+        """
+        self.backend = get_backend(backend, repo_path)
+        self.max_file_bytes = max_file_bytes
+        self._snapshot: Optional[StagedSnapshot] = None
+        self._snapshot_stamp: Optional[tuple] = None
+        self._repo = None
+
+    @property
+    def repo(self):
+        """GitPython ``Repo`` for the repository, opened on first access."""
+        if isinstance(self.backend, GitPythonBackend):
+            return self.backend.repo
+        if self._repo is None:
+            from git import Repo
+            self._repo = Repo(self.backend.working_dir)
+        return self._repo
+
+    @property
+    def snapshot(self) -> StagedSnapshot:
+        """Staged snapshot, computed on first access."""
+        if self._snapshot is None:
+            with span("git.diff", backend=self.backend.name):
+                self._snapshot_stamp = self.index_stamp()
+                self._snapshot = StagedSnapshot.from_backend(self.backend, self.max_file_bytes)
+                annotate(files=len(self._snapshot.changes))
+        return self._snapshot
+
+    def commit_snapshot(self, rev: str) -> StagedSnapshot:
+        """Snapshot of the changes made by commit ``rev`` against its first parent."""
+        return StagedSnapshot.from_commit(self.backend, rev, self.max_file_bytes)
+
+    def close(self) -> None:
+        """Release git processes held open for this repository."""
+        self.backend.close()
+        if self._repo is not None:
+            self._repo.close()
+            self._repo = None
+
+    def refresh(self) -> None:
+        """Discard the cached snapshot so the next access re-reads the index."""
+        self._snapshot = None
+
+    def index_stamp(self) -> tuple:
+        """Cheap fingerprint of the index and HEAD, from file metadata only."""
+        git_dir = self.backend.git_dir
+        stamp = []
+        for name in ("index", "HEAD", "packed-refs"):
+            try:
+                stat = os.stat(os.path.join(git_dir, name))
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append(None)
         try:
-            self.repo = Repo(repo_path)
-        except InvalidGitRepositoryError:
-            raise ValueError(f"Not a git repository: {repo_path}")
-    
+            with open(os.path.join(git_dir, "HEAD"), "r") as head_file:
+                head = head_file.read().strip()
+            if head.startswith("ref: "):
+                stat = os.stat(os.path.join(git_dir, head[len("ref: "):]))
+                stamp.append((head, stat.st_mtime_ns, stat.st_size))
+            else:
+                stamp.append(head)
+        except OSError:
+            stamp.append(None)
+        return tuple(stamp)
+
+    def refresh_if_changed(self) -> bool:
+        """Discard the cached snapshot if the index or HEAD changed since it was taken."""
+        if self._snapshot is not None and self.index_stamp() != self._snapshot_stamp:
+            self.refresh()
+            return True
+        return False
+
     def get_staged_files(self) -> List[str]:
         """Get list of staged files."""
-        staged_files = []
-        
-        # Get staged files from index
-        for item in self.repo.index.diff("HEAD"):
-            staged_files.append(item.a_path)
-        
-        # Get new files that are staged
-        for item in self.repo.index.diff(None, cached=True):
-            if item.a_path not in staged_files:
-                staged_files.append(item.a_path)
-        
-        return staged_files
-    
-    def get_staged_diff(self) -> str:
-        """Get the diff of staged changes."""
-        if not self.has_staged_changes():
-            return ""
-        
-        # Get diff of staged changes
-        diff_text = ""
-        
-        # Diff between HEAD and index (staged changes)
-        for diff_item in self.repo.index.diff("HEAD"):
-            diff_text += f"\n--- a/{diff_item.a_path}\n"
-            diff_text += f"+++ b/{diff_item.b_path}\n"
-            if diff_item.diff:
-                diff_text += diff_item.diff.decode('utf-8', errors='ignore')
-        
-        # New files that are staged
-        for diff_item in self.repo.index.diff(None, cached=True):
-            if diff_item.new_file:
-                diff_text += f"\n--- /dev/null\n"
-                diff_text += f"+++ b/{diff_item.b_path}\n"
-                if diff_item.diff:
-                    diff_text += diff_item.diff.decode('utf-8', errors='ignore')
-        
-        return diff_text
+        return self.snapshot.files
+
+    def get_staged_diff(self, max_bytes: Optional[int] = None) -> str:
+        """Get the diff of staged changes, optionally capped at max_bytes."""
+        return self.snapshot.diff_text(max_bytes)
     
+    def iter_staged_diff(self, max_bytes: Optional[int] = None) -> Iterator[str]:
+        """Yield the diff of staged changes one file at a time."""
+        return self.snapshot.iter_diff(max_bytes)
+
+    def get_change_groups(self, grouper) -> list:
+        """Staged changes split into ChangeGroups by a :class:`~ollama_commit.grouping.ScopeGrouper`."""
+        return grouper.group(self.snapshot.changes)
+
     def has_staged_changes(self) -> bool:
         """Check if there are any staged changes."""
-        return len(self.repo.index.diff("HEAD")) > 0 or len(self.repo.index.diff(None, cached=True)) > 0
-    
+        return not self.snapshot.is_empty()
+
     def get_repository_info(self) -> Dict[str, Any]:
         """Get repository information."""
+        with span("git.branch"):
+            branch = self.backend.branch()
         return {
-            "name": os.path.basename(self.repo.working_dir),
-            "branch": self.repo.active_branch.name,
+            "name": os.path.basename(self.backend.working_dir),
+            "branch": branch,
             "staged_files": self.get_staged_files(),
             "has_staged_changes": self.has_staged_changes(),
         }
-    
+
     def get_file_changes_summary(self) -> Dict[str, int]:
         """Get summary of file changes (additions, deletions, modifications)."""
-        summary = {
-            "added": 0,
-            "modified": 0,
-            "deleted": 0,
-        }
-        
-        # Check staged changes
-        for diff_item in self.repo.index.diff("HEAD"):
-            if diff_item.new_file:
-                summary["added"] += 1
-            elif diff_item.deleted_file:
-                summary["deleted"] += 1
-            else:
-                summary["modified"] += 1
-        
-        # Check new staged files
-        for diff_item in self.repo.index.diff(None, cached=True):
-            if diff_item.new_file:
-                summary["added"] += 1
-        
-        return summary
\ No newline at end of file
+        return self.snapshot.summary()
@@ -0,0 +1,423 @@
+"""Backends that read staged changes from a Git repository."""
+
+import os
+import subprocess
+from dataclasses import dataclass
+from typing import IO, Dict, List, Optional
+
+# Patch bytes kept per file; the rest is dropped before it is ever decoded.
+MAX_FILE_PATCH_BYTES = 256 * 1024
+
+NULL_SHA = "0" * 40
+
+
+def is_binary_patch(patch: bytes) -> bool:
+    """Check whether a patch describes a binary file, without decoding it."""
+    return patch.startswith(b"Binary files") or b"GIT binary patch" in patch[:200] or b"\0" in patch[:8000]
+
+
+@dataclass
+class FileChange:
+    """A single staged file change."""
+
+    path: str
+    old_path: Optional[str]
+    change_type: str
+    patch: bytes = b""
+    additions: int = 0
+    deletions: int = 0
+    binary: bool = False
+    truncated: bool = False
+    old_sha: Optional[str] = None
+    new_sha: Optional[str] = None
+
+    def header(self) -> str:
+        """Unified diff file header for the change."""
+        a_path = "/dev/null" if self.change_type == "A" else f"a/{self.old_path}"
+        b_path = "/dev/null" if self.change_type == "D" else f"b/{self.path}"
+        return f"\n--- {a_path}\n+++ {b_path}\n"
+
+    def render(self) -> str:
+        """Render the change as unified diff text."""
+        text = self.header()
+        if self.binary:
+            text += "Binary file changed\n"
+        elif self.patch:
+            text += self.patch.decode('utf-8', errors='ignore')
+            if self.truncated:
+                text += "\n... (truncated)\n"
+        return text
+
+
+def cap_patch(patch: bytes, max_bytes: int) -> tuple:
+    """Cut a patch at the last line break before max_bytes."""
+    if len(patch) <= max_bytes:
+        return patch, False
+    cut = patch.rfind(b"\n", 0, max_bytes) + 1 or max_bytes
+    return patch[:cut], True
+
+
+def count_patch_lines(patch: bytes) -> tuple:
+    """Count added and deleted lines in a patch."""
+    additions = deletions = 0
+    for line in patch.splitlines():
+        if line.startswith(b"+") and not line.startswith(b"+++"):
+            additions += 1
+        elif line.startswith(b"-") and not line.startswith(b"---"):
+            deletions += 1
+    return additions, deletions
+
+
+class DiffBackend:
+    """Interface for reading staged changes of one repository."""
+
+    name = ""
+
+    @property
+    def working_dir(self) -> str:
+        """Top-level directory of the working tree."""
+        raise NotImplementedError
+
+    @property
+    def git_dir(self) -> str:
+        """Absolute path of the ``.git`` directory."""
+        raise NotImplementedError
+
+    def branch(self) -> str:
+        """Name of the checked out branch."""
+        raise NotImplementedError
+
+    def staged_changes(self, max_file_bytes: int = MAX_FILE_PATCH_BYTES) -> List[FileChange]:
+        """Read all staged changes with a single git invocation."""
+        raise NotImplementedError
+
+    def commit_changes(self, rev: str, max_file_bytes: int = MAX_FILE_PATCH_BYTES) -> List[FileChange]:
+        """Read the changes a commit made relative to its first parent."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any git processes held open by the backend."""
+
+
+_repo_class = None
+
+
+def gitpython_repo_class():
+    """GitPython's Repo, without its submodule lookup in repositories that have no submodules.
+
+    GitPython checks ``Repo.submodules`` for every diff item, which resolves
+    HEAD through a ``git cat-file`` process; a working tree without a
+    ``.gitmodules`` file has none to find.
+    """
+    global _repo_class
+    if _repo_class is None:
+        from git import Repo
+
+        class GitPythonRepo(Repo):
+            @property
+            def submodules(self):
+                if self.working_tree_dir and not os.path.exists(os.path.join(self.working_tree_dir, ".gitmodules")):
+                    return []
+                return super().submodules
+
+        _repo_class = GitPythonRepo
+    return _repo_class
+
+
+class GitPythonBackend(DiffBackend):
+    """Reads staged changes through GitPython's index diffing."""
+
+    name = "gitpython"
+
+    def __init__(self, repo_path: str = "."):
+        """Open the repository with GitPython."""
+        from git.exc import InvalidGitRepositoryError, NoSuchPathError
+        try:
+            self.repo = gitpython_repo_class()(repo_path)
+        except (InvalidGitRepositoryError, NoSuchPathError):
+            raise ValueError(f"Not a git repository: {repo_path}")
+
+    @property
+    def working_dir(self) -> str:
+        return self.repo.working_dir
+
+    @property
+    def git_dir(self) -> str:
+        return os.path.abspath(self.repo.git_dir)
+
+    def branch(self) -> str:
+        return self.repo.active_branch.name
+
+    def close(self) -> None:
+        self.repo.close()
+
+    def staged_changes(self, max_file_bytes: int = MAX_FILE_PATCH_BYTES) -> List[FileChange]:
+        return self._convert(self.repo.index.diff(None, cached=True, create_patch=True), max_file_bytes)
+
+    def commit_changes(self, rev: str, max_file_bytes: int = MAX_FILE_PATCH_BYTES) -> List[FileChange]:
+        from git import NULL_TREE
+        commit = self.repo.commit(rev)
+        if commit.parents:
+            diff_index = commit.parents[0].diff(commit, create_patch=True)
+        else:
+            diff_index = commit.diff(NULL_TREE, create_patch=True)
+        return self._convert(diff_index, max_file_bytes)
+
+    @staticmethod
+    def _convert(diff_index, max_file_bytes: int) -> List[FileChange]:
+        """Turn GitPython diff items into FileChanges."""
+        changes = []
+        for diff_item in diff_index:
+            patch = diff_item.diff or b""
+            if isinstance(patch, str):
+                patch = patch.encode("utf-8", errors="ignore")
+            diff_item.diff = b""
+            if diff_item.new_file:
+                change_type = "A"
+            elif diff_item.deleted_file:
+                change_type = "D"
+            elif diff_item.renamed_file:
+                change_type = "R"
+            else:
+                change_type = "M"
+            binary = is_binary_patch(patch)
+            additions, deletions = (0, 0) if binary else count_patch_lines(patch)
+            patch, truncated = (b"", False) if binary else cap_patch(patch, max_file_bytes)
+            changes.append(FileChange(
+                path=diff_item.a_path if change_type == "D" else diff_item.b_path,
+                old_path=None if change_type == "A" else diff_item.a_path,
+                change_type=change_type,
+                patch=patch,
+                additions=additions,
+                deletions=deletions,
+                binary=binary,
+                truncated=truncated,
+                old_sha=diff_item.a_blob.hexsha if diff_item.a_blob else None,
+                new_sha=diff_item.b_blob.hexsha if diff_item.b_blob else None,
+            ))
+        return changes
+
+
+class _NulReader:
+    """Buffered reader over a byte stream that splits on arbitrary separators."""
+
+    def __init__(self, stream: IO[bytes], chunk_size: int = 64 * 1024):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = b""
+
+    def read_until(self, separator: bytes) -> Optional[bytes]:
+        """Return bytes up to (not including) separator, or the rest at EOF."""
+        start = 0
+        while True:
+            index = self.buffer.find(separator, start)
+            if index >= 0:
+                data = self.buffer[:index]
+                self.buffer = self.buffer[index + len(separator):]
+                return data
+            start = max(0, len(self.buffer) - len(separator) + 1)
+            chunk = self.stream.read(self.chunk_size) if not hasattr(self.stream, "read1") \
+                else self.stream.read1(self.chunk_size)
+            if not chunk:
+                data, self.buffer = self.buffer, b""
+                return data if data else None
+            self.buffer += chunk
+
+
+class SubprocessBackend(DiffBackend):
+    """Reads staged changes by parsing ``git diff --cached`` output directly.
+
+    Raw status, numstat and patch output come from one process and are
+    parsed in a single streaming pass; GitPython is never imported.
+    """
+
+    name = "subprocess"
+
+    DIFF_ARGS = [
+        "diff", "--cached", "-z", "-M", "--raw", "--numstat", "--patch",
+        "--abbrev=40", "--full-index", "--no-color", "--no-ext-diff", "--no-textconv",
+    ]
+
+    # Same output format as DIFF_ARGS, comparing two trees instead of HEAD and the index.
+    DIFF_TREE_ARGS = [
+        "diff-tree", "-r", "--root", "--no-commit-id", "-z", "-M", "--raw", "--numstat", "--patch",
+        "--abbrev=40", "--full-index", "--no-color", "--no-ext-diff", "--no-textconv",
+    ]
+
+    def __init__(self, repo_path: str = ".", git: str = "git"):
+        """Locate the repository with ``git rev-parse``."""
+        self.git = git
+        try:
+            result = subprocess.run(
+                [git, "rev-parse", "--show-toplevel", "--absolute-git-dir"],
+                cwd=repo_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True,
+            )
+        except (OSError, subprocess.CalledProcessError):
+            raise ValueError(f"Not a git repository: {repo_path}")
+        self._working_dir, self._git_dir = result.stdout.decode("utf-8").splitlines()[:2]
+
+    @property
+    def working_dir(self) -> str:
+        return self._working_dir
+
+    @property
+    def git_dir(self) -> str:
+        return self._git_dir
+
+    def branch(self) -> str:
+        with open(os.path.join(self.git_dir, "HEAD"), "r") as head_file:
+            head = head_file.read().strip()
+        if not head.startswith("ref: "):
+            raise TypeError(f"HEAD is a detached symbolic reference as it points to '{head}'")
+        ref = head[len("ref: "):]
+        return ref[len("refs/heads/"):] if ref.startswith("refs/heads/") else ref
+
+    def staged_changes(self, max_file_bytes: int = MAX_FILE_PATCH_BYTES) -> List[FileChange]:
+        return self._read_changes(self.DIFF_ARGS, max_file_bytes)
+
+    def commit_changes(self, rev: str, max_file_bytes: int = MAX_FILE_PATCH_BYTES) -> List[FileChange]:
+        try:
+            result = subprocess.run(
+                [self.git, "rev-list", "--parents", "-n", "1", rev, "--"],
+                cwd=self._working_dir, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True,
+            )
+        except subprocess.CalledProcessError:
+            raise ValueError(f"Unknown revision: {rev}")
+        # Compare with the first parent explicitly so merges are not shown as combined diffs.
+        shas = result.stdout.decode("utf-8").split()
+        return self._read_changes([*self.DIFF_TREE_ARGS, *shas[1:2], shas[0]], max_file_bytes)
+
+    def _read_changes(self, args: List[str], max_file_bytes: int) -> List[FileChange]:
+        """Run a diff command and parse its output as it streams in."""
+        process = subprocess.Popen(
+            [self.git, *args], cwd=self._working_dir,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        try:
+            changes = self._parse(_NulReader(process.stdout), max_file_bytes)
+        finally:
+            process.stdout.close()
+            stderr = process.stderr.read()
+            process.stderr.close()
+            returncode = process.wait()
+        if returncode != 0:
+            raise RuntimeError(f"git {args[0]} failed: {stderr.decode('utf-8', errors='ignore').strip()}")
+        return changes
+
+    def _parse(self, reader: _NulReader, max_file_bytes: int) -> List[FileChange]:
+        """Parse raw, numstat and patch sections in order."""
+        changes: List[FileChange] = []
+        stats: Dict[str, tuple] = {}
+        type_changes = set()
+        raw_done = False
+        # Raw and numstat records are NUL separated and end with an empty record.
+        while True:
+            record = reader.read_until(b"\0")
+            if not record:
+                break
+            text = record.decode("utf-8", errors="surrogateescape")
+            if text.startswith(":") and not raw_done:
+                meta = text[1:].split(" ")
+                status = meta[4][:1]
+                path = reader.read_until(b"\0").decode("utf-8", errors="surrogateescape")
+                old_path = path
+                if status in ("R", "C"):
+                    path = reader.read_until(b"\0").decode("utf-8", errors="surrogateescape")
+                if status == "T":
+                    # A type change (say, a file replaced by a symlink) has
+                    # two patch sections, a deletion and an addition; like
+                    # GitPython, report it as those two changes.
+                    changes.append(FileChange(path=path, old_path=path, change_type="D", old_sha=meta[2]))
+                    changes.append(FileChange(path=path, old_path=None, change_type="A", new_sha=meta[3]))
+                    type_changes.add(path)
+                    continue
+                change_type = {"A": "A", "D": "D", "R": "R"}.get(status, "M")
+                changes.append(FileChange(
+                    path=path,
+                    old_path=None if change_type == "A" else old_path,
+                    change_type=change_type,
+                    old_sha=None if meta[2] == NULL_SHA else meta[2],
+                    new_sha=None if meta[3] == NULL_SHA else meta[3],
+                ))
+                continue
+            raw_done = True
+            added, deleted, path = text.split("\t", 2)
+            if not path:
+                reader.read_until(b"\0")
+                path = reader.read_until(b"\0").decode("utf-8", errors="surrogateescape")
+            stats[path] = (added, deleted)
+
+        for change in changes:
+            added, deleted = stats.get(change.path, ("0", "0"))
+            if change.path in type_changes:
+                # The halves of a type change share one numstat line; which
+                # of them is binary shows in its own patch section.
+                if added != "-":
+                    change.additions, change.deletions = (int(added), 0) if change.change_type == "A" else (0, int(deleted))
+                continue
+            change.binary = added == "-"
+            if not change.binary:
+                change.additions, change.deletions = int(added), int(deleted)
+
+        self._parse_patches(reader, changes, max_file_bytes)
+        return changes
+
+    @staticmethod
+    def _parse_patches(reader: _NulReader, changes: List[FileChange], max_file_bytes: int) -> None:
+        """Attach patch bodies, which follow in the same order as the raw records."""
+        index = -1
+        in_body = False
+        cut = False
+        parts: List[bytes] = []
+        size = 0
+
+        def finish():
+            if 0 <= index < len(changes) and not changes[index].binary:
+                changes[index].patch = b"".join(parts)
+
+        while True:
+            line = reader.read_until(b"\n")
+            if line is None:
+                break
+            if line.startswith(b"diff --git ") or line.startswith(b"diff --cc "):
+                finish()
+                index += 1
+                in_body = cut = False
+                parts, size = [], 0
+                continue
+            if not in_body:
+                if line.startswith(b"@@"):
+                    in_body = True
+                elif line.startswith(b"Binary files") or line.startswith(b"GIT binary patch"):
+                    if 0 <= index < len(changes):
+                        changes[index].binary = True
+                    continue
+                else:
+                    continue
+            if cut:
+                continue
+            if size + len(line) + 1 > max_file_bytes:
+                # Like cap_patch: keep only the lines before the cut, not
+                # shorter ones or later hunks after it.
+                if 0 <= index < len(changes):
+                    changes[index].truncated = True
+                cut = True
+                continue
+            parts.append(line + b"\n")
+            size += len(line) + 1
+        finish()
+
+
+BACKENDS = {
+    GitPythonBackend.name: GitPythonBackend,
+    SubprocessBackend.name: SubprocessBackend,
+}
+
+
+def get_backend(name: str, repo_path: str = ".") -> DiffBackend:
+    """Create the backend registered under name for a repository."""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown git backend: {name} (choose from {', '.join(BACKENDS)})")
+    return backend_class(repo_path)
@@ -0,0 +1,162 @@
+"""Grouping of staged changes by package, for monorepos.
+
+A :class:`ScopeGrouper` assigns each staged file a scope, either from
+CODEOWNERS-style path patterns or from the subtree root (such as
+``packages/*``) it lies under. When a change spans several scopes, a
+message is generated for each group at the same time and the results are
+merged by :func:`merge_messages` into one conventional commit subject
+with a bullet per scope.
+"""
+
+import fnmatch
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+from .git_analyzer import FileChange, StagedSnapshot
+
+# More groups than this are not worth a request each; the change is then
+# described by one message as usual.
+DEFAULT_MAX_GROUPS = 8
+
+# Commit types by precedence: the merged subject takes the type of the
+# highest ranked group, as a release tool would count the commit.
+TYPE_ORDER = ("feat", "fix", "perf", "refactor", "docs", "test", "build", "ci", "style", "chore")
+
+CONVENTIONAL_SUBJECT = re.compile(
+    r"^(?P<type>[a-z]+)(?:\((?P<scope>[^()]*)\))?(?P<breaking>!)?: (?P<description>.+)$", re.IGNORECASE)
+
+
+def pattern_regex(pattern: str) -> Pattern:
+    """Compile a CODEOWNERS (gitignore-style) pattern to match repository paths.
+
+    A leading or inner ``/`` anchors the pattern at the repository root,
+    otherwise it matches at any depth; ``*`` stays within a directory and
+    ``**`` crosses them. A pattern matching a directory matches everything
+    under it, and one ending in ``/`` only matches directories.
+    """
+    anchored = "/" in pattern.rstrip("/")
+    body = pattern.strip("/")
+    regex = ""
+    i = 0
+    while i < len(body):
+        if body.startswith("**/", i):
+            regex, i = regex + "(?:.*/)?", i + 3
+        elif body.startswith("**", i):
+            regex, i = regex + ".*", i + 2
+        elif body[i] == "*":
+            regex, i = regex + "[^/]*", i + 1
+        elif body[i] == "?":
+            regex, i = regex + "[^/]", i + 1
+        else:
+            regex, i = regex + re.escape(body[i]), i + 1
+    prefix = "" if anchored else "(?:.*/)?"
+    suffix = "/.*" if pattern.endswith("/") else "(?:/.*)?"
+    return re.compile(prefix + regex + suffix + r"\Z")
+
+
+@dataclass
+class ChangeGroup:
+    """Staged changes that share a scope; ``scope`` is None for files outside every package."""
+
+    key: Optional[str]
+    scope: Optional[str]
+    changes: List[FileChange] = field(default_factory=list)
+
+    @property
+    def snapshot(self) -> StagedSnapshot:
+        """The group's changes as a snapshot of their own."""
+        return StagedSnapshot(self.changes)
+
+    @property
+    def changed_lines(self) -> int:
+        return sum(change.additions + change.deletions for change in self.changes)
+
+
+class ScopeGrouper:
+    """Assigns staged files to scopes by path pattern or subtree root."""
+
+    def __init__(self, subtrees: Iterable[str] = (), patterns: Optional[Dict[str, str]] = None,
+                 max_groups: int = DEFAULT_MAX_GROUPS):
+        """Initialize ScopeGrouper.
+
+        ``patterns`` maps CODEOWNERS-style patterns to scope names; as in
+        CODEOWNERS the last matching pattern wins. Files no pattern matches
+        are grouped by the deepest of the ``subtrees`` roots they lie under,
+        such as ``packages/*``, and scoped by the root directory's name.
+        """
+        self.subtrees = [root.strip("/").split("/") for root in subtrees if root.strip("/")]
+        self.patterns = [(pattern_regex(pattern), str(scope)) for pattern, scope in (patterns or {}).items()]
+        self.max_groups = max_groups
+        self._config = [sorted("/".join(root) for root in self.subtrees), list((patterns or {}).items()), max_groups]
+
+    @property
+    def fingerprint(self) -> str:
+        """Settings that decide the groups, for cache keys."""
+        return json.dumps(self._config)
+
+    def scope_of(self, path: str) -> Tuple[Optional[str], Optional[str]]:
+        """Group key and scope of a path, or (None, None) outside every scope."""
+        for regex, scope in reversed(self.patterns):
+            if regex.match(path):
+                return scope, scope
+        parts = path.split("/")
+        best: Optional[List[str]] = None
+        for root in self.subtrees:
+            if len(parts) > len(root) and (best is None or len(root) > len(best)) and \
+                    all(fnmatch.fnmatchcase(part, glob) for part, glob in zip(parts, root)):
+                best = root
+        if best is None:
+            return None, None
+        return "/".join(parts[:len(best)]), parts[len(best) - 1]
+
+    def group(self, changes: List[FileChange]) -> List[ChangeGroup]:
+        """Changes grouped by scope, ordered by key, with the unscoped group last."""
+        groups: Dict[Optional[str], ChangeGroup] = {}
+        for change in changes:
+            key, scope = self.scope_of(change.path)
+            groups.setdefault(key, ChangeGroup(key, scope)).changes.append(change)
+        return sorted(groups.values(), key=lambda group: (group.key is None, group.key or ""))
+
+
+def parse_subject(message: str) -> Tuple[Optional[str], bool, str]:
+    """Type, breaking-change marker and description of a conventional subject line.
+
+    The type is None when the line is not a conventional subject; the
+    description is then the whole line.
+    """
+    subject = message.strip().split("\n", 1)[0].strip()
+    match = CONVENTIONAL_SUBJECT.match(subject)
+    if match is None:
+        return None, False, subject
+    return match.group("type").lower(), bool(match.group("breaking")), match.group("description").strip()
+
+
+def _type_rank(kind: Optional[str]) -> int:
+    return TYPE_ORDER.index(kind) if kind in TYPE_ORDER else len(TYPE_ORDER)
+
+
+def merge_messages(results: List[Tuple[ChangeGroup, str]]) -> str:
+    """One message for several groups: a subject scoped to all of them and a bullet per group.
+
+    The subject's type and description are those of the group with the
+    highest ranked type, the larger group winning ties.
+    """
+    parsed = [(group, *parse_subject(message)) for group, message in results]
+    _, kind, _, description = min(parsed, key=lambda item: (_type_rank(item[1]), -item[0].changed_lines))
+    scopes: List[str] = []
+    for group, *_ in parsed:
+        if group.scope and group.scope not in scopes:
+            scopes.append(group.scope)
+    breaking = "!" if any(item[2] for item in parsed) else ""
+    scope_list = f"({','.join(scopes)})" if scopes else ""
+    subject = f"{kind or 'chore'}{scope_list}{breaking}: {description}"
+    bullets = []
+    for group, group_kind, group_breaking, group_description in parsed:
+        if group_kind is None:
+            prefix = f"{group.scope}: " if group.scope else ""
+        else:
+            scope = f"({group.scope})" if group.scope else ""
+            prefix = f"{group_kind}{scope}{'!' if group_breaking else ''}: "
+        bullets.append(f"- {prefix}{group_description}")
+    return f"{subject}\n\n" + "\n".join(bullets)
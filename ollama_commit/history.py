@@ -0,0 +1,285 @@
+"""Embedding index of a repository's commit history, for few-shot examples.
+
+Each non-merge commit's message and diffstat are embedded with Ollama and
+stored as normalized float32 rows of ``vectors.f32``, which is memory
+mapped for searching, so a query is one matrix-vector product. The
+messages are appended to ``meta.jsonl``; ``offsets.i64`` holds where each
+row's line ends so a hit is read with one seek. ``index.json`` records the
+embedding model, the number of valid rows and the last indexed HEAD, and
+is replaced last, so an interrupted update leaves a consistent index.
+
+Requires numpy (``pip install 'ollama-commit[history]'``).
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from .profiling import span
+
+DEFAULT_EMBEDDING_MODEL = "nomic-embed-text"
+
+# Files listed per commit in the text that is embedded.
+MAX_STAT_FILES = 20
+# Characters of a commit message that are embedded.
+MAX_MESSAGE_CHARS = 2000
+# Commits embedded between two writes of the index.
+BATCH_SIZE = 256
+
+INDEX_VERSION = 1
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("The history index requires numpy: pip install 'ollama-commit[history]'")
+    return numpy
+
+
+def diffstat(files: Iterable[Tuple[str, int, int]]) -> str:
+    """Describe changed files as ``path +added -deleted`` lines, as embedded for each commit."""
+    files = list(files)
+    lines = [f"{path} +{added} -{deleted}" for path, added, deleted in files[:MAX_STAT_FILES]]
+    if len(files) > MAX_STAT_FILES:
+        lines.append(f"... {len(files) - MAX_STAT_FILES} more files")
+    return "\n".join(lines)
+
+
+@dataclass
+class HistoryCommit:
+    """A commit as it is indexed."""
+
+    sha: str
+    message: str
+    stat: str
+
+    def document(self) -> str:
+        """Text that is embedded for the commit."""
+        return f"{self.message[:MAX_MESSAGE_CHARS].strip()}\n\n{self.stat}"
+
+
+def _git(repo_dir: str, *args: str) -> str:
+    return subprocess.run(["git", "-C", repo_dir, *args], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          universal_newlines=True, check=True).stdout.strip()
+
+
+def _parse_commit(record: str) -> HistoryCommit:
+    sha, message, numstat = record.lstrip("\x1e").split("\x1f", 2)
+    files = []
+    for line in numstat.splitlines():
+        parts = line.split("\t", 2)
+        if len(parts) == 3:
+            # Binary files are listed with "-" counts.
+            files.append((parts[2], int(parts[0]) if parts[0].isdigit() else 0,
+                          int(parts[1]) if parts[1].isdigit() else 0))
+    return HistoryCommit(sha, message.strip(), diffstat(files))
+
+
+def iter_history(repo_dir: str, rev: str) -> Iterator[HistoryCommit]:
+    """Non-merge commits reachable from rev (e.g. ``"a..b"``), oldest first.
+
+    One ``git log --numstat`` is streamed instead of asking for each
+    commit's stats separately, which would start a git process per commit.
+    """
+    process = subprocess.Popen(["git", "-C", repo_dir, "log", "--no-merges", "--reverse", "--numstat",
+                                "--format=%x1e%H%x1f%B%x1f", rev],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               universal_newlines=True, encoding="utf-8", errors="replace")
+    try:
+        record: List[str] = []
+        for line in process.stdout:
+            if line.startswith("\x1e") and record:
+                yield _parse_commit("".join(record))
+                record = []
+            record.append(line)
+        if record:
+            yield _parse_commit("".join(record))
+    finally:
+        process.stdout.close()
+        process.wait()
+
+
+class HistoryIndex:
+    """Embedded commit messages of one repository, searched by cosine similarity."""
+
+    def __init__(self, directory: Union[str, Path]):
+        """Initialize HistoryIndex; nothing is read until it is used."""
+        self.directory = Path(directory)
+        self._info: Optional[dict] = None
+        self._stamp: Optional[int] = None
+        self._vectors: Any = None
+
+    @classmethod
+    def for_repo(cls, root: Union[str, Path], repo_dir: str, model: str = DEFAULT_EMBEDDING_MODEL) -> "HistoryIndex":
+        """Index of repo_dir's history embedded by model, kept under root.
+
+        Worktrees of one repository share an index.
+        """
+        git_dir = os.path.join(repo_dir, _git(repo_dir, "rev-parse", "--git-common-dir"))
+        key = json.dumps([os.path.realpath(git_dir), model])
+        return cls(Path(root) / hashlib.sha256(key.encode("utf-8")).hexdigest()[:16])
+
+    @property
+    def _index_path(self) -> Path:
+        return self.directory / "index.json"
+
+    def exists(self) -> bool:
+        """Whether an index has been built."""
+        return self._index_path.exists()
+
+    @property
+    def info(self) -> dict:
+        """Contents of index.json, re-read when the file changes."""
+        try:
+            stamp = self._index_path.stat().st_mtime_ns
+        except OSError:
+            stamp = None
+        if self._info is None or stamp != self._stamp:
+            info = {}
+            if stamp is not None:
+                try:
+                    with open(self._index_path, "r") as index_file:
+                        info = json.load(index_file)
+                except (OSError, ValueError):
+                    pass
+            if info.get("version") != INDEX_VERSION:
+                info = {}
+            self._info, self._stamp, self._vectors = info, stamp, None
+        return self._info
+
+    @property
+    def model(self) -> Optional[str]:
+        """Embedding model the index was built with."""
+        return self.info.get("model")
+
+    def __len__(self) -> int:
+        return self.info.get("count", 0)
+
+    def update(self, client: Any, repo_dir: str, model: str = DEFAULT_EMBEDDING_MODEL, rebuild: bool = False,
+               workers: int = 4, on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """Embed commits added since the last update; returns how many were added.
+
+        Only the commits between the last indexed HEAD and the current one
+        are read, unless history was rewritten, ``model`` changed or
+        ``rebuild`` is set, in which case the index is built anew.
+        ``on_progress`` is called with (embedded, total) after each batch.
+        """
+        numpy = _numpy()
+        head = _git(repo_dir, "rev-parse", "HEAD")
+        info = dict(self.info)
+        if rebuild or info.get("model") != model or not self._is_ancestor(repo_dir, info.get("head")):
+            info = {"version": INDEX_VERSION, "model": model, "dim": None, "count": 0, "head": None}
+        if info["head"] == head:
+            return 0
+        rev = f"{info['head']}..{head}" if info["head"] else head
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._truncate(info)
+        # Commits indexed by an interrupted update of the same range are skipped.
+        indexed = self._indexed_shas(info["count"])
+        commits = [commit for commit in iter_history(repo_dir, rev) if commit.sha not in indexed]
+        added = 0
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for start in range(0, len(commits), BATCH_SIZE):
+                batch = commits[start:start + BATCH_SIZE]
+                with span("history.embed", commits=len(batch)):
+                    vectors = list(executor.map(lambda commit: client.embed(commit.document(), model), batch))
+                rows = numpy.asarray(vectors, dtype=numpy.float32)
+                if rows.ndim != 2 or not rows.shape[1] or rows.shape[1] != (info["dim"] or rows.shape[1]):
+                    raise ValueError(f"Model {model} did not return embeddings of one size; is it an embedding model?")
+                info["dim"] = int(rows.shape[1])
+                norms = numpy.linalg.norm(rows, axis=1, keepdims=True)
+                rows /= numpy.where(norms == 0, 1, norms)
+                self._append(info, batch, rows)
+                added += len(batch)
+                if on_progress is not None:
+                    on_progress(added, len(commits))
+        info["head"] = head
+        self._write_info(info)
+        return added
+
+    def search(self, vector: List[float], k: int = 3) -> List[Tuple[float, str]]:
+        """The k most similar commits as (cosine similarity, message), best first."""
+        numpy = _numpy()
+        count = len(self)
+        if not count or k <= 0 or not vector:
+            return []
+        with span("history.search", commits=count):
+            if self._vectors is None:
+                self._vectors = numpy.memmap(self.directory / "vectors.f32", dtype=numpy.float32, mode="r",
+                                             shape=(count, self.info["dim"]))
+            query = numpy.asarray(vector, dtype=numpy.float32)
+            norm = numpy.linalg.norm(query)
+            if query.shape != (self.info["dim"],) or norm == 0:
+                return []
+            scores = self._vectors @ (query / norm)
+            k = min(k, count)
+            top = numpy.argpartition(-scores, k - 1)[:k]
+            top = top[numpy.argsort(-scores[top])]
+            return [(float(scores[i]), self._message(int(i))) for i in top]
+
+    def _message(self, row: int) -> str:
+        offsets = _numpy().memmap(self.directory / "offsets.i64", dtype="<i8", mode="r", shape=(len(self),))
+        start = int(offsets[row - 1]) if row else 0
+        with open(self.directory / "meta.jsonl", "rb") as meta_file:
+            meta_file.seek(start)
+            return json.loads(meta_file.read(int(offsets[row]) - start))["message"]
+
+    @staticmethod
+    def _is_ancestor(repo_dir: str, sha: Optional[str]) -> bool:
+        if not sha:
+            return True
+        return subprocess.run(["git", "-C", repo_dir, "merge-base", "--is-ancestor", sha, "HEAD"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+
+    def _indexed_shas(self, count: int) -> Set[str]:
+        shas: Set[str] = set()
+        try:
+            with open(self.directory / "meta.jsonl", "r") as meta_file:
+                for _, line in zip(range(count), meta_file):
+                    shas.add(json.loads(line)["sha"])
+        except (OSError, ValueError):
+            pass
+        return shas
+
+    def _truncate(self, info: dict) -> None:
+        """Drop rows written after index.json was last replaced."""
+        count, dim = info["count"], info["dim"] or 0
+        meta_end = 0
+        if count:
+            offsets = _numpy().memmap(self.directory / "offsets.i64", dtype="<i8", mode="r", shape=(count,))
+            meta_end = int(offsets[-1])
+            del offsets
+        for name, size in (("vectors.f32", count * dim * 4), ("offsets.i64", count * 8), ("meta.jsonl", meta_end)):
+            with open(self.directory / name, "ab") as data_file:
+                data_file.truncate(size)
+        self._vectors = None
+
+    def _append(self, info: dict, commits: List[HistoryCommit], rows: Any) -> None:
+        """Append rows and their messages, then record them in index.json."""
+        numpy = _numpy()
+        with open(self.directory / "meta.jsonl", "ab") as meta_file:
+            end = meta_file.tell()
+            offsets = []
+            for commit in commits:
+                line = json.dumps({"sha": commit.sha, "message": commit.message}).encode("utf-8") + b"\n"
+                meta_file.write(line)
+                end += len(line)
+                offsets.append(end)
+        with open(self.directory / "offsets.i64", "ab") as offsets_file:
+            offsets_file.write(numpy.asarray(offsets, dtype="<i8").tobytes())
+        with open(self.directory / "vectors.f32", "ab") as vectors_file:
+            vectors_file.write(numpy.ascontiguousarray(rows, dtype="<f4").tobytes())
+        info["count"] += len(commits)
+        self._write_info(info)
+
+    def _write_info(self, info: dict) -> None:
+        tmp_path = self.directory / f".index.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as index_file:
+            json.dump(info, index_file)
+        os.replace(tmp_path, self._index_path)
+        self._info, self._stamp, self._vectors = None, None, None
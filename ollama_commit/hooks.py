@@ -0,0 +1,115 @@
+"""Commit hooks that fill in a message generated while files were being staged.
+
+``post-index-change`` starts a detached ``pregenerate`` worker after every
+``git add``. The worker waits for staging to settle, generates a message
+for the staged changes and stores it under :func:`staged_key`.
+``prepare-commit-msg`` then waits at most a short deadline for that
+message and otherwise leaves git's template alone, so ``git commit``
+never waits for the model.
+"""
+
+import hashlib
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Union
+from .cache import MessageCache
+from .warmup import HOOK_NAME, write_hook
+
+PREPARE_HOOK_NAME = "prepare-commit-msg"
+
+# Seconds prepare-commit-msg waits for a message still being generated.
+DEFAULT_HOOK_DEADLINE = 0.3
+# Seconds a worker waits for further `git add`s before reading the index.
+DEFAULT_SETTLE = 0.5
+# A generation claimed longer ago than this, in seconds, is assumed dead.
+PENDING_TIMEOUT = 120.0
+POLL_INTERVAL = 0.02
+
+
+def staged_key(repo_path: str, model: str) -> Optional[str]:
+    """Key of the staged tree on top of HEAD for model, or None outside a repository.
+
+    Hashes ``git ls-files -s`` rather than running ``git write-tree``,
+    which needs the index lock that ``git commit`` holds while its hooks
+    run. Honours ``GIT_INDEX_FILE``, as set for ``git commit -a``.
+    """
+    try:
+        staged = subprocess.run(["git", "ls-files", "-s", "-z"], cwd=repo_path,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout
+        head = subprocess.run(["git", "rev-parse", "-q", "--verify", "HEAD"], cwd=repo_path,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    digest = hashlib.sha256(f"{model}\0".encode("utf-8") + head + b"\0")
+    digest.update(staged)
+    return digest.hexdigest()
+
+
+class PregeneratedMessages(MessageCache):
+    """Messages generated ahead of ``git commit``, with markers for those in progress."""
+
+    def __init__(self, directory: Union[str, Path], max_entries: int = 64, max_age: float = 24 * 3600):
+        """Initialize PregeneratedMessages; see MessageCache for the eviction parameters."""
+        super().__init__(directory, max_entries, max_age)
+
+    def _pending_path(self, key: str) -> Path:
+        return self.directory / f"{key}.pending"
+
+    def pending(self, key: str) -> bool:
+        """Whether a live worker is generating the message for key."""
+        try:
+            return time.time() - self._pending_path(key).stat().st_mtime < PENDING_TIMEOUT
+        except OSError:
+            return False
+
+    def claim(self, key: str) -> bool:
+        """Mark key as in progress; False if another worker already is generating it."""
+        path = self._pending_path(key)
+        if path.exists() and not self.pending(key):
+            self._remove(path)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except OSError:
+            return False
+        return True
+
+    def release(self, key: str) -> None:
+        """Remove the in-progress marker of key."""
+        self._remove(self._pending_path(key))
+
+    def wait(self, key: str, deadline: float) -> Optional[str]:
+        """The message for key once ready, or None if none is coming before ``time.monotonic()`` reaches deadline."""
+        while True:
+            message = self.get(key)
+            if message is not None or not self.pending(key) or time.monotonic() >= deadline:
+                return message
+            time.sleep(min(POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+
+
+def prepend_message(path: Union[str, Path], message: str) -> None:
+    """Put message above the template git wrote to the commit message file."""
+    with open(path, "r", encoding="utf-8", errors="surrogateescape") as message_file:
+        template = message_file.read()
+    with open(path, "w", encoding="utf-8", errors="surrogateescape") as message_file:
+        message_file.write(f"{message}\n{template}")
+
+
+def install_commit_hooks(repo_path: str = ".", force: bool = False) -> List[Path]:
+    """Install the prepare-commit-msg hook and the post-index-change hook that feeds it.
+
+    The latter replaces the warm-up hook, since generating loads the model
+    anyway. Hooks not written by ollama-commit are only replaced with ``force``.
+    """
+    python = f'"{sys.executable}" -m ollama_commit.cli'
+    return [
+        write_hook(repo_path, HOOK_NAME, "generate a commit message in the background whenever files are staged.",
+                   f"{python} pregenerate --background >/dev/null 2>&1 || true\n", force),
+        # Only plain `git commit`: not -m, -F, merges, squashes or amends.
+        write_hook(repo_path, PREPARE_HOOK_NAME, "fill in the message generated while files were staged.",
+                   f'case "$2" in\n""|template) {python} prepare-commit-msg "$1" 2>/dev/null ;;\nesac\nexit 0\n',
+                   force),
+    ]
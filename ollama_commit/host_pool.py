@@ -0,0 +1,135 @@
+"""Routing of requests across several Ollama servers."""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Collection, Dict, List, Optional, Sequence
+
+STRATEGIES = ("least-outstanding", "latency")
+
+
+@dataclass
+class HostState:
+    """Load and health of one Ollama server."""
+
+    url: str
+    outstanding: int = 0
+    latency: Optional[float] = None
+    failures: int = 0
+    open_until: float = 0.0
+    models: Optional[List[str]] = None
+    checked_at: float = 0.0
+    # Whether the one request let through after a cooldown is in flight.
+    probing: bool = False
+
+    def circuit_open(self, now: float) -> bool:
+        """Whether requests to the host are currently suspended."""
+        return now < self.open_until or self.probing
+
+    def status(self) -> Dict[str, Any]:
+        """Health summary for display."""
+        return {
+            "host": self.url,
+            "available": self.models is not None,
+            "models": self.models or [],
+            "outstanding": self.outstanding,
+            "latency_ms": None if self.latency is None else round(self.latency * 1000),
+            "failures": self.failures,
+            "circuit_open": self.circuit_open(time.monotonic()),
+        }
+
+
+class HostPool:
+    """Picks a server for each request and tracks how the servers behave.
+
+    ``"least-outstanding"`` routes to the host with the fewest requests in
+    flight; ``"latency"`` weighs that count by each host's average request
+    time. After ``failure_threshold`` consecutive failures a host's circuit
+    opens and it is skipped for ``cooldown`` seconds, after which one
+    request is let through to test it again. Other requests keep skipping
+    the host until that one ends, which closes the circuit or reopens it.
+    """
+
+    def __init__(self, hosts: Sequence[str], strategy: str = "least-outstanding",
+                 failure_threshold: int = 3, cooldown: float = 30.0, latency_decay: float = 0.3):
+        """Initialize HostPool with server base URLs."""
+        if not hosts:
+            raise ValueError("At least one Ollama host is required.")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown routing strategy: {strategy} (choose from {', '.join(STRATEGIES)})")
+        self.hosts = [HostState(url.rstrip("/")) for url in hosts]
+        self.strategy = strategy
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.latency_decay = latency_decay
+        self._lock = threading.Lock()
+
+    def select(self, exclude: Collection[str] = ()) -> Optional[HostState]:
+        """Pick the host for the next request, skipping URLs in exclude.
+
+        Returns None once every host has been excluded. If all remaining
+        circuits are open, the one that opened first is tried anyway.
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [host for host in self.hosts if host.url not in exclude]
+            if not candidates:
+                return None
+            closed = [host for host in candidates if not host.circuit_open(now)]
+            if not closed:
+                return min(candidates, key=lambda host: host.open_until)
+            host = min(closed, key=self._cost)
+            if host.open_until:
+                # Cooled down but not yet healthy: this request is the probe,
+                # and the host is skipped again until it ends.
+                host.probing = True
+            return host
+
+    def begin(self, host: HostState) -> float:
+        """Count a request to host as in flight; returns its start time."""
+        with self._lock:
+            host.outstanding += 1
+        return time.monotonic()
+
+    def end(self, host: HostState, started: float, ok: bool = True) -> None:
+        """Record the outcome of a request started with begin()."""
+        now = time.monotonic()
+        with self._lock:
+            host.outstanding -= 1
+            host.probing = False
+            if ok:
+                elapsed = now - started
+                host.latency = elapsed if host.latency is None else \
+                    host.latency + self.latency_decay * (elapsed - host.latency)
+                host.failures = 0
+                host.open_until = 0.0
+            else:
+                host.failures += 1
+                if host.failures >= self.failure_threshold:
+                    host.open_until = now + self.cooldown
+
+    def mark_down(self, host: HostState) -> None:
+        """Open the host's circuit after a failed health check."""
+        with self._lock:
+            host.failures = max(host.failures, self.failure_threshold)
+            host.open_until = time.monotonic() + self.cooldown
+            host.probing = False
+
+    def mark_up(self, host: HostState) -> None:
+        """Close the host's circuit after a successful health check."""
+        with self._lock:
+            host.failures = 0
+            host.open_until = 0.0
+            host.probing = False
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Health summary of every host."""
+        with self._lock:
+            return [host.status() for host in self.hosts]
+
+    def _cost(self, host: HostState) -> tuple:
+        """Sort key for routing; earlier hosts win ties."""
+        if self.strategy == "latency":
+            # Hosts without a measurement yet are tried first.
+            return ((host.outstanding + 1) * (host.latency or 0.0), host.outstanding)
+        return (host.outstanding, host.latency or 0.0)
@@ -1,120 +1,435 @@
 """Ollama API client for generating commit messages."""
 
 import json
+import time
 import requests
-from typing import Optional, Dict, Any
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, Iterator, List, Sequence, Tuple, Union
+from .client_base import (
+    ClientBase, KeepAlive, CHUNK_SYSTEM, COMBINE_SYSTEM, COMMIT_SYSTEM, DEFAULT_CONTEXT_WINDOW, DEFAULT_OPTIONS,
+    MAX_DIFF_LENGTH, PROMPT_VERSION, SUMMARY_OPTIONS, UNAVAILABLE_MESSAGE,
+)
+from .host_pool import HostPool, HostState
+from .profiling import annotate, record_ollama, span
 
 
-class OllamaClient:
+def create_session(pool_size: int = 10, keep_alive: bool = True,
+                   max_retries: int = 2, backoff_factor: float = 0.3) -> requests.Session:
+    """Create a pooled HTTP session for talking to Ollama.
+    
+    Only connection failures and gateway errors are retried, so a request
+    that reached the model is never generated twice.
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=0,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(["GET", "POST"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+class OllamaClient(ClientBase):
     """Client for interacting with Ollama API."""
     
-    def __init__(self, base_url: str = "http://localhost:11434", model: str = "codellama"):
-        """Initialize Ollama client."""
-        self.base_url = base_url.rstrip("/")
-        self.model = model
+    def __init__(self, base_url: Union[str, Sequence[str]] = "http://localhost:11434", model: str = "codellama",
+                 session: Optional[requests.Session] = None, options: Optional[Dict[str, Any]] = None,
+                 tags_ttl: float = 30.0,
+                 tags_cache_path: Optional[Union[str, Path]] = None, routing: str = "least-outstanding",
+                 failure_threshold: int = 3, cooldown: float = 30.0, model_keep_alive: KeepAlive = None,
+                 system_prompt: bool = True, commit_options: Optional[Dict[str, Any]] = None,
+                 structured: bool = False, **session_options: Any):
+        """Initialize Ollama client.
+        
+        A pooled session is created from ``session_options`` (see
+        :func:`create_session`) unless an existing ``session`` is passed in.
+        ``options`` are merged over the default generation options;
+        ``commit_options`` and ``structured`` are described in :class:`ClientBase`.
+        Successful ``/api/tags`` responses are cached for ``tags_ttl`` seconds,
+        and also in ``tags_cache_path`` so separate processes can share them.
+        
+        ``base_url`` may be a list of servers; requests are then spread over
+        them by a :class:`HostPool` using ``routing``, and a request that
+        cannot reach one server is retried on the next. ``failure_threshold``
+        and ``cooldown`` control when a failing server is skipped.
+        """
+        hosts = [base_url] if isinstance(base_url, str) else list(base_url)
+        self.pool = HostPool(hosts, routing, failure_threshold, cooldown)
+        super().__init__(self.pool.hosts[0].url, model, options, model_keep_alive, system_prompt, commit_options,
+                         structured)
+        if len(hosts) > 1:
+            # Fail over to another host rather than retrying a dead one.
+            session_options.setdefault("max_retries", 0)
+        self.session = session if session is not None else create_session(**session_options)
+        self.tags_ttl = tags_ttl
+        self.tags_cache_path = Path(tags_cache_path) if tags_cache_path else None
+        self._context_window: Optional[int] = None
+    
+    def close(self) -> None:
+        """Close pooled connections."""
+        self.session.close()
+    
+    def __enter__(self) -> "OllamaClient":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
     
     def is_available(self) -> bool:
-        """Check if Ollama is available."""
-        try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
-            return response.status_code == 200
-        except requests.RequestException:
-            return False
+        """Check if Ollama is available on at least one host."""
+        return self._get_tags() is not None
     
     def list_models(self) -> list:
-        """List available models."""
-        try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                return [model["name"] for model in data.get("models", [])]
-            return []
-        except requests.RequestException:
-            return []
-    
-    def generate_commit_message(self, diff_text: str, file_summary: Dict[str, Any]) -> Optional[str]:
-        """Generate commit message using Ollama."""
-        if not self.is_available():
-            raise ConnectionError("Ollama is not available. Make sure it's running.")
-        
-        prompt = self._create_commit_prompt(diff_text, file_summary)
+        """List models available on any host."""
+        return self._get_tags() or []
+    
+    def host_status(self) -> List[Dict[str, Any]]:
+        """Availability, models, load and circuit state of each host."""
+        self._get_tags()
+        return self.pool.status()
+    
+    def invalidate_tags(self) -> None:
+        """Forget cached availability and model lists."""
+        for host in self.pool.hosts:
+            host.models = None
+            host.checked_at = 0.0
+        if self.tags_cache_path is not None:
+            try:
+                self.tags_cache_path.unlink()
+            except OSError:
+                pass
+    
+    def _get_tags(self) -> Optional[List[str]]:
+        """Return model names from /api/tags of all hosts, or None if none is reachable.
         
+        Each host's answer, including a failure, is cached for ``tags_ttl``
+        seconds; stale hosts are checked concurrently.
+        """
+        now = time.time()
+        stale = [host for host in self.pool.hosts if not 0 <= now - host.checked_at < self.tags_ttl]
+        if stale:
+            self._read_tags_cache(stale, now)
+            stale = [host for host in stale if not 0 <= now - host.checked_at < self.tags_ttl]
+        if len(stale) == 1:
+            self._check_host(stale[0], now)
+        elif stale:
+            with ThreadPoolExecutor(max_workers=len(stale)) as executor:
+                list(executor.map(lambda host: self._check_host(host, now), stale))
+        if stale:
+            self._write_tags_cache()
+        models: Optional[List[str]] = None
+        for host in self.pool.hosts:
+            if host.models is not None:
+                models = (models or []) + [name for name in host.models if name not in (models or [])]
+        return models
+    
+    def _check_host(self, host: HostState, now: float) -> None:
+        """Fetch one host's model list, opening its circuit if it is unreachable."""
+        host.checked_at = now
         try:
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.3,
-                        "top_p": 0.9,
-                        "max_tokens": 150,
-                    }
-                },
-                timeout=30
-            )
-            
+            response = self.session.get(f"{host.url}/api/tags", timeout=5)
             if response.status_code == 200:
-                result = response.json()
-                commit_message = result.get("response", "").strip()
-                return self._clean_commit_message(commit_message)
+                host.models = [model["name"] for model in response.json().get("models", [])]
+                self.pool.mark_up(host)
+                return
+        except (requests.RequestException, ValueError):
+            pass
+        host.models = None
+        if len(self.pool.hosts) > 1:
+            self.pool.mark_down(host)
+    
+    def _read_tags_cache(self, hosts: List[HostState], now: float) -> None:
+        """Load fresh model lists for hosts from the on-disk cache."""
+        if self.tags_cache_path is None:
+            return
+        try:
+            with open(self.tags_cache_path, 'r') as cache_file:
+                entries = json.load(cache_file).get("hosts", {})
+        except (OSError, ValueError, AttributeError):
+            return
+        for host in hosts:
+            entry = entries.get(host.url)
+            if isinstance(entry, dict) and 0 <= now - entry.get("time", 0) < self.tags_ttl:
+                host.models = entry.get("models", [])
+                host.checked_at = entry["time"]
+    
+    def _write_tags_cache(self) -> None:
+        """Store the model lists of reachable hosts in the on-disk cache."""
+        if self.tags_cache_path is None:
+            return
+        try:
+            with open(self.tags_cache_path, 'r') as cache_file:
+                entries = json.load(cache_file).get("hosts", {})
+        except (OSError, ValueError, AttributeError):
+            entries = {}
+        for host in self.pool.hosts:
+            if host.models is not None:
+                entries[host.url] = {"time": host.checked_at, "models": host.models}
             else:
-                raise Exception(f"Ollama API error: {response.status_code}")
-                
-        except requests.RequestException as e:
-            raise Exception(f"Failed to connect to Ollama: {str(e)}")
-    
-    def _create_commit_prompt(self, diff_text: str, file_summary: Dict[str, Any]) -> str:
-        """Create prompt for commit message generation."""
-        files_info = f"Files changed: {len(file_summary.get('staged_files', []))}"
-        if file_summary.get('added', 0) > 0:
-            files_info += f", {file_summary['added']} added"
-        if file_summary.get('modified', 0) > 0:
-            files_info += f", {file_summary['modified']} modified"
-        if file_summary.get('deleted', 0) > 0:
-            files_info += f", {file_summary['deleted']} deleted"
+                entries.pop(host.url, None)
+        try:
+            self.tags_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.tags_cache_path, 'w') as cache_file:
+                json.dump({"hosts": entries}, cache_file)
+        except OSError:
+            pass
+    
+    def generate_commit_message(self, diff_text: str, file_summary: Dict[str, Any],
+                                on_token: Optional[Callable[[str], None]] = None,
+                                max_diff_length: Optional[int] = MAX_DIFF_LENGTH) -> Optional[str]:
+        """Generate commit message using Ollama.
         
-        # Truncate diff if too long
-        max_diff_length = 2000
-        if len(diff_text) > max_diff_length:
-            diff_text = diff_text[:max_diff_length] + "\n... (truncated)"
+        The request goes straight to /api/generate; if the server cannot be
+        reached a :class:`ConnectionError` is raised.
         
-        prompt = f"""You are a helpful assistant that generates concise, descriptive Git commit messages.
-
-Based on the following git diff and file changes, generate a single line commit message that:
-1. Follows conventional commit format (type: description)
-2. Is concise but descriptive (50 characters or less preferred)
-3. Uses present tense ("Add feature" not "Added feature")
-4. Common types: feat, fix, docs, style, refactor, test, chore
-
-{files_info}
-
-Git diff:
-{diff_text}
+        If ``on_token`` is given the response is streamed, each token is passed
+        to it as it arrives, and reading stops once the subject line is
+        complete (see :meth:`_subject_head`). Structured answers are always
+        streamed and cut off once the JSON object is complete; ``on_token``
+        then receives the rendered message.
+        ``diff_text`` is truncated to ``max_diff_length`` characters unless it
+        is None, e.g. for diffs that were already compacted to a budget.
+        """
+        with span("prompt.build"):
+            prompt = self._create_commit_prompt(diff_text, file_summary, max_diff_length)
+        return self._complete_commit_prompt(prompt, on_token)
+    
+    def generate_commit_message_from_summaries(self, summaries: List[str], file_summary: Dict[str, Any],
+                                               on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """Generate commit message from per-chunk change summaries."""
+        prompt = self._create_reduce_prompt(summaries, file_summary)
+        return self._complete_commit_prompt(prompt, on_token)
+    
+    def summarize_diff_chunk(self, chunk_text: str) -> str:
+        """Summarize one part of a large diff."""
+        return self.generate(self._create_chunk_prompt(chunk_text), system=CHUNK_SYSTEM, options=SUMMARY_OPTIONS).strip()
+    
+    def combine_summaries(self, summaries: List[str]) -> str:
+        """Merge several change summaries into one shorter summary."""
+        return self.generate(self._create_combine_prompt(summaries), system=COMBINE_SYSTEM,
+                             options=SUMMARY_OPTIONS).strip()
+    
+    def generate(self, prompt: str, system: Optional[str] = None, options: Optional[Dict[str, Any]] = None,
+                 format: Optional[Dict[str, Any]] = None) -> str:
+        """Run a prompt through /api/generate and return the raw response text.
+        
+        ``options`` are merged over the client's; ``format`` is a JSON schema
+        the answer must match.
+        """
+        with span("ollama.generate", prompt_chars=len(prompt)):
+            response, host, started = self._post_generate(prompt, False, system, options, format)
+            self.pool.end(host, started, ok=response.status_code < 500)
+            annotate(host=host.url)
+            try:
+                if response.status_code == 200:
+                    result = response.json()
+                    record_ollama(result)
+                    return result.get("response", "")
+                else:
+                    raise Exception(f"Ollama API error: {response.status_code}")
+                    
+            except requests.RequestException as e:
+                raise Exception(f"Failed to connect to Ollama: {str(e)}")
+    
+    def embed(self, text: str, model: Optional[str] = None) -> List[float]:
+        """Embedding of text from /api/embeddings, by ``model`` or the client's model."""
+        payload: Dict[str, Any] = {"model": model or self.model, "prompt": text}
+        if self.model_keep_alive is not None:
+            payload["keep_alive"] = self.model_keep_alive
+        with span("ollama.embed", prompt_chars=len(text)):
+            response, host, started = self._post("/api/embeddings", payload)
+            self.pool.end(host, started, ok=response.status_code < 500)
+            annotate(host=host.url)
+            if response.status_code != 200:
+                raise Exception(f"Ollama API error: {response.status_code}")
+            return response.json().get("embedding") or []
 
-Generate only the commit message, nothing else:"""
+    def warmup(self) -> bool:
+        """Load the model into memory with an empty prompt; True if it succeeded.
         
-        return prompt
+        With several hosts only the host picked by the pool is warmed.
+        """
+        try:
+            response, host, started = self._post("/api/generate", self._warmup_payload(), timeout=120)
+        except Exception:
+            # ConnectionError when no host is reachable, Exception on other failures.
+            return False
+        self.pool.end(host, started, ok=response.status_code < 500)
+        return response.status_code == 200
     
-    def _clean_commit_message(self, message: str) -> str:
-        """Clean and format the commit message."""
-        # Remove any extra whitespace and newlines
-        message = message.strip()
+    def prime(self, prompt: Optional[str] = None) -> bool:
+        """Load the model and evaluate the commit instructions and prompt into its KV cache.
         
-        # Take only the first line if multiple lines
-        lines = message.split('\n')
-        if lines:
-            message = lines[0].strip()
+        Ollama reuses the cached tokens for a later request that starts the
+        same way, so only the rest of it has to be evaluated. ``prompt``
+        defaults to the fixed start of the commit message prompt. Returns
+        True if it succeeded.
+        """
+        prompt = self._commit_prompt_prefix() if prompt is None else prompt
+        with span("ollama.prime", prompt_chars=len(prompt)):
+            try:
+                response, host, started = self._post("/api/generate", self._prime_payload(prompt), timeout=120)
+            except Exception:
+                # ConnectionError when no host is reachable, Exception on other failures.
+                return False
+            self.pool.end(host, started, ok=response.status_code < 500)
+            annotate(host=host.url)
+            if response.status_code != 200:
+                return False
+            try:
+                record_ollama(response.json())
+            except ValueError:
+                pass
+            return True
+    
+    def context_window(self) -> int:
+        """Context size in tokens used for generate requests.
         
-        # Remove quotes if present
-        if message.startswith('"') and message.endswith('"'):
-            message = message[1:-1]
-        if message.startswith("'") and message.endswith("'"):
-            message = message[1:-1]
+        Uses ``num_ctx`` from the options if set, otherwise the model's
+        ``num_ctx`` parameter from /api/show, otherwise Ollama's default.
+        """
+        if self.options.get("num_ctx"):
+            return int(self.options["num_ctx"])
+        if self._context_window is None:
+            self._context_window = DEFAULT_CONTEXT_WINDOW
+            try:
+                response, host, started = self._post("/api/show", {"model": self.model}, timeout=5)
+                self.pool.end(host, started)
+                if response.status_code == 200:
+                    for line in response.json().get("parameters", "").splitlines():
+                        parts = line.split()
+                        if len(parts) == 2 and parts[0] == "num_ctx":
+                            self._context_window = int(parts[1])
+            except Exception:
+                # Unreachable hosts, failed requests and malformed answers
+                # all fall back to the default.
+                pass
+        return self._context_window
+    
+    def _complete_commit_prompt(self, prompt: str, on_token: Optional[Callable[[str], None]]) -> Optional[str]:
+        """Run a commit message prompt, streaming if ``on_token`` is given or the answer is structured."""
+        if self.structured:
+            message = self._structured_message(self._stream_subject(prompt, None))
+            if on_token is not None and message is not None:
+                on_token(message)
+            return message
+        if on_token is not None:
+            return self._clean_commit_message(self._stream_subject(prompt, on_token))
+        return self._clean_commit_message(self.generate(prompt, **self._commit_request()).strip())
+    
+    def _post_generate(self, prompt: str, stream: bool, system: Optional[str] = None,
+                       options: Optional[Dict[str, Any]] = None,
+                       format: Optional[Dict[str, Any]] = None) -> Tuple[requests.Response, HostState, float]:
+        """POST a generate request to a host from the pool."""
+        return self._post("/api/generate", self._generate_payload(prompt, stream, system, options, format),
+                          stream=stream, timeout=30)
+    
+    def _post(self, path: str, payload: Dict[str, Any], stream: bool = False,
+              timeout: float = 30) -> Tuple[requests.Response, HostState, float]:
+        """POST to the host picked by the pool, failing over to the others.
         
-        # Ensure it doesn't end with a period
-        if message.endswith('.'):
-            message = message[:-1]
+        Hosts that cannot be reached or answer with a gateway error are
+        skipped; when none is left a :class:`ConnectionError` is raised.
+        The request stays counted as in flight on the returned host until
+        it is passed to ``self.pool.end`` with the returned start time.
+        """
+        tried: List[str] = []
+        while True:
+            host = self.pool.select(exclude=tried)
+            if host is None:
+                self.invalidate_tags()
+                raise ConnectionError(UNAVAILABLE_MESSAGE)
+            tried.append(host.url)
+            started = self.pool.begin(host)
+            try:
+                response = self.session.post(f"{host.url}{path}", json=payload, stream=stream, timeout=timeout)
+            except requests.ConnectionError:
+                self.pool.end(host, started, ok=False)
+                continue
+            except requests.RequestException as e:
+                self.pool.end(host, started, ok=False)
+                raise Exception(f"Failed to connect to Ollama: {str(e)}")
+            if response.status_code in (502, 503, 504) and len(tried) < len(self.pool.hosts):
+                response.close()
+                self.pool.end(host, started, ok=False)
+                continue
+            return response, host, started
+    
+    def stream_commit_message(self, diff_text: str, file_summary: Dict[str, Any]) -> Iterator[str]:
+        """Stream commit message tokens from Ollama as they are generated."""
+        prompt = self._create_commit_prompt(diff_text, file_summary)
+        return self._stream_generate(prompt, **self._commit_request())
+    
+    def _stream_generate(self, prompt: str, system: Optional[str] = None, options: Optional[Dict[str, Any]] = None,
+                         format: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Yield response tokens from the NDJSON stream of /api/generate.
+        
+        Closing the generator closes the HTTP response, which makes Ollama
+        stop generating.
+        """
+        response, host, started = self._post_generate(prompt, True, system, options, format)
+        annotate(host=host.url)
+        with response:
+            ok = response.status_code < 500
+            try:
+                if response.status_code != 200:
+                    raise Exception(f"Ollama API error: {response.status_code}")
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise Exception(f"Ollama API error: {chunk['error']}")
+                    token = chunk.get("response", "")
+                    if token:
+                        yield token
+                    if chunk.get("done"):
+                        # Ollama's timings arrive with the last chunk only.
+                        record_ollama(chunk)
+                        break
+            except requests.RequestException as e:
+                ok = False
+                raise Exception(f"Failed to connect to Ollama: {str(e)}")
+            finally:
+                self.pool.end(host, started, ok=ok)
+    
+    def _stream_subject(self, prompt: str, on_token: Optional[Callable[[str], None]]) -> str:
+        """Stream a commit message until its subject line, or its JSON object, is complete.
         
-        return message
\ No newline at end of file
+        Tokens are passed to ``on_token`` unless the answer is structured.
+        When profiling, the time to the first token is recorded, since the
+        stream is usually closed before Ollama reports its own timings.
+        """
+        text = ""
+        with span("ollama.stream", prompt_chars=len(prompt)) as current:
+            tokens = self._stream_generate(prompt, **self._commit_request())
+            try:
+                for token in tokens:
+                    if current is not None and not text:
+                        annotate(first_token_ms=round(current.duration * 1000, 3))
+                    text += token
+                    if self.structured:
+                        if self._answer_complete(text):
+                            break
+                        continue
+                    head = self._subject_head(text, token)
+                    if on_token is not None:
+                        on_token(token if head is None else head)
+                    if head is not None:
+                        break
+            finally:
+                tokens.close()
+        return text
@@ -0,0 +1,251 @@
+"""Lightweight timing of the phases of a run.
+
+Code wraps its phases in :func:`span`; while a :class:`Profiler` is
+active in the current context the spans are recorded, otherwise they cost
+a context variable lookup. Spans are nested by context, so work handed to
+threads must run in a copy of the caller's context (see :func:`bind`).
+"""
+
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Timing fields of an Ollama /api/generate response, in nanoseconds.
+OLLAMA_DURATIONS = ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration")
+OLLAMA_COUNTS = ("prompt_eval_count", "eval_count")
+
+_profiler: contextvars.ContextVar = contextvars.ContextVar("ollama_commit_profiler", default=None)
+_current: contextvars.ContextVar = contextvars.ContextVar("ollama_commit_span", default=None)
+
+
+@dataclass
+class Span:
+    """One timed phase."""
+
+    name: str
+    start: float
+    end: Optional[float] = None
+    parent: Optional["Span"] = field(default=None, repr=False)
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        """Seconds from start to end, or so far if still open."""
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    @property
+    def depth(self) -> int:
+        """Number of enclosing spans."""
+        depth, parent = 0, self.parent
+        while parent is not None:
+            depth, parent = depth + 1, parent.parent
+        return depth
+
+
+class Profiler:
+    """Collects the spans of one run.
+
+    With ``tracer`` (an OpenTelemetry ``Tracer``) every span is also
+    started as an OpenTelemetry span with the same name and attributes.
+    """
+
+    def __init__(self, tracer: Any = None):
+        """Initialize Profiler."""
+        self.tracer = tracer
+        self.spans: List[Span] = []
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self) -> Iterator["Profiler"]:
+        """Record spans opened in this context until the block exits."""
+        token = _profiler.set(self)
+        try:
+            yield self
+        finally:
+            _profiler.reset(token)
+
+    def add(self, span: Span) -> None:
+        """Record a span."""
+        with self._lock:
+            self.spans.append(span)
+
+    def merge(self, spans: List[Dict[str, Any]], parent: Optional[Span] = None) -> None:
+        """Add spans from another process's report() under parent.
+
+        Their times are shifted so the first one starts with parent.
+        """
+        if not spans:
+            return
+        base = parent.start if parent is not None else self.started
+        offset = base - (self.started + spans[0]["start_ms"] / 1000)
+        created: List[Span] = []
+        for entry in spans:
+            index = entry.get("parent")
+            span = Span(entry["name"], self.started + entry["start_ms"] / 1000 + offset,
+                        parent=created[index] if index is not None else parent,
+                        attributes=dict(entry.get("attributes") or {}))
+            span.end = span.start + entry["duration_ms"] / 1000
+            created.append(span)
+        with self._lock:
+            self.spans.extend(created)
+
+    def report(self) -> Dict[str, Any]:
+        """Spans and Ollama totals as a JSON-serializable dict.
+
+        Times are in milliseconds from the profiler's start; ``parent`` is
+        the index of the enclosing span.
+        """
+        with self._lock:
+            # A parent never sorts after its children, even when they start together.
+            spans = sorted(self.spans, key=lambda span: (span.start, span.depth))
+        index = {id(span): i for i, span in enumerate(spans)}
+        return {
+            "total_ms": _ms(max([span.end or span.start for span in spans] + [self.started]) - self.started),
+            "spans": [{
+                "name": span.name,
+                "start_ms": _ms(span.start - self.started),
+                "duration_ms": _ms(span.duration),
+                "parent": index.get(id(span.parent)),
+                "attributes": span.attributes,
+            } for span in spans],
+            "ollama": self.ollama_totals(spans),
+        }
+
+    def ollama_totals(self, spans: Optional[List[Span]] = None) -> Dict[str, Any]:
+        """Sum of the timings Ollama reported over all requests, durations in ms."""
+        sums = dict.fromkeys(OLLAMA_DURATIONS + OLLAMA_COUNTS, 0)
+        requests = 0
+        for span in spans if spans is not None else list(self.spans):
+            if not any(key in span.attributes for key in sums):
+                continue
+            requests += 1
+            for key in sums:
+                sums[key] += span.attributes.get(key, 0)
+        totals: Dict[str, Any] = {"requests": requests}
+        for key in OLLAMA_DURATIONS:
+            totals[key] = round(sums[key] / 1e6, 3)
+        for key in OLLAMA_COUNTS:
+            totals[key] = sums[key]
+        return totals
+
+    def to_json(self) -> str:
+        """report() as JSON text."""
+        return json.dumps(self.report(), indent=2)
+
+    def table(self) -> str:
+        """report() as an indented table of phases."""
+        report = self.report()
+        spans = report["spans"]
+        depths: List[int] = []
+        for entry in spans:
+            depths.append(0 if entry["parent"] is None else depths[entry["parent"]] + 1)
+        rows = []
+        for entry, depth in zip(spans, depths):
+            rows.append(("  " * depth + entry["name"], entry["duration_ms"], _details(entry["attributes"])))
+            attributes = entry["attributes"]
+            for label, duration_key, count_key in (("load", "load_duration", None),
+                                                   ("prefill", "prompt_eval_duration", "prompt_eval_count"),
+                                                   ("decode", "eval_duration", "eval_count")):
+                if duration_key in attributes:
+                    detail = ""
+                    if count_key in attributes:
+                        count = attributes[count_key]
+                        seconds = attributes[duration_key] / 1e9
+                        detail = f"{count} tokens" + (f", {count / seconds:.1f} tok/s" if seconds else "")
+                    rows.append(("  " * (depth + 1) + label, attributes[duration_key] / 1e6, detail))
+        width = max([len(row[0]) for row in rows] + [len("phase")])
+        lines = [f"{'phase':<{width}}  {'ms':>9}  details"]
+        for name, duration, detail in rows:
+            lines.append(f"{name:<{width}}  {duration:>9.1f}  {detail}".rstrip())
+        lines.append(f"{'total':<{width}}  {report['total_ms']:>9.1f}")
+        return "\n".join(lines)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def _details(attributes: Dict[str, Any]) -> str:
+    """Attributes shown in the table; Ollama timings get rows of their own."""
+    return ", ".join(f"{key}={value}" for key, value in attributes.items()
+                     if key not in OLLAMA_DURATIONS and key not in OLLAMA_COUNTS)
+
+
+def active() -> bool:
+    """Whether spans are being recorded in this context."""
+    return _profiler.get() is not None
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time the enclosed block as a phase called name.
+
+    Yields the Span, or None when no profiler is active.
+    """
+    profiler = _profiler.get()
+    if profiler is None:
+        yield None
+        return
+    current = Span(name, time.perf_counter(), parent=_current.get(), attributes=attributes)
+    token = _current.set(current)
+    otel = None
+    if profiler.tracer is not None:
+        # The OpenTelemetry context nests its spans the same way ours are.
+        otel = profiler.tracer.start_as_current_span(name)
+        otel_span = otel.__enter__()
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes.setdefault("error", type(e).__name__)
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current.reset(token)
+        profiler.add(current)
+        if otel is not None:
+            for key, value in current.attributes.items():
+                if isinstance(value, (str, bool, int, float)):
+                    otel_span.set_attribute(f"ollama_commit.{key}", value)
+            otel.__exit__(None, None, None)
+
+
+def annotate(**attributes: Any) -> None:
+    """Add attributes to the innermost open span, if any."""
+    current = _current.get()
+    if current is not None and _profiler.get() is not None:
+        current.attributes.update(attributes)
+
+
+def record_ollama(result: Dict[str, Any]) -> None:
+    """Attach the timings from an Ollama response to the innermost span."""
+    if _profiler.get() is None:
+        return
+    annotate(**{key: result[key] for key in OLLAMA_DURATIONS + OLLAMA_COUNTS if key in result})
+
+
+def bind(func: Callable) -> Callable:
+    """Wrap func to run in a copy of the current context, e.g. in a worker thread."""
+    if _profiler.get() is None:
+        return func
+    context = contextvars.copy_context()
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        return context.copy().run(func, *args, **kwargs)
+
+    return run
+
+
+def opentelemetry_tracer() -> Any:
+    """Tracer for OpenTelemetry spans; requires the ``opentelemetry-api`` package."""
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        raise ImportError("OpenTelemetry spans require the opentelemetry-api package: "
+                          "pip install 'ollama-commit[otel]'")
+    from . import __version__
+    return trace.get_tracer("ollama_commit", __version__)
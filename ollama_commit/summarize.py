@@ -0,0 +1,244 @@
+"""Map-reduce summarization of large staged diffs."""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from .cache import BlobCache
+from .compaction import CHARS_PER_TOKEN, CompactedDiff, DiffCompactor, estimate_tokens
+from .git_analyzer import FileChange
+from .ollama_client import OllamaClient
+from .profiling import bind, span
+
+# Tokens reserved for the prompt instructions and the model's answer.
+PROMPT_OVERHEAD_TOKENS = 300
+RESPONSE_TOKENS = 200
+# Files whose compacted diff is this short are used as their own summary.
+INLINE_SUMMARY_TOKENS = 100
+
+
+def split_hunks(text: str) -> List[str]:
+    """Split rendered file diff text at hunk headers, keeping the file header on each part."""
+    lines = text.splitlines(keepends=True)
+    header = []
+    while lines and not lines[0].startswith("@@"):
+        header.append(lines.pop(0))
+    hunks: List[List[str]] = []
+    for line in lines:
+        if line.startswith("@@") or not hunks:
+            hunks.append([])
+        hunks[-1].append(line)
+    return ["".join(header + hunk) for hunk in hunks] or ["".join(header)]
+
+
+class DiffSummarizer:
+    """Summarize a large diff chunk by chunk, then reduce to one commit message."""
+
+    def __init__(self, client: OllamaClient, max_workers: int = 4, context_window: Optional[int] = None,
+                 compactor: Optional[DiffCompactor] = None, blob_cache: Optional[BlobCache] = None):
+        """Initialize DiffSummarizer.
+
+        ``context_window`` overrides the model's context size in tokens.
+        ``compactor`` shrinks each file's diff before it is summarized.
+        With ``blob_cache`` every file is summarized on its own and the
+        summary is stored by blob SHAs, so later runs only summarize files
+        whose staged content changed.
+        """
+        self.client = client
+        self.max_workers = max(1, max_workers)
+        self._context_window = context_window
+        self.compactor = compactor
+        self.blob_cache = blob_cache
+
+    @property
+    def chunk_budget(self) -> int:
+        """Maximum tokens of diff text per map prompt."""
+        context_window = self._context_window or self.client.context_window()
+        return max(256, context_window - PROMPT_OVERHEAD_TOKENS - RESPONSE_TOKENS)
+
+    def compact_to_chunk(self, changes: List[FileChange]) -> CompactedDiff:
+        """Changes compacted to the budget of one chunk.
+
+        A diff that is complete at this budget fits a single prompt, which
+        is cheaper than the map and reduce requests of :meth:`summarize`.
+        """
+        compactor = self.compactor or DiffCompactor()
+        return DiffCompactor(self.chunk_budget, compactor.context_lines, compactor.tokenizer).compact(changes)
+
+    def chunk(self, changes: List[FileChange]) -> List[str]:
+        """Pack file diffs into chunks that each fit the token budget.
+
+        Small files are packed together; files larger than the budget are
+        split at hunk boundaries and oversized hunks are truncated.
+        """
+        budget = self.chunk_budget
+        max_chars = budget * CHARS_PER_TOKEN
+        pieces = []
+        for change in changes:
+            text = change.render()
+            if estimate_tokens(text) <= budget:
+                pieces.append(text)
+                continue
+            for hunk in split_hunks(text):
+                if len(hunk) > max_chars:
+                    hunk = hunk[:max_chars] + "\n... (truncated)\n"
+                pieces.append(hunk)
+        return ["".join(group) for group in self._group(pieces, budget)]
+
+    def blob_key(self, change: FileChange) -> Optional[str]:
+        """Blob cache key of a file change, or None if it has no blob SHAs."""
+        if change.old_sha is None and change.new_sha is None:
+            return None
+        context_lines = self.compactor.context_lines if self.compactor is not None else None
+        # The patch length tells truncated reads of the same blobs apart.
+        return self.client.cache_key(json.dumps([
+            "blob", change.change_type, change.old_path, change.path, change.old_sha, change.new_sha,
+            len(change.patch), context_lines,
+        ]))
+
+    def _compact(self, changes: List[FileChange]) -> List[FileChange]:
+        if self.compactor is None:
+            return changes
+        return [self.compactor.compact_change(change) for change in changes]
+
+    def _lookup(self, changes: List[FileChange]) -> Tuple[List[Optional[str]], List[Optional[str]]]:
+        """Blob keys of changes and their cached summaries, None where missing."""
+        keys = [self.blob_key(change) for change in changes]
+        summaries: List[Optional[str]] = []
+        for key in keys:
+            entry = self.blob_cache.get_file(key) if key is not None else None
+            summaries.append(entry[1] if entry is not None else None)
+        return keys, summaries
+
+    def _store(self, keys: List[Optional[str]], patches: List[str], summaries: List[str]) -> None:
+        self.blob_cache.put_files({key: (patch, summary) for key, patch, summary in zip(keys, patches, summaries)
+                                   if key is not None and summary})
+
+    def _file_parts(self, change: FileChange) -> Tuple[str, List[str]]:
+        """Compacted diff of one file and the parts to summarize; none if it is short enough to keep."""
+        patch = change.render()
+        if estimate_tokens(patch) <= INLINE_SUMMARY_TOKENS:
+            return patch, []
+        return patch, self.chunk([change])
+
+    def _summarize_file(self, change: FileChange) -> str:
+        patch, parts = self._file_parts(change)
+        if not parts:
+            return patch
+        summaries = [self.client.summarize_diff_chunk(part) for part in parts]
+        return summaries[0] if len(summaries) == 1 else self.client.combine_summaries(summaries)
+
+    def file_summaries(self, changes: List[FileChange]) -> List[str]:
+        """One summary per file, taken from blob_cache where possible."""
+        with span("summarize.lookup", files=len(changes)):
+            keys, summaries = self._lookup(changes)
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        with span("summarize.map", files=len(missing), cached=len(changes) - len(missing)):
+            compacted = self._compact([changes[i] for i in missing])
+            computed = self._map(self._summarize_file, compacted)
+        self._store([keys[i] for i in missing], [change.render() for change in compacted], computed)
+        for i, summary in zip(missing, computed):
+            summaries[i] = summary
+        return [summary for summary in summaries if summary]
+
+    def summarize(self, changes: List[FileChange], file_summary: Dict[str, Any],
+                  on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """Generate a commit message for changes via map-reduce."""
+        if self.blob_cache is not None:
+            summaries = self.file_summaries(changes)
+        else:
+            chunks = self.chunk(self._compact(changes))
+            with span("summarize.map", chunks=len(chunks)):
+                summaries = self._map(self.client.summarize_diff_chunk, chunks)
+        budget = self.chunk_budget
+        # Combine summaries level by level until they fit one reduce prompt.
+        while len(summaries) > 1 and estimate_tokens("\n".join(summaries)) > budget:
+            groups = self._group(summaries, budget)
+            if len(groups) == len(summaries):
+                groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+            with span("summarize.combine", groups=len(groups)):
+                summaries = self._map(self.client.combine_summaries, groups)
+        return self.client.generate_commit_message_from_summaries(summaries, file_summary, on_token=on_token)
+
+    def _map(self, func: Callable, items: List[Any]) -> List[str]:
+        """Apply func to items with bounded parallelism, keeping order."""
+        if len(items) == 1 or self.max_workers == 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(bind(func), items))
+
+    @staticmethod
+    def _group(pieces: List[str], budget: int) -> List[List[str]]:
+        """Greedily pack pieces into groups that fit the token budget."""
+        groups: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > budget:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+
+class AsyncDiffSummarizer(DiffSummarizer):
+    """DiffSummarizer for AsyncOllamaClient, running map requests as concurrent tasks."""
+
+    async def summarize(self, changes: List[FileChange], file_summary: Dict[str, Any],
+                        on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """Generate a commit message for changes via map-reduce."""
+        if self._context_window is None:
+            self._context_window = await self.client.context_window()
+        if self.blob_cache is not None:
+            summaries = await self.file_summaries(changes)
+        else:
+            chunks = await asyncio.get_running_loop().run_in_executor(None, lambda: self.chunk(self._compact(changes)))
+            with span("summarize.map", chunks=len(chunks)):
+                summaries = await self._map(self.client.summarize_diff_chunk, chunks)
+        budget = self.chunk_budget
+        while len(summaries) > 1 and estimate_tokens("\n".join(summaries)) > budget:
+            groups = self._group(summaries, budget)
+            if len(groups) == len(summaries):
+                groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+            with span("summarize.combine", groups=len(groups)):
+                summaries = await self._map(self.client.combine_summaries, groups)
+        return await self.client.generate_commit_message_from_summaries(summaries, file_summary, on_token=on_token)
+
+    async def _summarize_file(self, change: FileChange) -> str:
+        patch, parts = self._file_parts(change)
+        if not parts:
+            return patch
+        summaries = [await self.client.summarize_diff_chunk(part) for part in parts]
+        return summaries[0] if len(summaries) == 1 else await self.client.combine_summaries(summaries)
+
+    async def file_summaries(self, changes: List[FileChange]) -> List[str]:
+        """One summary per file, taken from blob_cache where possible.
+
+        Cache files and compaction run in the loop's default executor.
+        """
+        loop = asyncio.get_running_loop()
+        with span("summarize.lookup", files=len(changes)):
+            keys, summaries = await loop.run_in_executor(None, bind(self._lookup), changes)
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        with span("summarize.map", files=len(missing), cached=len(changes) - len(missing)):
+            compacted = await loop.run_in_executor(None, self._compact, [changes[i] for i in missing])
+            computed = await self._map(self._summarize_file, compacted)
+        await loop.run_in_executor(None, self._store, [keys[i] for i in missing],
+                                   [change.render() for change in compacted], computed)
+        for i, summary in zip(missing, computed):
+            summaries[i] = summary
+        return [summary for summary in summaries if summary]
+
+    async def _map(self, func: Callable, items: List[Any]) -> List[str]:
+        """Await func over items with at most max_workers in flight, keeping order."""
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def run(item):
+            async with semaphore:
+                return await func(item)
+
+        return list(await asyncio.gather(*(run(item) for item in items)))
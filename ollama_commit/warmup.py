@@ -0,0 +1,90 @@
+"""Preloading the model so that generating a message does not wait for it to load."""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Git runs this hook whenever the index is written, e.g. by `git add`.
+HOOK_NAME = "post-index-change"
+HOOK_MARKER = "# Installed by ollama-commit"
+
+# Background warm-ups are skipped if one was started this recently, in seconds.
+DEFAULT_WARMUP_INTERVAL = 60.0
+
+
+def warmup_due(stamp_path: Path, interval: float = DEFAULT_WARMUP_INTERVAL) -> bool:
+    """Check whether the last warm-up recorded in stamp_path is older than interval."""
+    try:
+        return time.time() - stamp_path.stat().st_mtime >= interval
+    except OSError:
+        return True
+
+
+def mark_warmup(stamp_path: Path) -> None:
+    """Record that a warm-up was started."""
+    try:
+        stamp_path.parent.mkdir(parents=True, exist_ok=True)
+        stamp_path.touch()
+    except OSError:
+        pass
+
+
+def spawn_detached(command: str, repo_path: str = ".") -> None:
+    """Run ``ollama-commit <command> --repo repo_path`` in a detached process and return at once."""
+    if os.name == "nt":
+        detach = {"creationflags": subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        detach = {"start_new_session": True}
+    # The child runs in repo_path, so a relative path would resolve twice.
+    repo_path = os.path.abspath(repo_path)
+    subprocess.Popen(
+        [sys.executable, "-m", "ollama_commit.cli", command, "--repo", repo_path],
+        cwd=repo_path, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        close_fds=True, **detach,
+    )
+
+
+def spawn_warmup(repo_path: str = ".") -> None:
+    """Run ``ollama-commit warmup`` in a detached process and return at once."""
+    spawn_detached("warmup", repo_path)
+
+
+def hook_path(repo_path: str, name: str) -> Path:
+    """Location of a git hook, honouring ``core.hooksPath``."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--git-path", f"hooks/{name}"],
+            cwd=repo_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        raise ValueError(f"Not a git repository: {repo_path}")
+    return Path(repo_path, result.stdout.decode("utf-8").strip())
+
+
+def write_hook(repo_path: str, name: str, purpose: str, body: str, force: bool = False) -> Path:
+    """Write a shell hook; ``purpose`` follows the marker comment.
+
+    An existing hook not written by ollama-commit is only replaced with ``force``.
+    """
+    path = hook_path(repo_path, name)
+    if path.exists() and not force:
+        with open(path, "r", errors="ignore") as hook_file:
+            if HOOK_MARKER not in hook_file.read():
+                raise ValueError(f"{path} already exists; use --force to replace it")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as hook_file:
+        hook_file.write(f"#!/bin/sh\n{HOOK_MARKER}: {purpose}\n{body}")
+    path.chmod(0o755)
+    return path
+
+
+def install_warmup_hook(repo_path: str = ".", force: bool = False) -> Path:
+    """Install a hook that warms the model in the background whenever files are staged.
+
+    An existing hook not written by ollama-commit is only replaced with ``force``.
+    """
+    return write_hook(repo_path, HOOK_NAME, "preload the model while changes are being staged.",
+                      f'"{sys.executable}" -m ollama_commit.cli warmup --background >/dev/null 2>&1 || true\n',
+                      force)
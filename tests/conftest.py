@@ -0,0 +1,108 @@
+"""Shared fixtures: temporary repositories, a fake Ollama client and hook environments."""
+
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+import pytest
+import yaml
+from git import Repo
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeClient:
+    """Answers without a server and records the requests and how many ran at once."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.chunks = []
+        self.combined = []
+        self.reduced = None
+
+    @contextmanager
+    def _request(self):
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            yield
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def is_available(self):
+        return True
+
+    def context_window(self):
+        return 1000
+
+    def cache_key(self, digest):
+        return hashlib.sha256(digest.encode()).hexdigest()
+
+    def generate_commit_message(self, diff_text, file_summary, on_token=None, max_diff_length=None):
+        with self._request():
+            return "feat: add " + ", ".join(file_summary["staged_files"])
+
+    def summarize_diff_chunk(self, chunk):
+        with self.lock:
+            self.chunks.append(chunk)
+        with self._request():
+            return "summary " + "x" * 400
+
+    def combine_summaries(self, summaries):
+        self.combined.append(summaries)
+        return "combined"
+
+    def generate_commit_message_from_summaries(self, summaries, file_summary, on_token=None):
+        self.reduced = summaries
+        return "refactor: large change"
+
+
+@pytest.fixture
+def fake_client():
+    """A FakeClient."""
+    return FakeClient()
+
+
+@pytest.fixture
+def make_repo(tmp_path_factory):
+    """Factory for repositories with numbered commits and optionally a staged file."""
+    def make(commits=1, staged=True):
+        temp_dir = str(tmp_path_factory.mktemp("repo"))
+        repo = Repo.init(temp_dir)
+        repo.config_writer().set_value("user", "name", "Test User").release()
+        repo.config_writer().set_value("user", "email", "test@example.com").release()
+        for i in range(commits):
+            with open(os.path.join(temp_dir, f"file{i}.txt"), "w") as f:
+                f.write(f"content {i}\n")
+            repo.index.add([f"file{i}.txt"])
+            repo.index.commit(f"Commit {i}")
+        if staged:
+            with open(os.path.join(temp_dir, "staged.txt"), "w") as f:
+                f.write("staged\n")
+            repo.index.add(["staged.txt"])
+        return temp_dir
+    return make
+
+
+@pytest.fixture
+def hook_env(tmp_path):
+    """Factory for git environments whose hooks run this checkout with a private config directory."""
+    def make(host, **ollama):
+        config_dir = tmp_path / "ollama-commit"
+        config_dir.mkdir(exist_ok=True)
+        with open(config_dir / "config.yaml", "w") as f:
+            yaml.dump({"ollama": {"host": host, "model": "codellama", **ollama}}, f)
+        env = dict(os.environ, XDG_CONFIG_HOME=str(tmp_path), PYTHONPATH=ROOT)
+        env.pop("OLLAMA_COMMIT_HOST", None)
+        env.pop("OLLAMA_COMMIT_MODEL", None)
+        return env
+    return make
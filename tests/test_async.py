@@ -0,0 +1,143 @@
+"""Tests for AsyncOllamaClient and AsyncCommitGenerator."""
+
+import asyncio
+import os
+import tempfile
+import pytest
+from git import Repo
+from benchmarks.stub_ollama import StubOllama
+from ollama_commit.async_client import AsyncOllamaClient
+from ollama_commit.async_generator import AsyncCommitGenerator
+from ollama_commit.ollama_client import UNAVAILABLE_MESSAGE
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestAsyncOllamaClient:
+    """Test cases for AsyncOllamaClient."""
+
+    summary = {"staged_files": ["a.py"], "modified": 1}
+
+    def test_models_and_generate_reuse_connection(self):
+        """Test the non-streaming path over one pooled connection."""
+        async def scenario(url):
+            async with AsyncOllamaClient(url) as client:
+                assert await client.is_available()
+                assert await client.list_models() == ["codellama", "llama2"]
+                client.invalidate_tags()
+                return await client.generate_commit_message("diff", self.summary)
+
+        with StubOllama(tokens=['"fix: handle empty diff."'], models=["codellama", "llama2"]) as server:
+            assert run(scenario(server.url)) == "fix: handle empty diff"
+        assert server.payloads[-1]["stream"] is False
+        assert [method for method, _ in server.requests] == ["GET", "POST"]
+        assert server.connections == 1
+
+    def test_ipv6_host_header(self):
+        """Test that an IPv6 literal is bracketed in the Host header."""
+        async def scenario(url):
+            async with AsyncOllamaClient(url) as client:
+                return await client.list_models()
+
+        try:
+            server = StubOllama(host="::1")
+        except OSError:
+            pytest.skip("IPv6 loopback unavailable")
+        with server:
+            assert run(scenario(server.url)) == ["codellama"]
+        assert server.hosts == [f"[::1]:{server.server_address[1]}"]
+
+    def test_single_host_only(self):
+        """Test that a list of hosts is accepted only when it has one entry."""
+        assert AsyncOllamaClient(["http://127.0.0.1:1"]).base_url == "http://127.0.0.1:1"
+        with pytest.raises(ValueError, match="one Ollama server"):
+            AsyncOllamaClient(["http://127.0.0.1:1", "http://127.0.0.1:2"])
+
+    def test_streaming(self):
+        """Test streamed tokens and stopping after the first line."""
+        async def scenario(url):
+            async with AsyncOllamaClient(url) as client:
+                tokens = [token async for token in client.stream_commit_message("diff", self.summary)]
+                seen = []
+                message = await client.generate_commit_message("diff", self.summary, on_token=seen.append)
+                return tokens, seen, message
+
+        tokens = ["\n", "feat: add", " stub\n"] + [f" extra {i}" for i in range(200)]
+        with StubOllama(tokens=tokens) as server:
+            streamed, seen, message = run(scenario(server.url))
+        assert streamed == tokens[:server.payloads[0]["options"]["num_predict"]]
+        assert message == "feat: add stub"
+        assert "".join(seen).strip() == "feat: add stub"
+
+    def test_structured_message(self):
+        """Test that a structured answer is cut off once its JSON object is complete."""
+        async def scenario(url):
+            async with AsyncOllamaClient(url, structured=True, commit_options={"num_predict": 48}) as client:
+                return await client.generate_commit_message("diff", self.summary)
+
+        tokens = ['{"type": "perf", "scope": "git",', ' "subject": "batch reads"}'] + ["\n"] * 200
+        with StubOllama(tokens=tokens) as server:
+            assert run(scenario(server.url)) == "perf(git): batch reads"
+        assert server.payloads[-1]["options"]["num_predict"] == 48
+        assert "format" in server.payloads[-1]
+        assert server.tokens_sent < 48
+
+    def test_timeout_and_cancellation(self):
+        """Test that slow responses time out and cancelled calls drop their connection."""
+        async def scenario(server):
+            client = AsyncOllamaClient(server.url, timeout=0.1)
+            with pytest.raises(asyncio.TimeoutError):
+                await client.generate_commit_message("diff", self.summary, on_token=lambda t: None)
+            client.timeout = 30
+            server.latency = server.token_delay = 0.05
+            task = asyncio.ensure_future(client.generate_commit_message("diff", self.summary, on_token=lambda t: None))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert not client._idle
+
+        with StubOllama(tokens=["feat:"] * 50, num_parallel=2) as server:
+            server.latency = server.token_delay = 0.2
+            run(scenario(server))
+        assert server.tokens_sent < 60
+
+    def test_unreachable(self):
+        """Test that an unreachable server is reported as ConnectionError."""
+        async def scenario():
+            client = AsyncOllamaClient("http://127.0.0.1:9")
+            assert not await client.is_available()
+            with pytest.raises(ConnectionError, match=UNAVAILABLE_MESSAGE):
+                await client.generate("prompt")
+
+        run(scenario())
+
+
+class TestAsyncCommitGenerator:
+    """Test cases for AsyncCommitGenerator."""
+
+    def setup_method(self):
+        """Set up a repository with a staged file."""
+        self.temp_dir = tempfile.mkdtemp()
+        repo = Repo.init(self.temp_dir)
+        with open(os.path.join(self.temp_dir, "a.py"), "w") as f:
+            f.write("print('a')\n")
+        repo.index.add(["a.py"])
+
+    def test_generate(self):
+        """Test generation, validation and a missing server."""
+        with StubOllama(tokens=["feat: add a.py"]) as server:
+            generator = AsyncCommitGenerator(self.temp_dir, server.url)
+            result = run(generator.generate())
+            validation = run(generator.validate_setup())
+        assert result["success"]
+        assert result["commit_message"] == "feat: add a.py"
+        assert result["staged_files"] == ["a.py"]
+        assert result["file_summary"] == {"added": 1, "modified": 0, "deleted": 0}
+        assert validation == {"git_repo": True, "staged_changes": True, "ollama_available": True,
+                              "models": ["codellama"]}
+
+        result = run(AsyncCommitGenerator(self.temp_dir, "http://127.0.0.1:9", git_backend="subprocess").generate())
+        assert result == {"success": False, "error": UNAVAILABLE_MESSAGE, "commit_message": None}
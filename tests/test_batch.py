@@ -0,0 +1,46 @@
+"""Tests for batch generation."""
+
+from ollama_commit.batch import BatchGenerator, commit_range_jobs, default_concurrency, repo_jobs
+from ollama_commit.cache import MessageCache
+
+
+class TestBatchGenerator:
+    """Test cases for BatchGenerator."""
+
+    def test_commit_range(self, make_repo, fake_client):
+        """Test one message per commit with bounded request concurrency."""
+        repo_path = make_repo(commits=6, staged=False)
+        jobs = commit_range_jobs(repo_path, "HEAD~5..HEAD")
+        assert len(jobs) == 5
+        batch = BatchGenerator(fake_client, processes=2, concurrency=2)
+        results = {result["commit"]: result for result in batch.run(jobs)}
+        assert set(results) == {job.commit for job in jobs}
+        for i, job in enumerate(jobs, start=1):
+            assert results[job.commit]["success"]
+            assert results[job.commit]["commit_message"] == f"feat: add file{i}.txt"
+            assert results[job.commit]["file_summary"] == {"added": 1, "modified": 0, "deleted": 0}
+        assert 1 < fake_client.max_active <= 2
+
+    def test_many_repositories(self, make_repo, fake_client):
+        """Test staged changes of several repositories, including failures."""
+        repos = [make_repo(), make_repo(staged=False), make_repo(), "/nonexistent/path"]
+        results = {result["repo"]: result for result in BatchGenerator(fake_client, processes=2).run(repo_jobs(repos))}
+        assert results[repos[0]]["commit_message"] == "feat: add staged.txt"
+        assert results[repos[2]]["success"]
+        assert "No staged changes" in results[repos[1]]["error"]
+        assert "Not a git repository" in results[repos[3]]["error"]
+
+    def test_cache_and_subprocess_backend(self, tmp_path, make_repo, fake_client):
+        """Test that identical diffs are served from the cache."""
+        batch = BatchGenerator(fake_client, cache=MessageCache(str(tmp_path)), processes=1, git_backend="subprocess")
+        repo_path = make_repo()
+        assert not list(batch.run(repo_jobs([repo_path])))[0]["cached"]
+        assert list(batch.run(repo_jobs([repo_path])))[0]["cached"]
+        assert fake_client.calls == 1
+
+    def test_default_concurrency(self, monkeypatch):
+        """Test that concurrency follows OLLAMA_NUM_PARALLEL."""
+        monkeypatch.setenv("OLLAMA_NUM_PARALLEL", "3")
+        assert default_concurrency() == 3
+        monkeypatch.setenv("OLLAMA_NUM_PARALLEL", "many")
+        assert default_concurrency() == 4
@@ -0,0 +1,40 @@
+"""Tests for the benchmark fixtures."""
+
+import shutil
+import pytest
+from benchmarks.stub_ollama import StubOllama
+from benchmarks.synthetic_repo import RepoSpec, make_repo
+from ollama_commit.commit_generator import CommitGenerator
+from ollama_commit.git_analyzer import GitAnalyzer
+from ollama_commit.profiling import Profiler
+
+
+@pytest.fixture(scope="module")
+def repo_dir():
+    path = make_repo(RepoSpec(modified=3, added=2, deleted=1, renamed=2, binaries=3, lines=20, changed_lines=2))
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+class TestBenchmarkFixtures:
+    """Test cases for the synthetic repository generator and the stub server."""
+
+    @pytest.mark.parametrize("backend", ["gitpython", "subprocess"])
+    def test_synthetic_repo_shape(self, repo_dir, backend):
+        """Test that the staged changes match the spec in both backends."""
+        changes = GitAnalyzer(repo_dir, backend=backend).snapshot.changes
+        types = sorted(change.change_type for change in changes)
+        assert types == sorted("MMM" + "AA" + "D" + "RR" + "MAA")
+        assert sum(change.binary for change in changes) == 3
+
+    def test_stub_reports_timings(self, repo_dir):
+        """Test an end-to-end generation against the stub with its reported timings."""
+        with StubOllama(latency=0.01) as server:
+            profiler = Profiler()
+            with profiler.activate():
+                result = CommitGenerator(repo_dir, server.url).generate()
+        assert result["success"]
+        assert result["commit_message"] == "feat: add synthetic benchmark change"
+        totals = profiler.report()["ollama"]
+        assert totals["eval_count"] == 11 * totals["requests"]
+        assert totals["prompt_eval_duration"] >= 10
@@ -0,0 +1,77 @@
+"""Tests for MessageCache class."""
+
+import os
+import time
+from unittest import mock
+from git import Repo
+from ollama_commit.cache import BlobCache, MessageCache
+from ollama_commit.commit_generator import CommitGenerator
+from ollama_commit.ollama_client import OllamaClient
+
+
+class TestMessageCache:
+    """Test cases for MessageCache."""
+
+    def test_put_and_get(self, tmp_path):
+        """Test storing and reading a message."""
+        cache = MessageCache(tmp_path)
+        assert cache.get("abc") is None
+        cache.put("abc", "feat: add cache")
+        assert cache.get("abc") == "feat: add cache"
+
+    def test_expired_entry_is_ignored(self, tmp_path):
+        """Test that entries older than max_age are misses."""
+        cache = MessageCache(tmp_path, max_age=60)
+        cache.put("abc", "feat: add cache")
+        with mock.patch("ollama_commit.cache.time.time", return_value=time.time() + 120):
+            assert cache.get("abc") is None
+        assert not (tmp_path / "abc.json").exists()
+
+    def test_blob_cache_entries(self, tmp_path):
+        """Test storing and reading per-file patches and summaries."""
+        cache = BlobCache(tmp_path)
+        assert cache.get_file("abc") is None
+        cache.put_files({"abc": ("+x = 1\n", "Sets x."), "def": ("+y = 2\n", "Sets y.")})
+        assert cache.get_file("abc") == ("+x = 1\n", "Sets x.")
+        assert cache.get_file("def") == ("+y = 2\n", "Sets y.")
+
+    def test_eviction_keeps_newest_entries(self, tmp_path):
+        """Test that the oldest entries are evicted past max_entries."""
+        cache = MessageCache(tmp_path, max_entries=2)
+        for i, key in enumerate(["a", "b", "c"]):
+            cache.put(key, key)
+            os.utime(tmp_path / f"{key}.json", (time.time() - 10 + i, time.time() - 10 + i))
+        cache.evict()
+        assert sorted(path.stem for path in tmp_path.glob("*.json")) == ["b", "c"]
+
+    def test_blob_cache_byte_cap_evicts_oldest(self, tmp_path):
+        """Test that BlobCache drops the oldest entries once their total size passes max_bytes."""
+        cache = BlobCache(tmp_path, max_bytes=2500)
+        for i, key in enumerate(["a", "b", "c"]):
+            cache.put_files({key: ("+" + "x" * 1000 + "\n", "Adds x.")})
+            os.utime(tmp_path / f"{key}.json", (time.time() - 10 + i, time.time() - 10 + i))
+        cache.evict()
+        assert sorted(path.stem for path in tmp_path.glob("*.json")) == ["b", "c"]
+        assert cache.get_file("a") is None
+
+    def test_generator_reuses_cached_message(self, tmp_path):
+        """Test that identical staged changes hit the cache."""
+        repo_dir = tmp_path / "repo"
+        repo = Repo.init(repo_dir)
+        (repo_dir / "a.txt").write_text("content\n")
+        repo.index.add(["a.txt"])
+
+        client = OllamaClient(model="codellama")
+        client.generate_commit_message = mock.Mock(return_value="feat: add a")
+        cache = MessageCache(tmp_path / "cache")
+
+        first = CommitGenerator(str(repo_dir), ollama_client=client, cache=cache).generate()
+        second = CommitGenerator(str(repo_dir), ollama_client=client, cache=cache).generate()
+        assert not first["cached"]
+        assert second["cached"]
+        assert second["commit_message"] == "feat: add a"
+        assert client.generate_commit_message.call_count == 1
+
+        client.model = "llama2"
+        third = CommitGenerator(str(repo_dir), ollama_client=client, cache=cache).generate()
+        assert not third["cached"]
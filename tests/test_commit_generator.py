@@ -0,0 +1,52 @@
+"""Tests for CommitGenerator."""
+
+import os
+from git import Repo
+from benchmarks.stub_ollama import StubOllama
+from ollama_commit.commit_generator import CommitGenerator
+from ollama_commit.grouping import ScopeGrouper
+
+
+class TestCommitGenerator:
+    """Test cases for CommitGenerator."""
+
+    def test_pipeline_primes_prompt_prefix(self, make_repo):
+        """Test that pipelined generation sends the fixed prompt start before the full prompt."""
+        repo_path = make_repo()
+        with StubOllama(tokens=["feat: add stub"]) as server:
+            generator = CommitGenerator(repo_path, server.url, pipeline=True)
+            result = generator.generate()
+        assert result["success"]
+        assert result["commit_message"] == "feat: add stub"
+        prime, request = server.payloads
+        assert prime["options"]["num_predict"] == 1
+        assert request["prompt"].startswith(prime["prompt"])
+        assert request["system"] == prime["system"]
+        assert "staged.txt" not in prime["prompt"]
+
+    def test_pipeline_survives_unreachable_server(self, make_repo):
+        """Test that a failed primer leaves the usual connection error."""
+        repo_path = make_repo()
+        generator = CommitGenerator(repo_path, "http://127.0.0.1:9", pipeline=True, max_retries=0)
+        result = generator.generate()
+        assert not result["success"]
+        assert "not available" in result["error"]
+
+    def test_groups_generated_in_parallel_and_merged(self, make_repo):
+        """Test that each scope gets its own request, sent at once, and one merged message."""
+        repo_path = make_repo(staged=False)
+        for path in ("packages/web/app.js", "packages/api/server.py", "README.md"):
+            os.makedirs(os.path.dirname(os.path.join(repo_path, path)) or repo_path, exist_ok=True)
+            with open(os.path.join(repo_path, path), "w") as f:
+                f.write("change\n")
+        Repo(repo_path).index.add(["packages/web/app.js", "packages/api/server.py", "README.md"])
+        with StubOllama(tokens=["feat: add stub"], latency=0.2, num_parallel=3) as server:
+            generator = CommitGenerator(repo_path, server.url, grouper=ScopeGrouper(["packages/*"]))
+            result = generator.generate()
+        assert result["success"], result["error"]
+        assert result["commit_message"] == ("feat(api,web): add stub\n\n"
+                                            "- feat(api): add stub\n- feat(web): add stub\n- feat: add stub")
+        prompts = [payload["prompt"] for payload in server.payloads]
+        assert len(prompts) == 3
+        assert all(sum(name in prompt for name in ("server.py", "app.js", "README.md")) == 1 for prompt in prompts)
+        assert server.max_in_flight >= 2
@@ -0,0 +1,76 @@
+"""Tests for DiffCompactor class."""
+
+from ollama_commit.compaction import DiffCompactor, parse_hunks, is_whitespace_only, trim_context
+from ollama_commit.git_analyzer import FileChange
+
+
+def change(path, patch, change_type="M", old_path=None):
+    """Build a FileChange from patch text."""
+    return FileChange(path=path, old_path=old_path or path, change_type=change_type, patch=patch.encode())
+
+
+HUNK = "@@ -1,9 +1,9 @@\n a\n b\n c\n d\n-old\n+new\n e\n f\n g\n"
+
+
+class TestDiffCompactor:
+    """Test cases for DiffCompactor."""
+
+    def test_trim_context(self):
+        """Test that context is reduced around changed lines."""
+        hunk = trim_context(parse_hunks(HUNK)[0], 1)
+        assert hunk.lines == [" ...\n", " d\n", "-old\n", "+new\n", " e\n", " ...\n"]
+
+    def test_whitespace_only_hunk(self):
+        """Test detection of whitespace-only hunks."""
+        assert is_whitespace_only(parse_hunks("@@ -1 +1 @@\n-a  = 1\n+a = 1\n")[0])
+        assert not is_whitespace_only(parse_hunks("@@ -1 +1 @@\n-a = 1\n+a = 2\n")[0])
+
+    def test_stubs_for_lockfiles_binaries_and_renames(self):
+        """Test that noisy files are replaced by one-line stubs."""
+        changes = [
+            change("web/package-lock.json", "@@ -1 +1 @@\n-1\n+2\n" * 50),
+            change("logo.png", "Binary files a/logo.png and b/logo.png differ\n"),
+            change("app.min.js", "@@ -1 +1 @@\n+" + "x" * 5000 + "\n"),
+            change("new.py", "", change_type="R", old_path="old.py"),
+        ]
+        text = DiffCompactor(token_budget=10000).compact(changes).text
+        assert "[lockfile changed" in text
+        assert "[binary file changed" in text
+        assert "[generated file changed" in text
+        assert "[renamed from old.py without changes]" in text
+        assert "x" * 100 not in text
+
+    def test_nested_generated_directories(self):
+        """Test that generated-directory patterns also match below the repository root."""
+        for path in ("pkg/vendor/x.go", "web/node_modules/lib/index.js", "vendor/y.go", "a/b/app.min.js"):
+            assert "[generated file changed" in DiffCompactor().compact([change(path, HUNK)]).text, path
+        assert "[generated file changed" not in DiffCompactor().compact([change("pkg/vendors.go", HUNK)]).text
+
+    def test_headers_over_budget_are_incomplete(self):
+        """Test that many small files whose headers alone exceed the budget do not count as complete."""
+        changes = [change(f"src/module_{i}.py", "", change_type="R", old_path=f"lib/module_{i}.py")
+                   for i in range(50)]
+        result = DiffCompactor(token_budget=100).compact(changes)
+        assert result.dropped_hunks == 0
+        assert result.tokens > 100
+        assert not result.complete
+
+    def test_budget_keeps_densest_hunks(self):
+        """Test that hunks are ranked by density and fit the budget."""
+        dense = "@@ -1,2 +1,2 @@\n-a\n-b\n+c\n+d\n"
+        sparse = "@@ -1,1 +1,1 @@\n-" + "long line " * 40 + "\n+" + "long line " * 41 + "\n"
+        changes = [change("sparse.py", sparse), change("dense.py", dense)]
+        compactor = DiffCompactor(token_budget=60)
+        result = compactor.compact(changes)
+        assert not result.complete
+        assert result.tokens <= 60 + 10
+        assert "+c\n+d\n" in result.text
+        assert "sparse.py" in result.text
+        assert "1 hunk omitted" in result.text
+
+    def test_pluggable_tokenizer(self):
+        """Test that the budget uses the supplied tokenizer."""
+        words = DiffCompactor(token_budget=1000, tokenizer=lambda text: len(text.split()))
+        result = words.compact([change("a.py", HUNK)])
+        assert result.complete
+        assert result.tokens == len(result.text.split())
@@ -0,0 +1,88 @@
+"""Tests for config loading."""
+
+import os
+from unittest import mock
+import pytest
+import yaml
+from ollama_commit import config
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    """Point the config module at a temporary directory."""
+    monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE", tmp_path / "config.yaml")
+    monkeypatch.setattr(config, "CONFIG_CACHE_DIR", tmp_path / "cache" / "config")
+    for name in config.ENV_OVERRIDES:
+        monkeypatch.delenv(name, raising=False)
+    config.clear_config_cache()
+    yield tmp_path
+    config.clear_config_cache()
+
+
+def write_yaml(path, data, mtime=None):
+    with open(path, "w") as f:
+        yaml.dump(data, f)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+class TestConfig:
+    """Test cases for get_config."""
+
+    def test_default_config_created(self, config_dir):
+        """Test that a missing config file is created with defaults."""
+        assert config.get_config() == config.default_config
+        assert (config_dir / "config.yaml").exists()
+
+    def test_parsed_once_until_file_changes(self, config_dir):
+        """Test memoization keyed on mtime and size."""
+        write_yaml(config_dir / "config.yaml", {"ollama": {"host": "http://a:1", "model": "m1"}}, mtime=1000)
+        with mock.patch("yaml.safe_load", wraps=yaml.safe_load) as safe_load:
+            assert config.get_config()["ollama"]["model"] == "m1"
+            assert config.get_config()["ollama"]["model"] == "m1"
+            assert safe_load.call_count == 1
+            write_yaml(config_dir / "config.yaml", {"ollama": {"host": "http://a:1", "model": "m22"}}, mtime=2000)
+            assert config.get_config()["ollama"]["model"] == "m22"
+            assert safe_load.call_count == 2
+
+    def test_json_cache_skips_yaml(self, config_dir):
+        """Test that a fresh process can load the JSON copy without YAML."""
+        write_yaml(config_dir / "config.yaml", {"ollama": {"host": "http://a:1", "model": "m1"}})
+        config.get_config()
+        config.clear_config_cache()
+        with mock.patch("yaml.safe_load", side_effect=AssertionError("YAML parsed")):
+            assert config.get_config()["ollama"]["model"] == "m1"
+
+    def test_layers(self, config_dir, tmp_path, monkeypatch):
+        """Test defaults, user file, repo file and environment layering."""
+        write_yaml(config_dir / "config.yaml", {"ollama": {"model": "user-model", "max_workers": 2}})
+        repo = tmp_path / "repo"
+        (repo / ".git").mkdir(parents=True)
+        (repo / "src").mkdir()
+        write_yaml(repo / ".ollama-commit.yaml", {
+            "ollama": {"host": "http://evil:1", "max_workers": 8, "token_budget": 256},
+            "git": {"backend": "subprocess"},
+        })
+        monkeypatch.setenv("OLLAMA_COMMIT_MODEL", "env-model")
+
+        merged = config.get_config(str(repo / "src"))
+        assert merged["ollama"] == {
+            "host": "http://localhost:11434",
+            "model": "env-model",
+            "max_workers": 8,
+            "token_budget": 256,
+        }
+        assert merged["git"] == {"backend": "subprocess"}
+
+    def test_model_config(self):
+        """Test that settings under models apply to their model only, without hosts."""
+        section = {"host": "http://localhost:11434", "model": "llama3", "num_predict": 64,
+                   "models": {"llama3": {"num_predict": 32, "stop": ["\n"], "host": "http://evil:1"},
+                              "qwen": {"structured": True}}}
+        merged = config.model_config(section)
+        assert merged["num_predict"] == 32
+        assert merged["stop"] == ["\n"]
+        assert merged["host"] == "http://localhost:11434"
+        assert "structured" not in merged
+        assert config.model_config({**section, "model": "other"})["num_predict"] == 64
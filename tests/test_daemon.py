@@ -0,0 +1,158 @@
+"""Tests for the serve daemon."""
+
+import os
+import socket
+import stat
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+from git import Repo
+from benchmarks.stub_ollama import StubOllama
+from ollama_commit.cli import generate_once
+from ollama_commit.daemon import CommitDaemon, is_running, request
+from ollama_commit.git_analyzer import GitAnalyzer
+from ollama_commit.ollama_client import OllamaClient
+
+
+def start_daemon(cache_dir=None, **limits):
+    """Run a daemon on a temporary socket in a background thread."""
+    socket_path = os.path.join(tempfile.mkdtemp(), "daemon.sock")
+    daemon = CommitDaemon(socket_path, cache_dir=cache_dir, **limits)
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    for _ in range(100):
+        if is_running(socket_path):
+            break
+        time.sleep(0.01)
+    return daemon, socket_path, thread
+
+
+class TestCommitDaemon:
+    """Test cases for CommitDaemon."""
+
+    def test_request_without_daemon(self):
+        """Test that request() reports a missing daemon as None."""
+        socket_path = os.path.join(tempfile.mkdtemp(), "missing.sock")
+        assert request(socket_path, {"command": "ping"}) is None
+        assert not is_running(socket_path)
+
+    def test_generate_reuses_repository(self, make_repo):
+        """Test streaming, reuse of the generator and refresh after staging more files."""
+        repo_path = make_repo()
+        daemon, socket_path, thread = start_daemon()
+        try:
+            with StubOllama(tokens=["feat: add", " stub"]) as server:
+                payload = {
+                    "command": "generate",
+                    "repo": repo_path,
+                    "config": {"ollama": {"host": server.url, "model": "codellama"}},
+                    "no_cache": True,
+                    "stream": True,
+                }
+                tokens = []
+                result = request(socket_path, payload, on_token=tokens.append)
+                assert result["success"], result
+                assert result["commit_message"] == "feat: add stub"
+                assert result["staged_files"] == ["staged.txt"]
+                assert "".join(tokens).strip() == "feat: add stub"
+
+                with open(os.path.join(repo_path, "other.txt"), "w") as f:
+                    f.write("other\n")
+                Repo(repo_path).index.add(["other.txt"])
+                result = request(socket_path, payload)
+                assert sorted(result["staged_files"]) == ["other.txt", "staged.txt"]
+            assert len(daemon._generators) == 1
+            assert len(daemon._clients) == 1
+        finally:
+            daemon.shutdown()
+            thread.join(5)
+
+    def test_history_index_looked_up_once_with_model_settings(self, make_repo):
+        """Test that the history index is found with the model's merged settings, once per generator."""
+        repo_path = make_repo()
+        daemon, socket_path, thread = start_daemon()
+        try:
+            with StubOllama(tokens=["feat: add stub"]) as server, \
+                    mock.patch("ollama_commit.cli.history_index", return_value=None) as history_index:
+                payload = {"command": "generate", "repo": repo_path, "no_cache": True,
+                           "config": {"ollama": {"host": server.url, "model": "codellama",
+                                                 "models": {"codellama": {"num_ctx": 4096}}}}}
+                assert request(socket_path, payload)["success"]
+                assert request(socket_path, payload)["success"]
+        finally:
+            daemon.shutdown()
+            thread.join(5)
+        assert history_index.call_count == 1
+        config, repo = history_index.call_args.args
+        assert config["num_ctx"] == 4096 and repo == repo_path
+
+    def test_least_recently_used_closed(self, make_repo):
+        """Test that generators and clients beyond the limits are closed, and the rest on shutdown."""
+        daemon, socket_path, thread = start_daemon(max_generators=1, max_clients=1)
+        closed = []
+        analyzer_close, client_close = GitAnalyzer.close, OllamaClient.close
+        try:
+            with mock.patch.object(GitAnalyzer, "close", lambda self: closed.append(self) or analyzer_close(self)), \
+                    mock.patch.object(OllamaClient, "close", lambda self: closed.append(self) or client_close(self)), \
+                    StubOllama(tokens=["feat: add stub"]) as first, StubOllama(tokens=["feat: add stub"]) as second:
+                generators = []
+                for server in (first, second):
+                    payload = {"command": "generate", "repo": make_repo(), "no_cache": True,
+                               "config": {"ollama": {"host": server.url, "model": "codellama"}}}
+                    assert request(socket_path, payload)["success"]
+                    generators.append(list(daemon._generators.values())[-1][0])
+                old, new = generators
+                assert len(daemon._generators) == 1 and len(daemon._clients) == 1
+                assert closed == [old.git_analyzer, old.ollama_client]
+                daemon.shutdown()
+                thread.join(5)
+        finally:
+            daemon.shutdown()
+            thread.join(5)
+        assert closed[2:] == [new.git_analyzer, new.ollama_client]
+        assert not daemon._generators and not daemon._clients
+
+    def test_silent_daemon_falls_back_to_in_process(self, tmp_path, make_repo):
+        """Test that a daemon which accepts but never answers is given up on after the timeout."""
+        socket_path = str(tmp_path / "hung.sock")
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(socket_path)
+        listener.listen(1)
+        try:
+            started = time.monotonic()
+            assert request(socket_path, {"command": "generate"}, timeout=0.2) is None
+            assert time.monotonic() - started < 5
+            with StubOllama(tokens=["feat: add stub"]) as server, \
+                    mock.patch("ollama_commit.daemon.GENERATE_TIMEOUT", 0.2), \
+                    mock.patch("ollama_commit.cli.DAEMON_SOCKET_FILE", Path(socket_path)), \
+                    mock.patch("ollama_commit.cli.MESSAGE_CACHE_DIR", tmp_path / "messages"), \
+                    mock.patch("ollama_commit.cli.HISTORY_DIR", tmp_path / "history"):
+                config = {"ollama": {"host": server.url, "model": "codellama", "blob_cache": False}}
+                result = generate_once(config, make_repo())
+            assert result["success"] and result["commit_message"] == "feat: add stub"
+        finally:
+            listener.close()
+
+    def test_shutdown_request(self):
+        """Test that a shutdown request stops the daemon and removes the socket."""
+        daemon, socket_path, thread = start_daemon()
+        assert request(socket_path, {"command": "shutdown"}, timeout=5)["success"]
+        thread.join(5)
+        assert not thread.is_alive()
+        assert not os.path.exists(socket_path)
+
+    def test_socket_private_when_bound(self):
+        """Test that the socket is created with owner-only permissions, before any chmod."""
+        umask = os.umask(0o022)
+        try:
+            with mock.patch("os.chmod"):
+                daemon, socket_path, thread = start_daemon()
+                try:
+                    assert stat.S_IMODE(os.stat(socket_path).st_mode) & 0o077 == 0
+                finally:
+                    daemon.shutdown()
+                    thread.join(5)
+        finally:
+            os.umask(umask)
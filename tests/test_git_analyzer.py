@@ -3,7 +3,10 @@
 import pytest
 import tempfile
 import os
+import subprocess
+from unittest import mock
 from git import Repo
+from ollama_commit.commit_generator import CommitGenerator
 from ollama_commit.git_analyzer import GitAnalyzer
 
 
@@ -76,4 +79,191 @@ class TestGitAnalyzer:
     def test_invalid_repository(self):
         """Test invalid repository path."""
         with pytest.raises(ValueError):
-            GitAnalyzer("/nonexistent/path")
\ No newline at end of file
+            GitAnalyzer("/nonexistent/path")
+    
+    def test_staged_deletion_and_line_stats(self):
+        """Test staged deletion and per-file line stats."""
+        test_file = os.path.join(self.temp_dir, "test.txt")
+        new_file = os.path.join(self.temp_dir, "new.txt")
+        with open(new_file, "w") as f:
+            f.write("one\ntwo\n")
+        self.repo.index.add([new_file])
+        self.repo.index.remove([test_file], working_tree=True)
+        
+        summary = self.analyzer.get_file_changes_summary()
+        assert summary == {"added": 1, "modified": 0, "deleted": 1}
+        
+        changes = {change.path: change for change in self.analyzer.snapshot.changes}
+        assert changes["new.txt"].additions == 2
+        assert changes["test.txt"].deletions == 1
+        assert "--- /dev/null\n+++ b/new.txt" in self.analyzer.get_staged_diff()
+    
+    @pytest.mark.parametrize("backend", ["gitpython", "subprocess"])
+    def test_single_git_invocation_per_run(self, backend, fake_client):
+        """Benchmark: one msg run should start exactly one process, git diff."""
+        test_file = os.path.join(self.temp_dir, "test.txt")
+        with open(test_file, "w") as f:
+            f.write("modified content")
+        self.repo.index.add([test_file])
+        
+        generator = CommitGenerator(self.temp_dir, git_backend=backend)
+        generator.ollama_client = fake_client
+        
+        # Every git command, through GitPython or not, starts a process; the
+        # branch lookup reads .git/HEAD and must not.
+        original_init = subprocess.Popen.__init__
+        calls = []
+        
+        def counting_init(popen_self, args, *rest, **kwargs):
+            calls.append(args)
+            return original_init(popen_self, args, *rest, **kwargs)
+        
+        with mock.patch.object(subprocess.Popen, "__init__", counting_init):
+            result = generator.generate()
+        
+        assert result["success"]
+        assert len(calls) == 1, calls
+        assert "diff" in calls[0]
+    
+    def test_binary_and_oversized_files_are_bounded(self):
+        """Test binary detection and per-file and total byte caps."""
+        with open(os.path.join(self.temp_dir, "blob.bin"), "wb") as f:
+            f.write(bytes(range(256)) * 64)
+        with open(os.path.join(self.temp_dir, "big.txt"), "w") as f:
+            f.write("".join(f"line {i}\n" for i in range(2000)))
+        self.repo.index.add(["blob.bin", "big.txt"])
+        
+        analyzer = GitAnalyzer(self.temp_dir, max_file_bytes=1000)
+        changes = {change.path: change for change in analyzer.snapshot.changes}
+        assert changes["blob.bin"].binary
+        assert changes["blob.bin"].patch == b""
+        assert changes["big.txt"].truncated
+        assert len(changes["big.txt"].patch) <= 1000
+        assert changes["big.txt"].additions == 2000
+        
+        diff = analyzer.get_staged_diff()
+        assert "Binary file changed" in diff
+        assert "... (truncated)" in diff
+        
+        chunks = list(analyzer.iter_staged_diff(max_bytes=200))
+        assert "".join(chunks).endswith("... (diff truncated)\n")
+        assert len("".join(chunks)) <= 200 + len("\n... (diff truncated)\n")
+
+
+class TestSubprocessBackend:
+    """Test that the subprocess backend matches the GitPython backend."""
+    
+    def setup_method(self):
+        """Set up a repository with every kind of staged change."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.repo = Repo.init(self.temp_dir)
+        self.repo.config_writer().set_value("user", "name", "Test User").release()
+        self.repo.config_writer().set_value("user", "email", "test@example.com").release()
+        
+        files = {
+            "keep.txt": "".join(f"keep {i}\n" for i in range(20)),
+            "gone.txt": "bye\n",
+            "old name.txt": "".join(f"rename me {i}\n" for i in range(20)),
+        }
+        for name, content in files.items():
+            with open(os.path.join(self.temp_dir, name), "w") as f:
+                f.write(content)
+        self.repo.index.add(list(files))
+        self.repo.index.commit("Initial commit")
+        
+        with open(os.path.join(self.temp_dir, "keep.txt"), "a") as f:
+            f.write("more\n")
+        with open(os.path.join(self.temp_dir, "new.txt"), "w") as f:
+            f.write("".join(f"new {i}\n" for i in range(500)))
+        with open(os.path.join(self.temp_dir, "blob.bin"), "wb") as f:
+            f.write(bytes(range(256)))
+        self.repo.index.remove(["gone.txt"], working_tree=True)
+        self.repo.index.move(["old name.txt", "new name.txt"])
+        self.repo.index.add(["keep.txt", "new.txt", "blob.bin"])
+    
+    def test_backends_agree(self):
+        """Test that both backends produce the same snapshot."""
+        expected = GitAnalyzer(self.temp_dir, max_file_bytes=1000).snapshot
+        actual = GitAnalyzer(self.temp_dir, max_file_bytes=1000, backend="subprocess").snapshot
+        
+        assert len(actual.changes) == len(expected.changes)
+        for ours, theirs in zip(actual.changes, expected.changes):
+            # GitPython has no blob ids for pure renames, which have no "index" line.
+            if theirs.old_sha is None and theirs.new_sha is None and theirs.change_type == "R":
+                ours.old_sha = ours.new_sha = None
+            assert ours == theirs
+        assert actual.summary() == {"added": 2, "modified": 2, "deleted": 1}
+        renamed = [change for change in actual.changes if change.change_type == "R"][0]
+        assert (renamed.old_path, renamed.path) == ("old name.txt", "new name.txt")
+    
+    def test_oversized_line_cuts_patch(self):
+        """Test that both backends stop a file's patch at an oversized line in its middle."""
+        # Enough unchanged lines between the edits that the second lands in its own hunk.
+        lines = ([f"short {i}\n" for i in range(5)] + ["x" * 500 + "\n"] + [f"after {i}\n" for i in range(5)]
+                 + [f"context {i}\n" for i in range(20)])
+        with open(os.path.join(self.temp_dir, "long line.txt"), "w") as f:
+            f.write("".join(lines))
+        self.repo.index.add(["long line.txt"])
+        self.repo.index.commit("Add long line")
+        lines[-1] = "changed later\n"
+        lines[3] = "changed first\n"
+        with open(os.path.join(self.temp_dir, "long line.txt"), "w") as f:
+            f.write("".join(lines))
+        self.repo.index.add(["long line.txt"])
+        expected = GitAnalyzer(self.temp_dir, max_file_bytes=200).snapshot
+        actual = GitAnalyzer(self.temp_dir, max_file_bytes=200, backend="subprocess").snapshot
+        ours = [change for change in actual.changes if change.path == "long line.txt"][0]
+        theirs = [change for change in expected.changes if change.path == "long line.txt"][0]
+        assert ours.truncated and theirs.truncated
+        assert ours.patch == theirs.patch
+        assert b"changed first" in ours.patch
+        assert b"after" not in ours.patch and b"changed later" not in ours.patch
+        assert [change.patch for change in actual.changes] == [change.patch for change in expected.changes]
+    
+    @pytest.mark.skipif(not hasattr(os, "symlink"), reason="needs symlinks")
+    def test_type_change_agrees(self):
+        """Test that a file replaced by a symlink, ahead of a modified file, keeps every patch in place."""
+        with open(os.path.join(self.temp_dir, "alpha.txt"), "w") as f:
+            f.write("plain\n")
+        self.repo.index.add(["alpha.txt"])
+        self.repo.index.commit("Add alpha")
+        os.remove(os.path.join(self.temp_dir, "alpha.txt"))
+        os.symlink("keep.txt", os.path.join(self.temp_dir, "alpha.txt"))
+        with open(os.path.join(self.temp_dir, "keep.txt"), "a") as f:
+            f.write("again\n")
+        self.repo.git.add("alpha.txt", "keep.txt")
+        expected = GitAnalyzer(self.temp_dir).snapshot
+        actual = GitAnalyzer(self.temp_dir, backend="subprocess").snapshot
+        assert actual.changes == expected.changes
+        assert [(change.path, change.change_type) for change in actual.changes] == \
+            [("alpha.txt", "D"), ("alpha.txt", "A"), ("keep.txt", "M")]
+        assert actual.changes[1].patch.startswith(b"@@ -0,0 +1 @@\n+keep.txt")
+        assert actual.changes[2].patch.endswith(b"+again\n")
+
+    def test_commit_snapshots_agree(self):
+        """Test that both backends read root and later commits alike."""
+        self.repo.index.commit("Second commit")
+        for rev in ("HEAD", "HEAD~1"):
+            expected = GitAnalyzer(self.temp_dir).commit_snapshot(rev)
+            actual = GitAnalyzer(self.temp_dir, backend="subprocess").commit_snapshot(rev)
+            for ours, theirs in zip(actual.changes, expected.changes):
+                if theirs.old_sha is None and theirs.new_sha is None and theirs.change_type == "R":
+                    ours.old_sha = ours.new_sha = None
+            assert actual.changes == expected.changes
+        root = GitAnalyzer(self.temp_dir, backend="subprocess").commit_snapshot("HEAD~1")
+        assert root.summary() == {"added": 3, "modified": 0, "deleted": 0}
+        assert GitAnalyzer(self.temp_dir).commit_snapshot("HEAD").summary() == {"added": 2, "modified": 2, "deleted": 1}
+    
+    def test_repository_info(self):
+        """Test repository info without GitPython."""
+        analyzer = GitAnalyzer(self.temp_dir, backend="subprocess")
+        info = analyzer.get_repository_info()
+        assert info["name"] == os.path.basename(self.temp_dir)
+        assert info["branch"] in ("master", "main")
+    
+    def test_invalid_repository(self):
+        """Test invalid repository path and unknown backend."""
+        with pytest.raises(ValueError):
+            GitAnalyzer("/nonexistent/path", backend="subprocess")
+        with pytest.raises(ValueError):
+            GitAnalyzer(self.temp_dir, backend="libgit3")
@@ -0,0 +1,51 @@
+"""Tests for grouping staged changes by scope."""
+
+from ollama_commit.git_analyzer import FileChange
+from ollama_commit.grouping import ChangeGroup, ScopeGrouper, merge_messages, pattern_regex
+
+
+def change(path, lines=1):
+    return FileChange(path, path, "M", additions=lines)
+
+
+class TestGrouping:
+    """Test cases for ScopeGrouper and merge_messages."""
+
+    def test_pattern_regex(self):
+        """Test CODEOWNERS-style anchoring, wildcards and directories."""
+        assert pattern_regex("*.md").match("docs/guide/intro.md")
+        assert pattern_regex("docs/").match("src/docs/a.txt")
+        assert not pattern_regex("docs/").match("docs")
+        assert pattern_regex("/tools").match("tools/build.sh")
+        assert not pattern_regex("/tools").match("src/tools/build.sh")
+        assert not pattern_regex("apps/*.js").match("apps/web/index.js")
+        assert pattern_regex("apps/**/*.js").match("apps/web/src/index.js")
+
+    def test_scope_of(self):
+        """Test that the last matching pattern wins over subtrees, and the deepest subtree over others."""
+        grouper = ScopeGrouper(["packages/*", "packages/*/plugins/*", "tools"],
+                               {"*.md": "docs", "packages/legacy/": "legacy"})
+        assert grouper.scope_of("packages/web/src/app.js") == ("packages/web", "web")
+        assert grouper.scope_of("packages/web/plugins/auth/a.js") == ("packages/web/plugins/auth", "auth")
+        assert grouper.scope_of("packages/web/README.md") == ("docs", "docs")
+        assert grouper.scope_of("packages/legacy/x.py") == ("legacy", "legacy")
+        assert grouper.scope_of("tools/release.sh") == ("tools", "tools")
+        assert grouper.scope_of("packages") == (None, None)
+        assert grouper.scope_of("setup.py") == (None, None)
+
+    def test_group_order(self):
+        """Test that groups are ordered by key with unscoped files last."""
+        grouper = ScopeGrouper(["packages/*"])
+        groups = grouper.group([change("setup.py"), change("packages/web/a.js"), change("packages/api/b.py"),
+                                change("packages/web/c.js")])
+        assert [(group.scope, len(group.changes)) for group in groups] == [("api", 1), ("web", 2), (None, 1)]
+
+    def test_merge_messages(self):
+        """Test that the subject takes the highest ranked type and lists every scope."""
+        api = ChangeGroup("packages/api", "api", [change("packages/api/b.py", 50)])
+        web = ChangeGroup("packages/web", "web", [change("packages/web/a.js", 5)])
+        root = ChangeGroup(None, None, [change("setup.py")])
+        message = merge_messages([(api, "fix(server): handle empty body"), (web, "feat!: add login form"),
+                                  (root, "Bump version")])
+        assert message == ("feat(api,web)!: add login form\n\n"
+                           "- fix(api): handle empty body\n- feat(web)!: add login form\n- Bump version")
@@ -0,0 +1,98 @@
+"""Tests for the commit history index."""
+
+import os
+import tempfile
+import pytest
+from git import Repo
+from benchmarks.stub_ollama import StubOllama, bag_of_words
+from ollama_commit.commit_generator import CommitGenerator
+from ollama_commit.history import HistoryIndex, iter_history
+from ollama_commit.ollama_client import OllamaClient
+
+pytest.importorskip("numpy")
+
+
+def commit_files(repo_path, message, paths):
+    """Commit a change to each path with message."""
+    repo = Repo(repo_path)
+    for path in paths:
+        full_path = os.path.join(repo_path, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "a") as f:
+            f.write(f"{message}\n")
+    repo.index.add(paths)
+    repo.index.commit(message)
+
+
+def make_history_repo():
+    """Repository whose commits each touch either docs or the parser."""
+    repo_path = tempfile.mkdtemp()
+    repo = Repo.init(repo_path)
+    repo.config_writer().set_value("user", "name", "Test User").release()
+    repo.config_writer().set_value("user", "email", "test@example.com").release()
+    commit_files(repo_path, "docs(readme): describe setup", ["docs/readme.md"])
+    commit_files(repo_path, "fix(parser): handle empty input\n\nLonger body.", ["src/parser.py"])
+    commit_files(repo_path, "docs(guide): add guide", ["docs/guide.md"])
+    return repo_path
+
+
+class TestHistoryIndex:
+    """Test cases for HistoryIndex."""
+
+    def test_iter_history_reads_messages_and_stats(self):
+        """Test that one git log yields every commit with its diffstat, oldest first."""
+        commits = list(iter_history(make_history_repo(), "HEAD"))
+        assert [commit.message.split("\n")[0] for commit in commits] == [
+            "docs(readme): describe setup", "fix(parser): handle empty input", "docs(guide): add guide"]
+        assert commits[1].message.endswith("Longer body.")
+        assert commits[1].stat == "src/parser.py +3 -0"
+
+    def test_update_is_incremental_and_search_ranks_similar(self, tmp_path):
+        """Test that updates embed only new commits and search finds the closest ones."""
+        repo_path = make_history_repo()
+        index = HistoryIndex(tmp_path)
+        with StubOllama() as server:
+            client = OllamaClient(server.url)
+            assert index.update(client, repo_path, "embed") == 3
+            assert index.update(client, repo_path, "embed") == 0
+            commit_files(repo_path, "fix(parser): reject tabs", ["src/parser.py"])
+            assert index.update(client, repo_path, "embed") == 1
+            embedded = [payload["prompt"] for payload in server.payloads]
+        assert len(embedded) == 4
+        assert len(index) == 4 and index.model == "embed"
+
+        results = index.search(bag_of_words("src/parser.py +1 -0"), k=2)
+        assert {message.split("\n")[0] for _, message in results} == {
+            "fix(parser): handle empty input", "fix(parser): reject tabs"}
+        assert results[0][0] >= results[1][0]
+
+    def test_interrupted_rows_are_discarded(self, tmp_path):
+        """Test that rows written after index.json was last replaced are dropped."""
+        repo_path = make_history_repo()
+        index = HistoryIndex(tmp_path)
+        with StubOllama() as server:
+            client = OllamaClient(server.url)
+            index.update(client, repo_path, "embed")
+            with open(tmp_path / "vectors.f32", "ab") as f:
+                f.write(b"\0" * 64)
+            commit_files(repo_path, "docs(readme): fix typo", ["docs/readme.md"])
+            index.update(client, repo_path, "embed")
+        assert os.path.getsize(tmp_path / "vectors.f32") == 4 * 32 * 4
+        assert index.search(bag_of_words("docs(readme): fix typo"), k=1)[0][1] == "docs(readme): fix typo"
+
+    def test_generator_shows_similar_commits(self, tmp_path):
+        """Test that msg prompts include the subjects of similar past commits."""
+        repo_path = make_history_repo()
+        with open(os.path.join(repo_path, "docs", "guide.md"), "a") as f:
+            f.write("more\n")
+        Repo(repo_path).index.add(["docs/guide.md"])
+        index = HistoryIndex(tmp_path)
+        with StubOllama(tokens=["docs(guide): extend guide"]) as server:
+            client = OllamaClient(server.url)
+            index.update(client, repo_path, "embed")
+            generator = CommitGenerator(repo_path, ollama_client=client, history=index, history_examples=1)
+            result = generator.generate()
+            prompt = server.payloads[-1]["prompt"]
+        assert result["commit_message"] == "docs(guide): extend guide"
+        assert "similar past commits" in prompt
+        assert "- docs(guide): add guide\n" in prompt
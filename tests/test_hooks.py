@@ -0,0 +1,94 @@
+"""Tests for the commit message hooks."""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+import yaml
+from git import Repo
+from benchmarks.stub_ollama import StubOllama
+from ollama_commit.hooks import PregeneratedMessages, install_commit_hooks, prepend_message, staged_key
+
+class TestHooks:
+    """Test cases for pre-generation and the prepare-commit-msg hook."""
+
+    def test_staged_key_follows_index(self, make_repo):
+        """Test that the key changes with the staged content and the model only."""
+        repo_path = make_repo()
+        key = staged_key(repo_path, "codellama")
+        assert key == staged_key(repo_path, "codellama")
+        assert key != staged_key(repo_path, "llama2")
+        with open(os.path.join(repo_path, "staged.txt"), "w") as f:
+            f.write("changed\n")
+        assert staged_key(repo_path, "codellama") == key
+        Repo(repo_path).index.add(["staged.txt"])
+        assert staged_key(repo_path, "codellama") != key
+
+    def test_wait_respects_deadline(self, tmp_path):
+        """Test that wait() returns a message stored in time, and None once the deadline passes."""
+        messages = PregeneratedMessages(tmp_path)
+        assert messages.wait("k", time.monotonic() + 5) is None
+        assert messages.claim("k")
+        assert not messages.claim("k")
+        started = time.monotonic()
+        assert messages.wait("k", started + 0.1) is None
+        assert time.monotonic() - started < 0.5
+
+        timer = threading.Timer(0.05, messages.put, ("k", "feat: ready"))
+        timer.start()
+        assert messages.wait("k", time.monotonic() + 5) == "feat: ready"
+        messages.release("k")
+        assert not messages.pending("k")
+
+    def test_prepend_keeps_template(self, tmp_path):
+        """Test that the message goes above git's comments."""
+        path = tmp_path / "COMMIT_EDITMSG"
+        path.write_text("\n# Please enter the commit message\n")
+        prepend_message(path, "fix: keep template")
+        assert path.read_text() == "fix: keep template\n\n# Please enter the commit message\n"
+
+    def test_prepare_uses_repository_config(self, tmp_path, make_repo, hook_env):
+        """Test that the hook looks messages up with the model set in the repository's config."""
+        repo_path = make_repo()
+        with open(os.path.join(repo_path, ".ollama-commit.yaml"), "w") as f:
+            yaml.dump({"ollama": {"model": "llama3", "hook_deadline": 0}}, f)
+        env = hook_env("http://127.0.0.1:9")
+        messages = PregeneratedMessages(tmp_path / "ollama-commit" / "cache" / "pregenerated")
+        messages.put(staged_key(repo_path, "llama3"), "feat: use repository model")
+        message_file = tmp_path / "COMMIT_EDITMSG"
+        message_file.write_text("\n# template\n")
+        subprocess.run([sys.executable, "-m", "ollama_commit.cli", "prepare-commit-msg", str(message_file)],
+                       cwd=repo_path, env=env, check=True)
+        assert message_file.read_text().startswith("feat: use repository model\n")
+
+    def test_commit_uses_pregenerated_message(self, tmp_path, make_repo, hook_env):
+        """Test that staging triggers generation and git commit picks the message up."""
+        repo_path = make_repo(staged=False)
+        paths = install_commit_hooks(repo_path)
+        assert [path.name for path in paths] == ["post-index-change", "prepare-commit-msg"]
+        with StubOllama(tokens=["feat: add staged file"]) as server:
+            env = hook_env(server.url, hook_settle=0, hook_deadline=5)
+            with open(os.path.join(repo_path, "staged.txt"), "w") as f:
+                f.write("staged\n")
+            subprocess.run(["git", "add", "staged.txt"], cwd=repo_path, env=env, check=True)
+            # The detached worker has a moment to start, as it would while the user types `git commit`.
+            pregenerated = tmp_path / "ollama-commit" / "cache" / "pregenerated"
+            for _ in range(500):
+                if list(pregenerated.glob("*.json")):
+                    break
+                time.sleep(0.02)
+            subprocess.run(["git", "commit", "-q", "--no-edit"], cwd=repo_path, env=env, check=True)
+        assert Repo(repo_path).head.commit.message.strip() == "feat: add staged file"
+
+    def test_commit_does_not_wait_for_the_model(self, tmp_path, make_repo, hook_env):
+        """Test that without a pregenerated message the hook leaves the template and returns at once."""
+        repo_path = make_repo()
+        message_file = tmp_path / "COMMIT_EDITMSG"
+        message_file.write_text("# template\n")
+        env = hook_env("http://127.0.0.1:9")
+        started = time.monotonic()
+        subprocess.run([sys.executable, "-m", "ollama_commit.cli", "prepare-commit-msg", str(message_file)],
+                       cwd=repo_path, env=env, check=True)
+        assert time.monotonic() - started < 5
+        assert message_file.read_text() == "# template\n"
@@ -0,0 +1,121 @@
+"""Tests for multi-host routing in OllamaClient."""
+
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from benchmarks.stub_ollama import StubOllama
+from ollama_commit.host_pool import HostPool
+from ollama_commit.ollama_client import OllamaClient, UNAVAILABLE_MESSAGE
+
+
+def dead_url():
+    """URL of a local port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def generate_count(server):
+    return server.requests.count(("POST", "/api/generate"))
+
+
+class TestHostPool:
+    """Test cases for HostPool routing and circuit breaking."""
+
+    def test_least_outstanding(self):
+        """Test that requests go to the least busy host."""
+        pool = HostPool(["http://a", "http://b"])
+        first = pool.select()
+        pool.begin(first)
+        assert pool.select().url == "http://b"
+        assert pool.select(exclude=["http://b"]).url == "http://a"
+        assert pool.select(exclude=["http://a", "http://b"]) is None
+
+    def test_latency_weighted(self):
+        """Test that the faster host is preferred until it is loaded."""
+        pool = HostPool(["http://slow", "http://fast"], strategy="latency")
+        slow, fast = pool.hosts
+        slow.latency, fast.latency = 1.0, 0.3
+        assert pool.select() is fast
+        fast.outstanding = 3
+        assert pool.select() is slow
+
+    def test_circuit_opens_after_failures(self):
+        """Test that a failing host is skipped until its cooldown passes."""
+        pool = HostPool(["http://a", "http://b"], failure_threshold=2, cooldown=60)
+        a, b = pool.hosts
+        for _ in range(2):
+            pool.end(a, pool.begin(a), ok=False)
+        b.outstanding = 5
+        assert pool.select() is b
+        assert pool.select(exclude=["http://b"]) is a
+        with pytest.raises(ValueError):
+            HostPool(["http://a"], strategy="random")
+
+
+    def test_one_probe_after_cooldown(self):
+        """Test that only one request reaches a host whose cooldown has passed, until it ends."""
+        pool = HostPool(["http://a", "http://b"], failure_threshold=1, cooldown=0.05)
+        a, b = pool.hosts
+        pool.end(a, pool.begin(a), ok=False)
+        b.outstanding = 5
+        assert pool.select() is b
+        time.sleep(0.1)
+        probe = pool.select()
+        assert probe is a and a.probing
+        started = pool.begin(probe)
+        assert pool.select() is b and pool.select() is b
+        pool.end(probe, started, ok=False)
+        assert pool.select() is b
+        time.sleep(0.1)
+        assert pool.select() is a
+        assert pool.select() is b
+        pool.end(a, pool.begin(a))
+        assert not a.circuit_open(time.monotonic())
+        assert pool.select() is a and pool.select() is a
+
+
+class TestMultiHostClient:
+    """Test failover and distribution against stub servers."""
+
+    summary = {"staged_files": ["a.py"], "modified": 1}
+
+    def test_failover_to_live_host(self):
+        """Test that an unreachable host is retried elsewhere and then avoided."""
+        dead = dead_url()
+        with StubOllama(tokens=["fix: failover"]) as server:
+            client = OllamaClient([dead, server.url], failure_threshold=1)
+            assert client.generate_commit_message("diff", self.summary) == "fix: failover"
+            assert client.generate_commit_message("diff", self.summary, on_token=lambda token: None) == "fix: failover"
+            statuses = client.host_status()
+        assert generate_count(server) == 2
+        assert [status["available"] for status in statuses] == [False, True]
+        assert statuses[0]["circuit_open"]
+        assert client.list_models() == ["codellama"]
+
+    def test_all_hosts_down(self):
+        """Test that the friendly error is raised when no host answers."""
+        client = OllamaClient([dead_url(), dead_url()])
+        with pytest.raises(ConnectionError, match=UNAVAILABLE_MESSAGE):
+            client.generate("prompt")
+        assert not client.is_available()
+
+    def test_requests_are_distributed(self):
+        """Test that concurrent requests are spread across hosts."""
+        with StubOllama(tokens=["feat: one"]) as first, StubOllama(tokens=["feat: two"]) as second:
+            first.latency = second.latency = 0.1
+            client = OllamaClient([first.url, second.url])
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                messages = list(executor.map(lambda _: client.generate("prompt"), range(8)))
+        assert sorted(set(messages)) == ["feat: one", "feat: two"]
+        assert generate_count(first) >= 2 and generate_count(second) >= 2
+        assert all(host.outstanding == 0 for host in client.pool.hosts)
+
+    def test_models_merged_across_hosts(self):
+        """Test that the model list is the union over all hosts."""
+        with StubOllama(models=["codellama"]) as first, \
+                StubOllama(models=["llama2", "codellama"]) as second:
+            client = OllamaClient([first.url, second.url])
+            assert client.list_models() == ["codellama", "llama2"]
+            assert [status["models"] for status in client.host_status()] == [["codellama"], ["llama2", "codellama"]]
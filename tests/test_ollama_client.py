@@ -0,0 +1,141 @@
+"""Tests for OllamaClient class."""
+
+import socket
+import pytest
+from benchmarks.stub_ollama import StubOllama
+from ollama_commit.client_base import COMMIT_SCHEMA
+from ollama_commit.ollama_client import OllamaClient, COMMIT_SYSTEM, UNAVAILABLE_MESSAGE
+
+
+class TestOllamaClient:
+    """Test cases for OllamaClient."""
+
+    summary = {"staged_files": ["a.py"], "modified": 1}
+
+    def test_generate_without_streaming(self):
+        """Test the blocking generate path."""
+        with StubOllama(tokens=['"fix: handle empty diff."']) as server:
+            client = OllamaClient(server.url)
+            message = client.generate_commit_message("diff", self.summary)
+        assert message == "fix: handle empty diff"
+        assert server.payloads[-1]["stream"] is False
+
+    def test_stream_commit_message_yields_tokens(self):
+        """Test that streamed tokens arrive in order."""
+        with StubOllama(tokens=["feat:", " one", " two"]) as server:
+            client = OllamaClient(server.url)
+            tokens = list(client.stream_commit_message("diff", self.summary))
+        assert tokens == ["feat:", " one", " two"]
+
+    def test_streaming_stops_after_first_line(self):
+        """Test that streaming stops reading once the first line is complete."""
+        tokens = ["\n", "feat: add", " stub\n"] + [f" extra {i}" for i in range(200)]
+        with StubOllama(tokens=tokens) as server:
+            client = OllamaClient(server.url)
+            received = []
+            message = client.generate_commit_message("diff", self.summary, on_token=received.append)
+        assert message == "feat: add stub"
+        assert "".join(received).strip() == "feat: add stub"
+        assert not any("extra" in token for token in received)
+
+    def test_streaming_skips_preamble(self):
+        """Test that lines before a conventional subject are skipped and reading stops after it."""
+        tokens = ["Here is the commit message:\n", "\n", "`fix: skip", " preamble`\n"] + [f" extra {i}" for i in range(200)]
+        with StubOllama(tokens=tokens) as server:
+            client = OllamaClient(server.url)
+            received = []
+            message = client.generate_commit_message("diff", self.summary, on_token=received.append)
+        assert message == "fix: skip preamble"
+        assert not any("extra" in token for token in received)
+        assert server.tokens_sent < server.payloads[0]["options"]["num_predict"]
+
+    def test_decode_budget_and_stop_sequences(self):
+        """Test that commit and summary requests carry their own num_predict, and commit ones the stop sequences."""
+        with StubOllama(tokens=["fix: cap"]) as server:
+            client = OllamaClient(server.url, options={"num_ctx": 4096}, commit_options={"stop": ["\n\n"]})
+            client.generate_commit_message("diff", self.summary)
+            client.summarize_diff_chunk("diff")
+        commit, summary = (payload["options"] for payload in server.payloads)
+        assert commit == {"temperature": 0.3, "top_p": 0.9, "num_ctx": 4096, "num_predict": 64, "stop": ["\n\n"]}
+        assert summary["num_predict"] == 200 and "stop" not in summary
+        assert client.cache_key("d") != OllamaClient(server.url, options={"num_ctx": 4096}).cache_key("d")
+
+    def test_structured_message(self):
+        """Test that a JSON answer is requested, cut off once complete and rendered as a subject."""
+        tokens = ['{"type": "feat", "scope": "cli",', ' "subject": "add flag."}'] + ["\n"] * 200
+        with StubOllama(tokens=tokens) as server:
+            client = OllamaClient(server.url, structured=True)
+            received = []
+            assert client.generate_commit_message("diff", self.summary, on_token=received.append) == "feat(cli): add flag"
+            assert received == ["feat(cli): add flag"]
+            server.tokens = ['{"type": "fix", "scope": "", "subject": "handle x"}']
+            assert client.generate_commit_message("diff", self.summary) == "fix: handle x"
+            # Cut off by num_predict: a failure, not the partial JSON.
+            server.tokens = ['{"type": "feat", "scope": "cli", "subject": "add a very long']
+            assert client.generate_commit_message("diff", self.summary) is None
+            stopped = OllamaClient(server.url, structured=True, commit_options={"stop": ["\n"]})
+            stopped.generate_commit_message("diff", self.summary)
+        assert server.payloads[0]["format"] == COMMIT_SCHEMA
+        assert "stop" not in server.payloads[-1]["options"]
+        assert server.payloads[0]["system"].startswith(COMMIT_SYSTEM) and "JSON" in server.payloads[0]["system"]
+        assert server.tokens_sent < 3 * server.payloads[0]["options"]["num_predict"]
+
+    def test_session_reuses_connection(self):
+        """Test that repeated calls share one keep-alive connection."""
+        with StubOllama(tokens=["fix: reuse"]) as server:
+            with OllamaClient(server.url) as client:
+                assert client.is_available()
+                assert client.list_models() == ["codellama"]
+                assert client.generate_commit_message("diff", self.summary) == "fix: reuse"
+        assert len(server.requests) == 2
+        assert server.connections == 1
+
+    def test_keep_alive_disabled(self):
+        """Test that disabling keep-alive opens a connection per request."""
+        with StubOllama() as server:
+            with OllamaClient(server.url, keep_alive=False) as client:
+                client.is_available()
+                client.invalidate_tags()
+                client.list_models()
+        assert server.connections == 2
+
+    def test_generate_skips_availability_probe(self):
+        """Test that generation goes straight to /api/generate."""
+        with StubOllama(tokens=["fix: fast path"]) as server:
+            client = OllamaClient(server.url)
+            assert client.generate_commit_message("diff", self.summary) == "fix: fast path"
+        assert server.requests == [("POST", "/api/generate")]
+
+    def test_generate_unreachable_raises_connection_error(self):
+        """Test that an unreachable server gives the friendly error."""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        client = OllamaClient(f"http://127.0.0.1:{port}", max_retries=0)
+        with pytest.raises(ConnectionError, match=UNAVAILABLE_MESSAGE):
+            client.generate_commit_message("diff", self.summary)
+        assert not client.is_available()
+
+    def test_tags_cached_in_memory_and_on_disk(self, tmp_path):
+        """Test that availability and model list share one cached probe."""
+        cache_path = tmp_path / "tags.json"
+        with StubOllama(models=["codellama", "llama2"]) as server:
+            client = OllamaClient(server.url, tags_cache_path=cache_path)
+            assert client.is_available()
+            assert client.list_models() == ["codellama", "llama2"]
+            other = OllamaClient(server.url, tags_cache_path=cache_path)
+            assert other.list_models() == ["codellama", "llama2"]
+            expired = OllamaClient(server.url, tags_ttl=0, tags_cache_path=cache_path)
+            assert expired.is_available()
+        assert server.requests == [("GET", "/api/tags")] * 2
+
+    def test_instructions_sent_as_system_prompt(self):
+        """Test that instructions go in the system prompt, or inline when it is disabled."""
+        with StubOllama(tokens=["fix: x"]) as server:
+            OllamaClient(server.url).generate_commit_message("the diff", self.summary)
+            OllamaClient(server.url, system_prompt=False).generate_commit_message("the diff", self.summary)
+        with_system, inline = server.payloads
+        assert with_system["system"] == COMMIT_SYSTEM
+        assert with_system["prompt"].startswith("Files changed: 1")
+        assert "system" not in inline
+        assert inline["prompt"] == f"{COMMIT_SYSTEM}\n\n{with_system['prompt']}"
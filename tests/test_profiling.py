@@ -0,0 +1,109 @@
+"""Tests for phase timing."""
+
+import json
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.stub_ollama import StubOllama
+from ollama_commit.commit_generator import CommitGenerator
+from ollama_commit.profiling import Profiler, bind, span
+
+STATS = {
+    "total_duration": 900_000_000,
+    "load_duration": 500_000_000,
+    "prompt_eval_count": 120,
+    "prompt_eval_duration": 300_000_000,
+    "eval_count": 10,
+    "eval_duration": 100_000_000,
+}
+
+
+def names(report):
+    """Span names with their parent's name."""
+    spans = report["spans"]
+    return {(entry["name"], None if entry["parent"] is None else spans[entry["parent"]]["name"])
+            for entry in spans}
+
+
+class TestProfiler:
+    """Test cases for Profiler and span."""
+
+    def test_inactive_span(self):
+        """Test that spans outside an active profiler are not recorded."""
+        profiler = Profiler()
+        with span("outside") as current:
+            assert current is None
+        assert profiler.spans == []
+
+    def test_generate_phases(self, make_repo):
+        """Test that a generation records git, prompt and Ollama phases with Ollama's timings."""
+        repo_path = make_repo()
+        with StubOllama(tokens=["feat: add stub"]) as server:
+            server.stats = STATS
+            generator = CommitGenerator(repo_path, server.url)
+            profiler = Profiler()
+            with profiler.activate():
+                result = generator.generate()
+        assert result["success"]
+        report = profiler.report()
+        assert {("generate", None), ("git.diff", "generate"), ("compact", "generate"),
+                ("prompt.build", "generate"), ("ollama.generate", "generate")} <= names(report)
+        request = next(entry for entry in report["spans"] if entry["name"] == "ollama.generate")
+        assert request["attributes"]["eval_count"] == 10
+        assert request["attributes"]["host"] == server.url
+        assert report["ollama"] == {"requests": 1, "total_duration": 900.0, "load_duration": 500.0,
+                                    "prompt_eval_duration": 300.0, "eval_duration": 100.0,
+                                    "prompt_eval_count": 120, "eval_count": 10}
+        table = profiler.table()
+        assert "prefill" in table and "120 tokens" in table and "100.0 tok/s" in table
+        json.loads(profiler.to_json())
+
+    def test_streaming_records_first_token(self, make_repo):
+        """Test that streamed generation records the time to the first token."""
+        repo_path = make_repo()
+        with StubOllama(tokens=["feat: add", " stub"]) as server:
+            generator = CommitGenerator(repo_path, server.url)
+            profiler = Profiler()
+            with profiler.activate():
+                generator.generate(on_token=lambda token: None)
+        stream = next(entry for entry in profiler.report()["spans"] if entry["name"] == "ollama.stream")
+        assert stream["attributes"]["first_token_ms"] >= 0
+
+    def test_bind_nests_thread_spans(self):
+        """Test that spans in worker threads nest under the submitting span."""
+        profiler = Profiler()
+
+        def work(i):
+            with span("work", item=i):
+                pass
+
+        with profiler.activate():
+            with span("map"):
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    list(executor.map(bind(work), range(3)))
+        assert [name for name in names(profiler.report()) if name[0] == "work"] == [("work", "map")]
+        assert len(profiler.spans) == 4
+
+    def test_merge(self):
+        """Test that spans from another report are grafted under a parent."""
+        remote = Profiler()
+        with remote.activate():
+            with span("generate"):
+                with span("git.diff"):
+                    pass
+        local = Profiler()
+        with local.activate():
+            with span("daemon") as current:
+                pass
+        local.merge(remote.report()["spans"], current)
+        assert names(local.report()) == {("daemon", None), ("generate", "daemon"), ("git.diff", "generate")}
+
+    def test_profile_json_to_stdout_alone(self, make_repo, hook_env):
+        """Test that `msg --profile-json -` prints nothing but the report, without asking to commit."""
+        repo_path = make_repo()
+        with StubOllama(tokens=["feat: add", " stub"]) as server:
+            output = subprocess.run([sys.executable, "-m", "ollama_commit.cli", "msg", "--repo", repo_path,
+                                     "--no-daemon", "--no-cache", "--profile-json", "-"],
+                                    env=hook_env(server.url), stdin=subprocess.DEVNULL,
+                                    stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+        assert ("generate", None) in names(json.loads(output))
@@ -0,0 +1,50 @@
+"""Startup-time regression tests for the CLI entry point."""
+
+import os
+import subprocess
+import sys
+
+
+# Cumulative import time allowed for ollama_commit.cli, in microseconds.
+# The lazy entry point takes ~15 ms locally; importing requests and GitPython
+# eagerly takes well over 100 ms.
+CLI_IMPORT_BUDGET_US = 80_000
+
+HEAVY_MODULES = ("requests", "git", "yaml", "rich", "urllib3")
+
+
+def import_times(statement):
+    """Run statement under ``python -X importtime`` and parse the report."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=root, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup:
+    """Test cases for import cost of the CLI."""
+
+    def test_cli_does_not_import_heavy_modules(self):
+        """Test that importing the CLI skips requests, GitPython, yaml and rich."""
+        times = import_times("import ollama_commit.cli")
+        assert not [name for name in HEAVY_MODULES if name in times]
+
+    def test_package_exports_are_lazy(self):
+        """Test that the package exports load their modules on first access."""
+        times = import_times("import ollama_commit")
+        assert "ollama_commit.ollama_client" not in times
+        times = import_times("from ollama_commit import OllamaClient")
+        assert "ollama_commit.ollama_client" in times
+
+    def test_cli_import_time_budget(self):
+        """Test that importing the CLI stays within the startup budget."""
+        best = min(import_times("import ollama_commit.cli")["ollama_commit.cli"] for _ in range(3))
+        assert best < CLI_IMPORT_BUDGET_US, f"ollama_commit.cli took {best / 1000:.1f} ms to import"
@@ -0,0 +1,100 @@
+"""Tests for DiffSummarizer class."""
+
+import hashlib
+from unittest import mock
+from benchmarks.stub_ollama import StubOllama
+from ollama_commit.cache import BlobCache
+from ollama_commit.git_analyzer import FileChange
+from ollama_commit.summarize import DiffSummarizer, estimate_tokens, split_hunks
+
+
+def make_change(path, lines, hunks=1, version=0):
+    """Build a modified-file change with the given number of added lines per hunk."""
+    patch = ""
+    for hunk in range(hunks):
+        patch += f"@@ -{hunk * 100},0 +{hunk * 100},{lines} @@\n"
+        patch += "".join(f"+line {i} of {path} v{version}\n" for i in range(lines))
+    new_sha = hashlib.sha1(patch.encode()).hexdigest()
+    return FileChange(path=path, old_path=path, change_type="M", patch=patch.encode(), additions=lines * hunks,
+                      old_sha="0" * 40, new_sha=new_sha)
+
+
+class TestDiffSummarizer:
+    """Test cases for DiffSummarizer."""
+
+    def test_split_hunks_keeps_file_header(self):
+        """Test that each hunk part carries the file header."""
+        parts = split_hunks(make_change("a.py", 2, hunks=3).render())
+        assert len(parts) == 3
+        assert all(part.startswith("\n--- a/a.py\n+++ b/a.py\n@@") for part in parts)
+
+    def test_chunks_fit_budget(self, fake_client):
+        """Test that chunks respect the token budget."""
+        summarizer = DiffSummarizer(fake_client, context_window=1000)
+        changes = [make_change(f"f{i}.py", 5) for i in range(40)] + [make_change("big.py", 200, hunks=4)]
+        chunks = summarizer.chunk(changes)
+        assert len(chunks) > 1
+        assert all(estimate_tokens(chunk) <= summarizer.chunk_budget + 10 for chunk in chunks)
+        assert any("f0.py" in chunk and "f1.py" in chunk for chunk in chunks)
+
+    def test_map_is_parallel_and_bounded(self, fake_client):
+        """Test that chunk summaries run concurrently within max_workers."""
+        summarizer = DiffSummarizer(fake_client, max_workers=3)
+        changes = [make_change(f"f{i}.py", 150) for i in range(8)]
+        message = summarizer.summarize(changes, {"staged_files": [c.path for c in changes]})
+        assert message == "refactor: large change"
+        assert len(fake_client.chunks) == 8
+        assert 1 < fake_client.max_active <= 3
+
+    def test_summaries_are_combined_when_too_long(self, fake_client):
+        """Test the hierarchical reduce when summaries exceed the budget."""
+        summarizer = DiffSummarizer(fake_client, max_workers=4)
+        changes = [make_change(f"f{i}.py", 150) for i in range(12)]
+        summarizer.summarize(changes, {})
+        assert fake_client.combined
+        assert estimate_tokens("\n".join(fake_client.reduced)) <= summarizer.chunk_budget
+
+    def test_blob_cache_resummarizes_only_changed_files(self, tmp_path, fake_client):
+        """Test that a second run with one file restaged summarizes only that file."""
+        changes = [make_change(f"f{i}.py", 40) for i in range(6)] + [make_change("tiny.py", 1)]
+        DiffSummarizer(fake_client, blob_cache=BlobCache(tmp_path)).summarize(changes, {})
+        # One summary per file; the tiny diff is passed to the reduce step as it is.
+        assert len(fake_client.chunks) == 6
+        assert "tiny.py" in str(fake_client.combined + [fake_client.reduced])
+
+        changes[2] = make_change("f2.py", 40, version=1)
+        DiffSummarizer(fake_client, blob_cache=BlobCache(tmp_path)).summarize(changes, {})
+        assert len(fake_client.chunks) == 7
+        assert "f2.py v1" in fake_client.chunks[6]
+
+    def test_generator_uses_map_reduce_for_large_diffs(self, tmp_path):
+        """Test that CommitGenerator routes long diffs through the summarizer."""
+        from git import Repo
+        from ollama_commit.commit_generator import CommitGenerator
+        repo = Repo.init(tmp_path)
+        for i in range(5):
+            (tmp_path / f"f{i}.py").write_text("".join(f"value_{j} = {j}\n" for j in range(100)))
+        repo.index.add([f"f{i}.py" for i in range(5)])
+        client = mock.Mock()
+        client.context_window.return_value = 2048
+        generator = CommitGenerator(str(tmp_path), ollama_client=client)
+        with mock.patch.object(DiffSummarizer, "summarize", return_value="feat: add modules"):
+            result = generator.generate()
+        assert result["commit_message"] == "feat: add modules"
+        client.generate_commit_message.assert_not_called()
+
+    def test_generator_sends_diff_fitting_one_chunk_directly(self, tmp_path):
+        """Test that a diff over the compactor budget but within one chunk takes a single request."""
+        from git import Repo
+        from ollama_commit.commit_generator import CommitGenerator
+        repo = Repo.init(tmp_path)
+        (tmp_path / "f.py").write_text("".join(f"value_{j} = {j}\n" for j in range(200)))
+        repo.index.add(["f.py"])
+        with StubOllama(tokens=["feat: add values"]) as server:
+            generator = CommitGenerator(str(tmp_path), server.url)
+            compacted = generator.compactor.compact(generator.git_analyzer.snapshot.changes)
+            assert not compacted.complete and compacted.original_tokens < 1000
+            result = generator.generate()
+        assert result["commit_message"] == "feat: add values"
+        assert server.requests.count(("POST", "/api/generate")) == 1
+        assert "value_199 = 199" in server.payloads[-1]["prompt"]
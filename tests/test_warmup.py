@@ -0,0 +1,65 @@
+"""Tests for model warm-up and keep_alive."""
+
+import os
+import tempfile
+from unittest import mock
+import pytest
+from git import Repo
+from benchmarks.stub_ollama import StubOllama
+from ollama_commit.ollama_client import OllamaClient
+from ollama_commit.warmup import HOOK_MARKER, install_warmup_hook, mark_warmup, spawn_detached, warmup_due
+
+
+class TestWarmup:
+    """Test cases for warm-up requests, debouncing and the staging hook."""
+
+    def test_warmup_and_keep_alive(self):
+        """Test that warm-up sends an empty prompt and keep_alive reaches generate calls."""
+        with StubOllama(tokens=["feat: warm"]) as server:
+            client = OllamaClient(server.url, model_keep_alive="30m")
+            assert client.warmup()
+            client.generate("prompt")
+            OllamaClient(server.url).generate("prompt")
+        warm, generate, default = server.payloads
+        assert warm == {"model": "codellama", "prompt": "", "stream": False, "keep_alive": "30m"}
+        assert generate["keep_alive"] == "30m"
+        assert "keep_alive" not in default
+
+    def test_warmup_unreachable(self):
+        """Test that a failed warm-up is reported, not raised."""
+        assert not OllamaClient("http://127.0.0.1:9", max_retries=0).warmup()
+
+    def test_debounce(self, tmp_path):
+        """Test that background warm-ups are skipped while one ran recently."""
+        stamp = tmp_path / "warmup.stamp"
+        assert warmup_due(stamp, 60)
+        mark_warmup(stamp)
+        assert not warmup_due(stamp, 60)
+        os.utime(stamp, (0, 0))
+        assert warmup_due(stamp, 60)
+
+    def test_spawn_detached_resolves_relative_repo(self, tmp_path, monkeypatch):
+        """Test that a relative repository path reaches the detached worker as an absolute one."""
+        (tmp_path / "sub" / "project").mkdir(parents=True)
+        monkeypatch.chdir(tmp_path)
+        with mock.patch("subprocess.Popen") as popen:
+            spawn_detached("pregenerate", os.path.join("sub", "project"))
+        expected = str(tmp_path / "sub" / "project")
+        assert popen.call_args.args[0][-2:] == ["--repo", expected]
+        assert popen.call_args.kwargs["cwd"] == expected
+
+    def test_install_hook(self):
+        """Test that the post-index-change hook is installed without clobbering others."""
+        repo_path = tempfile.mkdtemp()
+        Repo.init(repo_path)
+        path = install_warmup_hook(repo_path)
+        assert path.name == "post-index-change"
+        assert os.access(path, os.X_OK)
+        assert HOOK_MARKER in path.read_text()
+        assert install_warmup_hook(repo_path) == path
+
+        path.write_text("#!/bin/sh\necho custom\n")
+        with pytest.raises(ValueError):
+            install_warmup_hook(repo_path)
+        install_warmup_hook(repo_path, force=True)
+        assert HOOK_MARKER in path.read_text()